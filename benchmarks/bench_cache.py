@@ -0,0 +1,62 @@
+"""Command latency with and without the response cache.
+
+Today's room descriptions are a tuple lookup, so the cache mostly adds its
+fingerprint check; ``--generate-ms`` simulates Phase 2 generated text by
+making each description cost that long to produce.
+
+Run with ``python benchmarks/bench_cache.py [--commands N] [--generate-ms MS]``.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from adventuregpt.cache import ResponseCache
+from adventuregpt.engine import GameEngine
+
+SCRIPT = ("look", "inventory", "go west", "look", "go in", "look", "go out")
+
+
+class SlowEngine(GameEngine):
+    generate_seconds = 0.0
+
+    def _get_room_description(self) -> str:
+        deadline = time.perf_counter() + self.generate_seconds
+        while time.perf_counter() < deadline:
+            pass
+        return super()._get_room_description()
+
+
+def run(db_path: str, commands: int, cache) -> float:
+    engine = SlowEngine(db_path=db_path, write_behind=True, response_cache=cache)
+    engine.start_new_game()
+    start = time.perf_counter()
+    for i in range(commands):
+        engine.process_command(SCRIPT[i % len(SCRIPT)])
+    elapsed = time.perf_counter() - start
+    engine.close()
+    return elapsed / commands * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commands", type=int, default=7000)
+    parser.add_argument("--generate-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(f"{'description cost':>17} {'no cache':>10} {'cache':>10} {'hit rate':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for generate_ms in (0.0, args.generate_ms):
+            SlowEngine.generate_seconds = generate_ms / 1000
+            commands = args.commands if generate_ms == 0 else args.commands // 10
+            plain = run(os.path.join(tmp, "plain.db"), commands, None)
+            cache = ResponseCache()
+            cached = run(os.path.join(tmp, "cached.db"), commands, cache)
+            rate = cache.hits / (cache.hits + cache.misses)
+            label = f"{generate_ms:g} ms"
+            print(f"{label:>17} {plain:>8.1f}us {cached:>8.1f}us {rate:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Cost of world-flag conditions on a large synthetic world.
+
+Every exit gets a condition over a pool of flags. Compares setting a flag
+with the reverse index (re-evaluating only its dependents) against
+re-evaluating every condition, and checking an exit from memory against
+reading its flag from SQLite.
+
+Run with ``python benchmarks/bench_conditions.py [--rooms N] [--flags N]``.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from synthetic import make_world
+
+from adventuregpt.conditions import ConditionSet
+from adventuregpt.models import PlayerState, WorldData
+from adventuregpt.storage import GameStorage
+from adventuregpt.world import compile_world
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=10_000)
+    parser.add_argument("--flags", type=int, default=1000)
+    parser.add_argument("--ops", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    data = make_world(args.rooms)
+    for room in data["rooms"].values():
+        room["exits"] = {
+            direction: {
+                "to": target,
+                "when": f"flag_{rng.randrange(args.flags)} "
+                f"or not gate_{rng.randrange(args.flags)}",
+            }
+            for direction, target in room["exits"].items()
+        }
+    start = time.perf_counter()
+    world = compile_world(WorldData.model_validate(data))
+    compile_s = time.perf_counter() - start
+    start = time.perf_counter()
+    conditions = ConditionSet(world.conditions())
+    index_ms = (time.perf_counter() - start) * 1000
+    flags = conditions.bind({})
+    print(
+        f"{len(conditions.conditions)} conditions over {args.flags * 2} flags: "
+        f"world compiled in {compile_s:.2f} s, index built in {index_ms:.1f} ms"
+    )
+
+    keys = [f"flag_{rng.randrange(args.flags)}" for _ in range(args.ops)]
+    start = time.perf_counter()
+    for i, key in enumerate(keys):
+        flags.set(key, i % 2 == 0)
+    indexed = (time.perf_counter() - start) / args.ops * 1e6
+
+    scans = max(args.ops // 100, 1)
+    start = time.perf_counter()
+    for key in keys[:scans]:
+        flags.flags[key] = True
+        for source, condition in conditions.conditions.items():
+            flags.truth[source] = condition(flags.flags)
+    scan = (time.perf_counter() - start) / scans * 1e6
+    print(f"set flag: {indexed:.2f} us indexed, {scan:.0f} us re-evaluating all")
+
+    slots = list(world.exit_conditions.items())
+    checks = [rng.choice(slots) for _ in range(args.ops)]
+    start = time.perf_counter()
+    for _, source in checks:
+        flags.holds(source)
+    memory = (time.perf_counter() - start) / args.ops * 1e6
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = GameStorage(os.path.join(tmp, "game.db"))
+        storage.new_game(PlayerState("start"))
+        for key, value in flags.flags.items():
+            storage.set_world_flag(key, value)
+        start = time.perf_counter()
+        for _, source in checks:
+            storage.get_world_flag(source.split()[0])
+        sqlite = (time.perf_counter() - start) / args.ops * 1e6
+        storage.close()
+    print(f"check exit: {memory:.2f} us in memory, {sqlite:.1f} us per SQLite read")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Shortest-path and lint queries on a large synthetic world.
+
+Run with ``python benchmarks/bench_graph.py [--rooms N]``.
+"""
+
+import argparse
+import random
+import time
+
+from synthetic import make_world
+
+from adventuregpt.graph import RoomGraph
+from adventuregpt.models import WorldData
+from adventuregpt.world import compile_world
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=10_000)
+    parser.add_argument("--sources", type=int, default=32)
+    args = parser.parse_args()
+
+    world = compile_world(WorldData.model_validate(make_world(args.rooms)))
+    rng = random.Random(0)
+    room_ids = world.room_ids
+    sources = rng.sample(room_ids, min(args.sources, len(room_ids)))
+    pairs = [(rng.choice(sources), rng.choice(room_ids)) for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    graph = RoomGraph(world)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for source in sources:
+        graph.path(source, source)
+    cold = (time.perf_counter() - start) / len(sources)
+
+    start = time.perf_counter()
+    lengths = [len(graph.path(a, b) or ()) for a, b in pairs]
+    warm = (time.perf_counter() - start) / len(pairs)
+
+    start = time.perf_counter()
+    report = graph.lint()
+    lint = time.perf_counter() - start
+
+    # Toggling one exit: the cost of invalidation plus the rebuilds it causes.
+    room = rng.choice(room_ids)
+    start = time.perf_counter()
+    graph.set_exit(room, "northeast", "start")
+    for a, b in pairs[:1000]:
+        graph.path(a, b)
+    toggle = time.perf_counter() - start
+
+    print(f"rooms={args.rooms} sources={len(sources)} queries={args.queries}")
+    print(f"build index                {build * 1000:>9.2f} ms")
+    print(f"BFS tree (cold source)     {cold * 1000:>9.2f} ms")
+    print(
+        f"path (cached source)       {warm * 1e6:>9.2f} us"
+        f"  (mean length {sum(lengths) / len(lengths):.1f})"
+    )
+    print(
+        f"lint                       {lint * 1000:>9.2f} ms"
+        f"  ({len(report.unreachable)} unreachable)"
+    )
+    print(f"set_exit + 1000 paths      {toggle * 1000:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
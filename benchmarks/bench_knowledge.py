@@ -0,0 +1,66 @@
+"""Knowledge graph lookups at scale.
+
+Builds a graph of ``--facts`` random facts (entities with a handful of
+outgoing relations each), then times k=2 lookups from random entities:
+cold (a fresh graph, so adjacency lists come from the covering indexes)
+and warm (from the in-memory adjacency cache).
+
+Run with ``python benchmarks/bench_knowledge.py [--facts N] [--queries N]``.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from adventuregpt.knowledge import KnowledgeGraph
+from adventuregpt.storage import Database
+
+RELATIONS = ("north", "south", "east", "west", "contains", "knows")
+FACTS_PER_ENTITY = 5
+
+
+def timed(fn, entities):
+    start = time.perf_counter()
+    for entity in entities:
+        fn(entity)
+    return (time.perf_counter() - start) / len(entities) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--facts", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    count = args.facts // FACTS_PER_ENTITY
+    entities = [f"e{i}" for i in range(count)]
+    facts = [
+        (entity, rng.choice(RELATIONS), rng.choice(entities))
+        for entity in entities
+        for _ in range(FACTS_PER_ENTITY)
+    ]
+    queries = [rng.choice(entities) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database(os.path.join(tmp, "graph.db"))
+        start = time.perf_counter()
+        KnowledgeGraph(database).add_many(facts)
+        print(f"insert {len(facts)} facts: {time.perf_counter() - start:.2f}s")
+
+        for label, fn in (
+            ("k_hop(k=2, out)", lambda g: lambda e: g.k_hop(e, 2)),
+            ("k_hop(k=2, both)", lambda g: lambda e: g.k_hop(e, 2, direction="both")),
+            ("around(k=2)", lambda g: lambda e: g.around(e, 2)),
+        ):
+            graph = KnowledgeGraph(database)
+            cold = timed(fn(graph), queries)
+            warm = timed(fn(graph), queries)
+            print(f"{label:>18}: cold {cold:.3f} ms, warm {warm:.3f} ms")
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
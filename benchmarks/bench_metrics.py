@@ -0,0 +1,48 @@
+"""Per-command cost of metrics, off and on.
+
+With metrics off the engine and Database only check for None; with them
+on, every command is timed twice and every storage operation once, and a
+trace callback counts statements.
+
+Run with ``python benchmarks/bench_metrics.py [--commands N]``.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from adventuregpt.engine import GameEngine
+from adventuregpt.metrics import Metrics
+
+SCRIPT = ("look", "inventory", "go in", "look", "go out", "xyzzy")
+
+
+def run(db_path: str, commands: int, metrics) -> float:
+    engine = GameEngine(db_path=db_path, write_behind=True, metrics=metrics)
+    engine.start_new_game()
+    start = time.perf_counter()
+    for i in range(commands):
+        engine.process_command(SCRIPT[i % len(SCRIPT)])
+    elapsed = time.perf_counter() - start
+    engine.close()
+    return elapsed / commands * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commands", type=int, default=30_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, make in (("off", lambda: None), ("on", Metrics)):
+            best = min(
+                run(os.path.join(tmp, f"{label}{i}.db"), args.commands, make())
+                for i in range(args.repeat)
+            )
+            print(f"metrics {label:>3}: {best:.2f} us/command")
+
+
+if __name__ == "__main__":
+    main()
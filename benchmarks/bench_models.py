@@ -0,0 +1,98 @@
+"""Memory and speed of the runtime state models vs. the old Pydantic ones.
+
+Run with ``python benchmarks/bench_models.py [--sessions N] [--items K]``.
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from adventuregpt.models import Inventory, PlayerState
+
+
+class LegacyInventory(BaseModel):
+    items: List[str] = Field(default_factory=list)
+
+
+class LegacyPlayerState(BaseModel):
+    current_room: str = "start"
+    inventory: LegacyInventory = Field(default_factory=LegacyInventory)
+
+
+def new_state(room: str, items: List[str]) -> PlayerState:
+    return PlayerState(current_room=room, inventory=Inventory(items))
+
+
+def legacy_state(room: str, items: List[str]) -> LegacyPlayerState:
+    return LegacyPlayerState(current_room=room, inventory=LegacyInventory(items=items))
+
+
+def memory_per_session(make, sessions: int, items: List[str]) -> float:
+    # Room names and item names come from the (shared) world, so build them
+    # outside the measurement.
+    rooms = [f"room_{i % 500}" for i in range(sessions)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    states = [make(room, items) for room in rooms]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del states
+    return (after - before) / sessions
+
+
+def timed(fn, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--ops", type=int, default=100_000)
+    args = parser.parse_args()
+
+    items = [f"item_{i}" for i in range(args.items)]
+    row = ("room_7", json.dumps(items))
+    cases = {
+        "pydantic": (
+            legacy_state,
+            lambda s: json.dumps(s.inventory.items),
+            lambda: LegacyPlayerState(
+                current_room=row[0],
+                inventory=LegacyInventory(items=json.loads(row[1])),
+            ),
+        ),
+        "slots": (
+            new_state,
+            lambda s: json.dumps(s.inventory.items),
+            lambda: PlayerState(
+                current_room=row[0], inventory=Inventory(json.loads(row[1]))
+            ),
+        ),
+    }
+
+    print(f"sessions={args.sessions} items/session={args.items}")
+    print(
+        f"{'model':<10} {'bytes/session':>14} {'construct':>11} {'save':>9} {'load':>9}"
+    )
+    for name, (make, save, load) in cases.items():
+        memory = memory_per_session(make, args.sessions, items)
+        state = make("room_7", items)
+        construct = timed(lambda: make("room_7", items), args.ops)
+        serialize = timed(lambda: save(state), args.ops)
+        deserialize = timed(load, args.ops)
+        print(
+            f"{name:<10} {memory:>14.0f} {construct * 1e9:>8.0f} ns"
+            f" {serialize * 1e9:>6.0f} ns {deserialize * 1e9:>6.0f} ns"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Parse a large command corpus with the trie parser.
+
+Also times the uncached parse path and the original chain of ``verb in [...]`` checks for reference,
+and a corpus of misspelt commands, counting how many spelling correction rescues from the
+unknown-command (LLM) fallback.
+Run with ``python benchmarks/bench_parser.py [--commands N]``.
+"""
+
+import argparse
+import random
+import time
+
+from adventuregpt.parser import CommandParser
+
+CORPUS_WORDS = [
+    "n",
+    "north",
+    "go south",
+    "walk east",
+    "move west",
+    "in",
+    "out",
+    "up",
+    "d",
+    "look",
+    "l",
+    "look around",
+    "inventory",
+    "inv",
+    "i",
+    "take inventory",
+    "go sideways",
+    "xyzzy",
+    "plugh",
+    "quit",
+]
+
+TYPO_WORDS = [
+    "nroth",
+    "go suoth",
+    "wlak east",
+    "mvoe west",
+    "lokk",
+    "inventroy",
+    "invnetory",
+    "look at the item 42",
+    "lok aroud",
+    "please go to the nroht",
+    "xyzzy",
+]
+
+
+def legacy_parse(command: str):
+    parts = command.lower().strip().split()
+    if not parts:
+        return None
+    verb = parts[0]
+    if verb in ["quit", "exit"]:
+        return ("quit", None)
+    if verb in ["look", "l"]:
+        return ("look", None)
+    if verb in ["go", "move", "walk"] and len(parts) > 1:
+        return ("go", parts[1])
+    if verb in ["north", "south", "east", "west", "up", "down", "in", "out"]:
+        return ("go", verb)
+    if verb == "inventory":
+        return ("inventory", None)
+    return None
+
+
+def timed(fn, corpus) -> float:
+    start = time.perf_counter()
+    for command in corpus:
+        fn(command)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commands", type=int, default=200_000)
+    parser.add_argument("--nouns", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    corpus = [rng.choice(CORPUS_WORDS) for _ in range(args.commands)]
+
+    start = time.perf_counter()
+    command_parser = CommandParser(nouns=[f"item {i}" for i in range(args.nouns)])
+    build = time.perf_counter() - start
+
+    trie = timed(command_parser.parse, corpus)
+    # The same corpus with the parse cache bypassed: the cost of a new input.
+    uncached = timed(command_parser._parse, corpus)
+    legacy = timed(legacy_parse, corpus)
+    suggest = timed(command_parser.suggest, corpus)
+    typos = [rng.choice(TYPO_WORDS) for _ in range(args.commands // 10)]
+    typo = timed(command_parser._parse, typos)
+    rescued = sum(command_parser._parse(text).verb is not None for text in TYPO_WORDS)
+
+    per = 1e9 / args.commands
+    print(f"build parser ({args.nouns} nouns)  {build * 1000:>8.2f} ms")
+    print(f"trie parse                 {trie * per:>8.0f} ns/command")
+    print(f"trie parse, uncached       {uncached * per:>8.0f} ns/command")
+    print(f"legacy if-chain parse      {legacy * per:>8.0f} ns/command")
+    print(f"suggest                    {suggest * per:>8.0f} ns/command")
+    print(f"typo parse, uncached       {typo * 1e9 / len(typos):>8.0f} ns/command")
+    print(f"typos parsed               {rescued:>8} of {len(TYPO_WORDS)}")
+
+
+if __name__ == "__main__":
+    main()
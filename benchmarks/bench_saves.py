@@ -0,0 +1,94 @@
+"""Save latency against state size: full-row saves vs. delta saves, and
+binary snapshots vs. JSON.
+
+Run with ``python benchmarks/bench_saves.py [--ops N]``.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from adventuregpt import snapshot
+from adventuregpt.models import Inventory, PlayerState
+from adventuregpt.storage import SAVE_PLAYER_SQL, GameStorage
+
+SIZES = (0, 10, 100, 1000)
+
+
+class FullRowStorage(GameStorage):
+    """The pre-delta behaviour: every save rewrites the whole player row."""
+
+    def _write_player(self, conn, state):
+        self._write_full(conn, state)
+
+
+def make_state(items: int) -> PlayerState:
+    return PlayerState("start", Inventory(f"item-{i:04d}" for i in range(items)))
+
+
+def time_moves(storage: GameStorage, items: int, ops: int) -> float:
+    state = make_state(items)
+    storage.new_game(state)
+    rooms = ("start", "building")
+    start = time.perf_counter()
+    for i in range(ops):
+        state.current_room = rooms[i % 2]
+        storage.save_player_state(state)
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def time_codec(fn, ops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+
+    print("Move save latency (us/save)")
+    print(f"{'items':>6} {'full row':>10} {'delta':>10} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for items in SIZES:
+            rates = []
+            for cls in (FullRowStorage, GameStorage):
+                storage = cls(os.path.join(tmp, f"{cls.__name__}-{items}.db"))
+                rates.append(time_moves(storage, items, args.ops))
+                storage.close()
+            full, delta = rates
+            print(f"{items:>6} {full:>10.1f} {delta:>10.1f} {full / delta:>7.1f}x")
+
+    print()
+    print("Full snapshot of inventory + flags (size, us/encode, us/decode)")
+    print(
+        f"{'items':>6} {'json B':>8} {'binary B':>9} {'json enc':>9} "
+        f"{'bin enc':>8} {'json dec':>9} {'bin dec':>8}"
+    )
+    for items in SIZES:
+        state = make_state(items)
+        flags = {f"flag-{i:04d}": i % 3 == 0 or i for i in range(items)}
+        doc = {
+            "room": state.current_room,
+            "inventory": state.inventory.items,
+            "flags": flags,
+        }
+        as_json = json.dumps(doc).encode("utf-8")
+        as_binary = snapshot.dumps(state, flags)
+        ops = max(args.ops // max(items, 1), 50)
+        json_enc = time_codec(lambda: json.dumps(doc).encode("utf-8"), ops)
+        bin_enc = time_codec(lambda: snapshot.dumps(state, flags), ops)
+        json_dec = time_codec(lambda: json.loads(as_json), ops)
+        bin_dec = time_codec(lambda: snapshot.loads(as_binary), ops)
+        print(
+            f"{items:>6} {len(as_json):>8} {len(as_binary):>9} {json_enc:>9.1f} "
+            f"{bin_enc:>8.1f} {json_dec:>9.1f} {bin_dec:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Per-turn cost of the world scheduler with many wandering NPCs.
+
+NPCs are spread over a synthetic world and take a step every few ticks
+while the player walks around. Lazily, only rooms next to the player are
+simulated; eagerly, every room is, which is what the lazy run has to
+match after ``catch_up``.
+
+Run with ``python benchmarks/bench_scheduler.py [--rooms N] [--turns N]``.
+"""
+
+import argparse
+import random
+import time
+
+from synthetic import make_world
+
+from adventuregpt.models import WorldData
+from adventuregpt.scheduler import Scheduler
+from adventuregpt.world import compile_world
+
+
+def populate(world, npcs: int) -> Scheduler:
+    scheduler = Scheduler(world, seed=1)
+    rng = random.Random(0)
+    for i in range(npcs):
+        scheduler.add_npc(
+            f"npc{i}", rng.choice(world.room_ids), every=rng.randint(1, 5)
+        )
+    return scheduler
+
+
+def walk(world, scheduler: Scheduler, turns: int) -> float:
+    rng = random.Random(2)
+    room = world.start
+    start = time.perf_counter()
+    for _ in range(turns):
+        exits = world.neighbours(room)
+        if len(exits):
+            room = exits[rng.randrange(len(exits))]
+        scheduler.tick(room)
+    return (time.perf_counter() - start) / turns * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=10_000)
+    parser.add_argument("--turns", type=int, default=2000)
+    args = parser.parse_args()
+
+    world = compile_world(WorldData.model_validate(make_world(args.rooms)))
+    print(f"{'NPCs':>8} {'lazy us/turn':>13} {'eager us/turn':>14} {'catch-up ms':>12}")
+    for npcs in (0, 1000, 10_000, 100_000):
+        lazy = populate(world, npcs)
+        lazy_us = walk(world, lazy, args.turns)
+        start = time.perf_counter()
+        lazy.catch_up()
+        catch_up_ms = (time.perf_counter() - start) * 1000
+
+        eager = populate(world, npcs)
+        for room_id in world.room_ids:
+            eager.activate(room_id)
+        eager_us = walk(world, eager, args.turns)
+        print(f"{npcs:>8} {lazy_us:>13.1f} {eager_us:>14.1f} {catch_up_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Cost of the generated-text cache against the generation it saves.
+
+Players in the same room send paraphrases of a few intents. Each is either
+answered by the stub backend (``--first-token-ms`` per request) or from the
+cache: exact lookups on the normalized intent, or with ``--similarity``
+also embedding lookups over every cached intent for the scene.
+
+Run with ``python benchmarks/bench_semantic.py [--commands N]``.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from adventuregpt.engine import GameEngine
+from adventuregpt.llm import LLMClient, StubBackend
+from adventuregpt.semantic import SemanticCache
+from adventuregpt.storage import Database
+
+OBJECTS = ("building", "road", "lamp", "stream", "grate", "forest", "valley")
+PARAPHRASES = (
+    "examine the {}",
+    "look at {}",
+    "inspect the {}s",
+    "examin {}",
+    "smell the {}",
+    "kick {}",
+)
+
+
+def commands(count: int):
+    for i in range(count):
+        template = PARAPHRASES[i % len(PARAPHRASES)]
+        yield template.format(OBJECTS[(i // len(PARAPHRASES)) % len(OBJECTS)])
+
+
+def run(db_path: str, count: int, first_token_ms: float, similarity=None):
+    client = LLMClient(StubBackend(first_token_ms=first_token_ms, token_ms=0))
+    database = Database(db_path)
+    cache = None
+    if similarity is not False:
+        cache = SemanticCache(database, similarity=similarity)
+    engine = GameEngine(db_path=db_path, llm=client, semantic_cache=cache)
+    engine.start_new_game()
+    start = time.perf_counter()
+    for command in commands(count):
+        engine.process_command(command)
+    elapsed = time.perf_counter() - start
+    requests = client.stats()["requests"]
+    engine.close()
+    client.close()
+    database.close()
+    return elapsed / count * 1000, requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commands", type=int, default=420)
+    parser.add_argument("--first-token-ms", type=float, default=5.0)
+    parser.add_argument("--similarity", type=float, default=0.75)
+    args = parser.parse_args()
+
+    print(f"{'cache':>18} {'per command':>12} {'generated':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, similarity in (
+            ("off", False),
+            ("exact", None),
+            (f"similarity {args.similarity:g}", args.similarity),
+        ):
+            latency, requests = run(
+                os.path.join(tmp, f"{label}.db"),
+                args.commands,
+                args.first_token_ms,
+                similarity,
+            )
+            print(f"{label:>18} {latency:>10.2f}ms {requests:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Save-slot costs against the number of world flags and slots.
+
+Branching is copy-on-write, so it should stay flat as flags grow; a naive
+branch that copies every flag row is shown for comparison. Listing and
+switching are measured with many slots.
+
+Run with ``python benchmarks/bench_slots.py [--slots N]``.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from adventuregpt.models import PlayerState
+from adventuregpt.storage import GameStorage
+
+FLAG_COUNTS = (100, 1000, 10000, 100000)
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def copy_flags(storage: GameStorage):
+    # What a branch costs without layers: every flag row is duplicated.
+    with storage._get_conn() as conn:
+        conn.execute(
+            "INSERT INTO world_state SELECT -1, key, value FROM world_state "
+            "WHERE layer_id = (SELECT layer_id FROM sessions WHERE id = ?)",
+            (storage.session_id,),
+        )
+        conn.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--slots", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print("Branch latency (ms)")
+        print(f"{'flags':>7} {'copy rows':>10} {'branch':>8} {'save':>8} {'load':>8}")
+        for flags in FLAG_COUNTS:
+            storage = GameStorage(os.path.join(tmp, f"flags-{flags}.db"))
+            state = PlayerState()
+            storage.new_game(state)
+            storage.save_batch(None, {f"flag-{i}": i for i in range(flags)})
+            copy = timed(copy_flags, storage)
+            save = timed(storage.save_slot, "main", state)
+            branch = timed(storage.branch_slot, "main", "side")
+            load = timed(storage.load_slot, "side")
+            print(f"{flags:>7} {copy:>10.2f} {branch:>8.2f} {save:>8.2f} {load:>8.2f}")
+            storage.close()
+
+        storage = GameStorage(os.path.join(tmp, "slots.db"))
+        state = PlayerState()
+        storage.new_game(state)
+        storage.save_batch(None, {f"flag-{i}": i for i in range(1000)})
+        for i in range(args.slots):
+            state.current_room = f"room-{i}"
+            storage.set_world_flag("turn", i)
+            storage.save_slot(f"slot-{i:04d}", state)
+        print()
+        print(f"With {args.slots} slots (ms)")
+        print(f"  list:   {timed(storage.list_slots):.2f}")
+        start = time.perf_counter()
+        for i in range(0, args.slots, 10):
+            storage.load_slot(f"slot-{i:04d}")
+        switch = (time.perf_counter() - start) * 1000 / len(range(0, args.slots, 10))
+        print(f"  switch: {switch:.2f}")
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
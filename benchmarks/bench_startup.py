@@ -0,0 +1,38 @@
+"""Wall-clock startup of CLI invocations that never open the TUI.
+
+Run with ``python benchmarks/bench_startup.py [--repeat N]``. Each case is a
+fresh interpreter; the best of N runs is reported.
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+CASES = {
+    "python (baseline)": ["-c", "pass"],
+    "import adventuregpt.main": ["-c", "import adventuregpt.main"],
+    "adventuregpt --help": ["-m", "adventuregpt.main", "--help"],
+    "adventuregpt lint": ["-m", "adventuregpt.main", "lint"],
+}
+
+
+def best_of(args, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], capture_output=True, check=False)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for name, case in CASES.items():
+        print(f"{name:<26} {best_of(case, args.repeat) * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
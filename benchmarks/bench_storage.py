@@ -0,0 +1,85 @@
+"""Compare GameStorage throughput with per-call connections vs. the pooled one.
+
+Run with ``python benchmarks/bench_storage.py [--ops N]``.
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+
+from adventuregpt.models import PlayerState
+from adventuregpt.storage import GameStorage
+
+
+class PerCallStorage(GameStorage):
+    """The pre-pooling behaviour: connect, commit and close on every call.
+
+    Bypasses Database entirely so the file never switches to WAL and keeps
+    SQLite's default rollback journal and synchronous=FULL.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.session = "default"
+        self.session_id = 1
+        self._owns_database = False
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE player (session_id INTEGER PRIMARY KEY, "
+            "current_room TEXT NOT NULL, inventory TEXT DEFAULT '[]')"
+        )
+        conn.execute(
+            "CREATE TABLE world_state (session_id INTEGER NOT NULL, key TEXT NOT NULL, "
+            "value TEXT, PRIMARY KEY (session_id, key)) WITHOUT ROWID"
+        )
+        conn.commit()
+        conn.close()
+
+    @contextmanager
+    def _get_conn(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+def run(storage: GameStorage, ops: int) -> float:
+    rooms = ("start", "building")
+    state = PlayerState()
+    start = time.perf_counter()
+    for i in range(ops):
+        state.current_room = rooms[i % 2]
+        storage.save_player_state(state)
+        storage.load_player_state()
+    elapsed = time.perf_counter() - start
+    # Each iteration is one save and one load.
+    return (ops * 2) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = [
+            ("per-call connection", PerCallStorage, {}),
+            ("pooled, synchronous=FULL", GameStorage, {"synchronous": "FULL"}),
+            ("pooled, synchronous=NORMAL", GameStorage, {"synchronous": "NORMAL"}),
+        ]
+        baseline = None
+        for label, cls, kwargs in cases:
+            storage = cls(os.path.join(tmp, f"{cls.__name__}.db"), **kwargs)
+            rate = run(storage, args.ops)
+            storage.close()
+            baseline = baseline or rate
+            print(f"{label:<28} {rate:>12,.0f} ops/sec  ({rate / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
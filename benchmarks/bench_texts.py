@@ -0,0 +1,176 @@
+"""Memory and database size saved by storing each distinct text once.
+
+A large synthetic world draws its room descriptions from a pool of
+paragraphs, as mazes and generated worlds do. Measures the strings the
+compiled world holds, transcripts of many sessions walking it with and
+without a ``TextStore``, generated replies repeated across scenes stored
+inline (the version 7 layout) and by hash, and TextStore reads.
+
+Run with ``python benchmarks/bench_texts.py [--rooms N] [--sessions N]``.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from synthetic import make_world
+
+from adventuregpt.history import History
+from adventuregpt.models import WorldData
+from adventuregpt.semantic import SemanticCache
+from adventuregpt.storage import Database, TextStore
+from adventuregpt.world import compile_world
+
+SENTENCES = (
+    "Water drips from the ceiling into a shallow pool.",
+    "A cold wind blows through the passage from the east.",
+    "The walls are covered in strange markings, worn smooth by time.",
+    "It is very dark here, and the air smells of damp earth.",
+    "Twisty little passages lead off in every direction.",
+    "A faint glow comes from somewhere far below.",
+    "Loose rocks crunch underfoot.",
+    "Roots hang from the low ceiling like curtains.",
+)
+
+
+def paragraphs(count: int, rng: random.Random):
+    return [" ".join(rng.sample(SENTENCES, 4)) for _ in range(count)]
+
+
+def db_size(path: str) -> int:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("VACUUM")
+    conn.close()
+    return os.path.getsize(path)
+
+
+def bench_world(rooms: int, pool: int, rng: random.Random):
+    data = make_world(rooms)
+    texts = paragraphs(pool, rng)
+    for room in data["rooms"].values():
+        room["description"] = rng.choice(texts)
+    world = compile_world(WorldData.model_validate(data))
+    inline = sum(sys.getsizeof(text) for text in world.descriptions)
+    unique = {id(text): text for text in world.descriptions}
+    shared = sum(sys.getsizeof(text) for text in unique.values())
+    print(
+        f"world: {rooms} descriptions take {inline / 2**20:.1f} MB as separate "
+        f"strings, {shared / 2**20:.2f} MB shared ({len(unique)} distinct)"
+    )
+    return world
+
+
+def bench_transcripts(tmp: str, world, sessions: int, turns: int, rng):
+    plain = 0
+    database = Database(os.path.join(tmp, "transcripts.db"))
+    texts = TextStore(database)
+    referenced = 0
+    for session in range(sessions):
+        room = world.start
+        with_store = History(os.path.join(tmp, f"ref-{session}.jsonl"), texts)
+        without = History(os.path.join(tmp, f"plain-{session}.jsonl"))
+        for _ in range(turns):
+            targets = world.neighbours(room)
+            room = targets[rng.randrange(len(targets))] if len(targets) else room
+            for history in (with_store, without):
+                history.append("command", "look")
+                history.append("text", world.description(room))
+        with_store.close()
+        without.close()
+        plain += os.path.getsize(without.path)
+        referenced += os.path.getsize(with_store.path)
+    database.close()
+    store = db_size(database.db_path)
+    print(
+        f"transcripts: {sessions} sessions x {turns} turns take "
+        f"{plain / 2**20:.1f} MB inline, {referenced / 2**20:.1f} MB of references "
+        f"+ {store / 2**20:.2f} MB text store"
+    )
+
+
+def bench_generations(tmp: str, contexts: int, intents: int, pool: int, rng):
+    replies = paragraphs(pool, rng)
+    rows = [
+        (f"scene-{c}", f"intent {i}", replies[hash((c // 8, i)) % pool])
+        for c in range(contexts)
+        for i in range(intents)
+    ]
+
+    inline_path = os.path.join(tmp, "inline.db")
+    conn = sqlite3.connect(inline_path)
+    conn.execute(
+        "CREATE TABLE generations (id INTEGER PRIMARY KEY, context TEXT NOT NULL, "
+        "intent TEXT NOT NULL, vector BLOB, text TEXT NOT NULL, "
+        "created_at REAL NOT NULL, used_at REAL NOT NULL, UNIQUE (context, intent))"
+    )
+    conn.executemany(
+        "INSERT INTO generations (context, intent, text, created_at, used_at) "
+        "VALUES (?, ?, ?, 0, 0)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+    sizes = {}
+    for codec in ("none", "zlib"):
+        path = os.path.join(tmp, f"stored-{codec}.db")
+        database = Database(path, synchronous="OFF")
+        cache = SemanticCache(
+            database, capacity=len(rows), texts=TextStore(database, codec)
+        )
+        for context, intent, reply in rows:
+            cache.put(context, intent, reply)
+        database.close()
+        sizes[codec] = db_size(path)
+    print(
+        f"generations: {len(rows)} replies ({len(set(replies))} distinct) take "
+        f"{db_size(inline_path) / 2**20:.1f} MB inline, "
+        f"{sizes['none'] / 2**20:.1f} MB by hash, "
+        f"{sizes['zlib'] / 2**20:.1f} MB by hash with zlib"
+    )
+
+
+def bench_reads(tmp: str, pool: int, ops: int, rng):
+    database = Database(os.path.join(tmp, "reads.db"))
+    texts = TextStore(database, cache_size=pool)
+    keys = [texts.put(text) for text in paragraphs(pool, rng)]
+    order = [rng.choice(keys) for _ in range(ops)]
+    start = time.perf_counter()
+    for key in order:
+        texts.get(key)
+    hit = (time.perf_counter() - start) / ops * 1e6
+    cold = TextStore(database, cache_size=1)
+    start = time.perf_counter()
+    for key in order:
+        cold.get(key)
+    miss = (time.perf_counter() - start) / ops * 1e6
+    database.close()
+    print(f"reads: {hit:.2f} us from the LRU, {miss:.1f} us from SQLite + zlib")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=100_000)
+    parser.add_argument("--pool", type=int, default=1000)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--contexts", type=int, default=2000)
+    parser.add_argument("--intents", type=int, default=10)
+    parser.add_argument("--ops", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    world = bench_world(args.rooms, args.pool, rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_transcripts(tmp, world, args.sessions, args.turns, rng)
+        bench_generations(tmp, args.contexts, args.intents, args.pool, rng)
+        bench_reads(tmp, args.pool, args.ops, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Cost of animating a message: the old per-tick prefix vs. ``Typewriter``.
+
+Both sides produce the ``Content`` that ``Static.update`` would render each
+frame (the old renderer passed a markup string, which Static parses).
+Widget layout and painting are not included. Run with
+``python benchmarks/bench_typewriter.py [--chars N ...]``.
+"""
+
+import argparse
+import time
+
+from rich.text import Text
+from textual.content import Content
+
+from adventuregpt.tui import Typewriter, TypewriterLog
+
+SENTENCE = "You are in a [bold]maze[/bold] of twisty little passages, all alike. "
+
+
+def make_message(chars: int) -> str:
+    return (SENTENCE * (chars // len(SENTENCE) + 1))[:chars]
+
+
+def legacy(message: str) -> int:
+    # The old renderer: 1-3 characters per 20 ms tick, re-parsing the whole
+    # prefix every tick. It could not slice markup, so it only ever saw the
+    # plain text.
+    message = Text.from_markup(message).plain
+    chunk = 3 if len(message) > 100 else 1
+    frames = 0
+    for end in range(chunk, len(message) + chunk, chunk):
+        Content.from_markup(message[:end])
+        frames += 1
+    return frames
+
+
+def incremental(message: str) -> int:
+    typewriter = Typewriter(message)
+    rate = max(
+        TypewriterLog.CHARS_PER_SECOND, len(typewriter) / TypewriterLog.MAX_SECONDS
+    )
+    frames = 0
+    while not typewriter.done:
+        frames += 1
+        due = int(frames / TypewriterLog.FPS * rate) + 1
+        typewriter.advance(due - typewriter.position)
+    return frames
+
+
+def timed(fn, message: str):
+    start = time.perf_counter()
+    frames = fn(message)
+    return time.perf_counter() - start, frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chars", type=int, nargs="+", default=[200, 2000, 20000])
+    args = parser.parse_args()
+
+    print(
+        f"{'chars':>7} {'renderer':<12} {'frames':>7} {'total ms':>10} {'ns/char':>9}"
+    )
+    for chars in args.chars:
+        message = make_message(chars)
+        for name, fn in (("legacy", legacy), ("incremental", incremental)):
+            elapsed, frames = timed(fn, message)
+            print(
+                f"{chars:>7} {name:<12} {frames:>7} {elapsed * 1000:>10.2f}"
+                f" {elapsed * 1e9 / chars:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
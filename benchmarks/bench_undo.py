@@ -0,0 +1,55 @@
+"""Undo latency against game length, with and without checkpoints.
+
+Without checkpoints (only the new-game state is stored whole) an undo
+replays every event since the start; with them it replays at most
+``--checkpoint-every`` events whatever the length of the game.
+
+Run with ``python benchmarks/bench_undo.py [--checkpoint-every N]``.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from adventuregpt.engine import GameEngine
+
+TURNS = (100, 1000, 10000)
+UNDOS = 50
+
+
+def play(db_path: str, turns: int, checkpoint_every: int) -> float:
+    engine = GameEngine(
+        db_path=db_path, write_behind=True, checkpoint_every=checkpoint_every
+    )
+    engine.start_new_game()
+    for turn in range(turns):
+        engine.process_command("go in" if turn % 2 == 0 else "go out")
+    engine.flush()
+    start = time.perf_counter()
+    for _ in range(UNDOS):
+        engine.process_command("undo")
+        engine.process_command("redo")
+    elapsed = time.perf_counter() - start
+    engine.close()
+    return elapsed / (UNDOS * 2) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--checkpoint-every", type=int, default=20)
+    args = parser.parse_args()
+
+    print("Undo/redo latency (us)")
+    print(f"{'turns':>6} {'no checkpoints':>15} {'checkpoints':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for turns in TURNS:
+            full = play(os.path.join(tmp, f"full-{turns}.db"), turns, 10**9)
+            checkpointed = play(
+                os.path.join(tmp, f"cp-{turns}.db"), turns, args.checkpoint_every
+            )
+            print(f"{turns:>6} {full:>15.1f} {checkpointed:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Measure world startup: full parse/validate/compile vs. the on-disk cache.
+
+Run with ``python benchmarks/bench_world.py [--rooms N]``.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from synthetic import write_world
+
+from adventuregpt import world as world_module
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        # Drop the in-process memo so each run measures a real startup.
+        world_module._loaded.clear()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=500)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--flags", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_world(
+            os.path.join(tmp, "world.json"),
+            args.rooms,
+            items=args.items,
+            flags=args.flags,
+        )
+        cold = timed(lambda: world_module.load_world(path, use_cache=False))
+        world_module.load_world(path, cache_dir=tmp)  # populate the cache
+        warm = timed(lambda: world_module.load_world(path, cache_dir=tmp))
+
+    print(f"rooms={args.rooms} items={args.items} flags={args.flags}")
+    print(f"parse + validate + compile {cold * 1000:>9.2f} ms")
+    print(f"cached compiled world      {warm * 1000:>9.2f} ms  ({cold / warm:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Engine benchmark suite with regression gating.
+
+Runs each scenario in a fresh process on a synthetic world and records
+commands/sec, p99 latency and peak RSS to JSON. Given a baseline from an
+earlier run, exits with status 1 if any scenario got slower or bigger than
+the allowed margins, so a release can be gated on it:
+
+    python benchmarks/suite.py --save-baseline   # on the reference build
+    python benchmarks/suite.py                   # later: compare and gate
+
+Scenarios:
+    engine-{1k,10k,100k}  random walk (moves, look, inventory) through a
+                          world of that many rooms
+    engine-heavy          the same with 2,000 carried items and 20,000 set
+                          flags, saving each turn
+    storage-save-load     GameStorage save + load of a 2,000-item player
+    storage-flags         GameStorage flag writes and reads, 20,000 flags
+    tui-pilot             AdventureApp driven through Textual's pilot
+
+Run with ``python benchmarks/suite.py [--only NAME ...] [--quick]``.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+from synthetic import write_world
+
+from adventuregpt.engine import GameEngine
+from adventuregpt.loadgen import percentile
+from adventuregpt.models import Inventory, PlayerState
+from adventuregpt.storage import GameStorage
+from adventuregpt.world import CompiledWorld, load_world
+
+SUITE_VERSION = 1
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def _world(tmp: str, rooms: int, items: int = 0, flags: int = 0) -> CompiledWorld:
+    path = write_world(
+        os.path.join(tmp, "world.json"), rooms, items=items, flags=flags, seed=rooms
+    )
+    return load_world(path, cache_dir=tmp)
+
+
+def _walk(world: CompiledWorld, commands: int, seed: int = 0) -> List[str]:
+    """A random walk that mostly moves, with some looks and inventories."""
+    rng = random.Random(seed)
+    room = world.start
+    script = []
+    for _ in range(commands):
+        roll = rng.random()
+        exits = world.exits(room)
+        if roll < 0.15:
+            script.append("look")
+        elif roll < 0.2:
+            script.append("inventory")
+        elif roll < 0.25 or not exits:
+            script.append("go nowhere")
+        else:
+            direction = rng.choice(sorted(exits))
+            script.append(f"go {direction}")
+            room = world.index_of(exits[direction])
+    return script
+
+
+def _summary(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    return {
+        "commands": len(latencies),
+        "commands_per_sec": round(len(latencies) / elapsed, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 4),
+    }
+
+
+def _drive(engine: GameEngine, script: List[str]) -> Dict[str, float]:
+    latencies = []
+    start = time.perf_counter()
+    for command in script:
+        t0 = time.perf_counter()
+        engine.process_command(command)
+        latencies.append(time.perf_counter() - t0)
+    return _summary(latencies, time.perf_counter() - start)
+
+
+def engine_walk(tmp: str, rooms: int, commands: int = 20_000) -> Dict[str, float]:
+    world = _world(tmp, rooms)
+    engine = GameEngine(db_path=os.path.join(tmp, "game.db"), world=world)
+    engine.start_new_game()
+    try:
+        return _drive(engine, _walk(world, commands))
+    finally:
+        engine.close()
+
+
+def engine_heavy(
+    tmp: str, rooms: int = 1000, items: int = 2000, flags: int = 20_000
+) -> Dict[str, float]:
+    world = _world(tmp, rooms, flags=flags)
+    engine = GameEngine(db_path=os.path.join(tmp, "game.db"), world=world)
+    engine.start_new_game()
+    engine.state.inventory = Inventory([f"item_{i}" for i in range(items)])
+    engine.saves.save_player_state(engine.state)
+    for i in range(flags):
+        engine.set_world_flag(f"flag_{i}", i)
+    try:
+        return _drive(engine, _walk(world, 5000))
+    finally:
+        engine.close()
+
+
+def storage_save_load(tmp: str, items: int = 2000, ops: int = 2000):
+    storage = GameStorage(os.path.join(tmp, "game.db"))
+    state = PlayerState("start", Inventory([f"item_{i}" for i in range(items)]))
+    storage.new_game(state)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(ops):
+        t0 = time.perf_counter()
+        state.current_room = f"room_{i % 50}"
+        if i % 10 == 0:
+            state.inventory.add(f"extra_{i}")
+        storage.save_player_state(state)
+        storage.load_player_state()
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    storage.close()
+    return _summary(latencies, elapsed)
+
+
+def storage_flags(tmp: str, flags: int = 20_000):
+    storage = GameStorage(os.path.join(tmp, "game.db"))
+    storage.new_game(PlayerState("start"))
+    latencies = []
+    start = time.perf_counter()
+    for i in range(flags):
+        t0 = time.perf_counter()
+        storage.set_world_flag(f"flag_{i}", i)
+        storage.get_world_flag(f"flag_{i // 2}")
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    storage.close()
+    return _summary(latencies, elapsed)
+
+
+def tui_pilot(tmp: str, rooms: int = 1000, commands: int = 300):
+    from adventuregpt.tui import AdventureApp
+
+    class TimedApp(AdventureApp):
+        def log_message(self, message: str, animate: bool = True) -> None:
+            super().log_message(message, animate)
+            # Done once a screen refresh shows the response.
+            self.call_after_refresh(self.responded.set)
+
+    async def run():
+        world = _world(tmp, rooms)
+        engine = GameEngine(db_path=os.path.join(tmp, "game.db"), world=world)
+        app = TimedApp(engine, start_new=True)
+        app.responded = asyncio.Event()
+        latencies = []
+        async with app.run_test(size=(100, 40)):
+            await asyncio.wait_for(app.responded.wait(), 30)
+            command_input = app.query_one("#command_input")
+            start = time.perf_counter()
+            for command in _walk(world, commands):
+                app.responded.clear()
+                t0 = time.perf_counter()
+                command_input.value = command
+                await command_input.action_submit()
+                await asyncio.wait_for(app.responded.wait(), 30)
+                latencies.append(time.perf_counter() - t0)
+            elapsed = time.perf_counter() - start
+        engine.close()
+        return _summary(latencies, elapsed)
+
+    return asyncio.run(run())
+
+
+SCENARIOS: Dict[str, Tuple[Callable[..., Dict[str, float]], Dict[str, Any]]] = {
+    "engine-1k": (engine_walk, {"rooms": 1000}),
+    "engine-10k": (engine_walk, {"rooms": 10_000}),
+    "engine-100k": (engine_walk, {"rooms": 100_000}),
+    "engine-heavy": (engine_heavy, {}),
+    "storage-save-load": (storage_save_load, {}),
+    "storage-flags": (storage_flags, {}),
+    "tui-pilot": (tui_pilot, {}),
+}
+# Left out by --quick.
+SLOW_SCENARIOS = ("engine-100k",)
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_scenario(name: str) -> Dict[str, float]:
+    fn, params = SCENARIOS[name]
+    with tempfile.TemporaryDirectory(prefix="adventuregpt-bench-") as tmp:
+        result = fn(tmp, **params)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_isolated(name: str) -> Dict[str, float]:
+    # A fresh process per scenario, so peak RSS is the scenario's own.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(run_scenario, name).result()
+
+
+def best_of(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    return {
+        "commands": runs[0]["commands"],
+        "commands_per_sec": max(run["commands_per_sec"] for run in runs),
+        "p99_ms": min(run["p99_ms"] for run in runs),
+        "peak_rss_mb": min(run["peak_rss_mb"] for run in runs),
+    }
+
+
+def compare(
+    baseline: Dict[str, Any],
+    results: Dict[str, Dict[str, float]],
+    max_throughput_drop: float,
+    max_latency_rise: float,
+    max_rss_rise: float,
+) -> List[str]:
+    """Regressions of ``results`` against ``baseline``, one line each."""
+    failures = []
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        floor = base["commands_per_sec"] * (1 - max_throughput_drop)
+        if result["commands_per_sec"] < floor:
+            failures.append(
+                f"{name}: {result['commands_per_sec']} commands/sec, "
+                f"baseline {base['commands_per_sec']} (allowed >= {floor:.1f})"
+            )
+        ceiling = base["p99_ms"] * (1 + max_latency_rise)
+        if result["p99_ms"] > ceiling:
+            failures.append(
+                f"{name}: p99 {result['p99_ms']} ms, "
+                f"baseline {base['p99_ms']} (allowed <= {ceiling:.4f})"
+            )
+        ceiling = base["peak_rss_mb"] * (1 + max_rss_rise)
+        if result["peak_rss_mb"] > ceiling:
+            failures.append(
+                f"{name}: peak RSS {result['peak_rss_mb']} MB, "
+                f"baseline {base['peak_rss_mb']} (allowed <= {ceiling:.1f})"
+            )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS))
+    parser.add_argument("--quick", action="store_true", help="Skip 100k rooms.")
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="Runs per scenario; keep the best."
+    )
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Write the results as the new baseline instead of comparing.",
+    )
+    parser.add_argument("--out", help="Also write the results to this JSON file.")
+    parser.add_argument("--max-throughput-drop", type=float, default=0.25)
+    parser.add_argument("--max-latency-rise", type=float, default=0.5)
+    parser.add_argument("--max-rss-rise", type=float, default=0.25)
+    args = parser.parse_args()
+
+    names = args.only or [
+        name for name in SCENARIOS if not (args.quick and name in SLOW_SCENARIOS)
+    ]
+    results = {}
+    print(f"{'scenario':>18} {'commands/s':>11} {'p99':>10} {'peak RSS':>9}")
+    for name in names:
+        result = best_of([run_isolated(name) for _ in range(args.repeat)])
+        results[name] = result
+        print(
+            f"{name:>18} {result['commands_per_sec']:>11.1f} "
+            f"{result['p99_ms']:>8.3f}ms {result['peak_rss_mb']:>7.1f}MB"
+        )
+
+    report = {
+        "version": SUITE_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("version") != SUITE_VERSION:
+        print("Baseline is from another suite version; not comparing.")
+        return
+    failures = compare(
+        baseline,
+        results,
+        args.max_throughput_drop,
+        args.max_latency_rise,
+        args.max_rss_rise,
+    )
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"No regressions against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
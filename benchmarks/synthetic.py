@@ -0,0 +1,83 @@
+"""Synthetic world generation shared by the benchmark scripts."""
+
+import json
+import random
+from typing import Any, Dict
+
+DIRECTIONS = ("north", "south", "east", "west", "up", "down", "in", "out")
+OPPOSITE = {
+    "north": "south",
+    "south": "north",
+    "east": "west",
+    "west": "east",
+    "up": "down",
+    "down": "up",
+    "in": "out",
+    "out": "in",
+}
+
+
+def make_world(
+    rooms: int, items: int = 0, flags: int = 0, seed: int = 0
+) -> Dict[str, Any]:
+    """Build a connected world definition with ``rooms`` rooms.
+
+    Rooms form a random spanning tree of two-way exits, plus a sprinkling of
+    one-way shortcuts so the graph is not a pure tree.
+    """
+    rng = random.Random(seed)
+    room_ids = [f"room_{i}" for i in range(rooms)]
+    room_ids[0] = "start"
+    data = {
+        room_id: {
+            "description": f"You are in {room_id.replace('_', ' ')}. "
+            + rng.choice(
+                [
+                    "Water drips from the ceiling.",
+                    "A cold wind blows through the passage.",
+                    "The walls are covered in strange markings.",
+                    "It is very dark here.",
+                ]
+            ),
+            "exits": {},
+            "items": [],
+        }
+        for room_id in room_ids
+    }
+
+    for i in range(1, rooms):
+        # Attach each room to an earlier one through a free direction pair.
+        for _ in range(32):
+            parent = room_ids[rng.randrange(i)]
+            free = [
+                d
+                for d in DIRECTIONS
+                if d not in data[parent]["exits"]
+                and OPPOSITE[d] not in data[room_ids[i]]["exits"]
+            ]
+            if free:
+                direction = rng.choice(free)
+                data[parent]["exits"][direction] = room_ids[i]
+                data[room_ids[i]]["exits"][OPPOSITE[direction]] = parent
+                break
+
+    for _ in range(rooms // 10):
+        a, b = rng.sample(room_ids, 2) if rooms > 1 else (room_ids[0], room_ids[0])
+        free = [d for d in DIRECTIONS if d not in data[a]["exits"]]
+        if free:
+            data[a]["exits"][rng.choice(free)] = b
+
+    for i in range(items):
+        data[rng.choice(room_ids)]["items"].append(f"item_{i}")
+
+    return {
+        "start": "start",
+        "rooms": data,
+        "flags": {f"flag_{i}": False for i in range(flags)},
+    }
+
+
+def write_world(path: str, rooms: int, **kwargs) -> str:
+    with open(path, "w") as f:
+        json.dump(make_world(rooms, **kwargs), f)
+    return path
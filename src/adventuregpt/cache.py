@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Bumped whenever what a cached response depends on changes, so a cache
+# persisted by an older version is ignored.
+CACHE_VERSION = 1
+
+
+def flag_hash(key: str, value: Any) -> int:
+    """Hash of one world flag. XOR-ing these gives a digest of all flags that
+    can be updated one flag at a time; unset (None) flags contribute nothing."""
+    if value is None:
+        return 0
+    raw = json.dumps([key, value], sort_keys=True).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "big")
+
+
+def flags_digest(flags: Dict[str, Any]) -> int:
+    digest = 0
+    for key, value in flags.items():
+        digest ^= flag_hash(key, value)
+    return digest
+
+
+def state_key(world: str, room: str, items: Iterable[str], flags: int) -> str:
+    """Fingerprint of everything a deterministic response depends on.
+
+    Stable across runs (unlike ``hash()``), so it can key a persisted cache.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(world.encode("utf-8"))
+    h.update(b"\0")
+    h.update(room.encode("utf-8"))
+    for item in items:
+        h.update(b"\0")
+        h.update(item.encode("utf-8"))
+    h.update(flags.to_bytes(8, "big"))
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """LRU of responses to deterministic commands, keyed by state fingerprint.
+
+    Keys are ``(state_key, command)`` pairs. Because the fingerprint covers
+    the room, inventory and world flags, any change to them simply stops
+    old entries from matching; they age out of the LRU. With ``path`` the
+    cache is loaded from and saved to that file.
+    """
+
+    def __init__(self, capacity: int = 1024, path: Optional[str] = None):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.path = path
+        self._entries: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path:
+            self._load(path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, command: str) -> Optional[str]:
+        response = self._entries.get((key, command))
+        if response is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end((key, command))
+        self.hits += 1
+        return response
+
+    def put(self, key: str, command: str, response: str):
+        self._entries[(key, command)] = response
+        self._entries.move_to_end((key, command))
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _load(self, path: str):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data["version"] != CACHE_VERSION:
+                return
+            entries = [
+                ((key, command), response) for key, command, response in data["entries"]
+            ]
+        except Exception:
+            # A missing, stale or corrupt cache just starts empty.
+            return
+        # Oldest first, so the most recently used entries survive a smaller
+        # capacity.
+        for key, response in entries[-self.capacity :]:
+            self._entries[key] = response
+
+    def save(self):
+        if not self.path:
+            return
+        data = {
+            "version": CACHE_VERSION,
+            "entries": [
+                [key, command, response]
+                for (key, command), response in self._entries.items()
+            ],
+        }
+        # Write to a temporary file first so a crash never leaves a
+        # partially written cache behind.
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
@@ -0,0 +1,241 @@
+import operator
+import re
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Tuple
+
+# A compiled condition reads flags from a plain dict.
+Test = Callable[[Dict[str, Any]], Any]
+
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<string>'[^']*'|"[^"]*")
+      | (?P<op>==|!=|<=|>=|<|>|\(|\))
+      | (?P<name>[A-Za-z_][\w.]*)
+    )""",
+    re.VERBOSE,
+)
+_CONSTANTS = {"true": True, "false": False, "null": None}
+_KEYWORDS = {"and", "or", "not", *_CONSTANTS}
+_COMPARISONS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+# Conditions compiled in this process, by source. Compiled conditions are
+# immutable, so every world that uses the same text shares one.
+_compiled: Dict[str, "Condition"] = {}
+# Per world digest, like the parser's tries.
+_world_conditions: Dict[str, "ConditionSet"] = {}
+
+
+class ConditionError(ValueError):
+    pass
+
+
+class Condition(NamedTuple):
+    source: str
+    # Flags the condition reads; it only needs re-evaluating when one changes.
+    flags: FrozenSet[str]
+    test: Test
+
+    def __call__(self, flags: Dict[str, Any]) -> bool:
+        return bool(self.test(flags))
+
+
+def _tokenize(source: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    source = source.rstrip()
+    while position < len(source):
+        match = _TOKEN.match(source, position)
+        if match is None:
+            raise ConditionError(
+                f"Unexpected {source[position:].strip()[:1]!r} in condition {source!r}"
+            )
+        tokens.append((match.lastgroup, match.group(match.lastgroup)))
+        position = match.end()
+    return tokens
+
+
+class _Compiler:
+    """Recursive descent over the token list, building closures.
+
+    Grammar, loosest first: ``or``, ``and``, ``not``, a comparison
+    (``== != < <= > >=``) and an atom (a flag name, a number, a quoted
+    string, ``true``/``false``/``null`` or a parenthesised condition).
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.tokens = _tokenize(source)
+        self.position = 0
+        self.flags = set()
+
+    def _peek(self) -> Tuple[str, str]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return ("end", "")
+
+    def _take(self) -> Tuple[str, str]:
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def _error(self, token: Tuple[str, str]) -> ConditionError:
+        found = repr(token[1]) if token[0] != "end" else "end"
+        return ConditionError(f"Unexpected {found} in condition {self.source!r}")
+
+    def compile(self) -> Condition:
+        if not self.tokens:
+            raise ConditionError("Empty condition")
+        test = self._or()
+        if self._peek()[0] != "end":
+            raise self._error(self._peek())
+        return Condition(self.source, frozenset(self.flags), test)
+
+    def _or(self) -> Test:
+        tests = [self._and()]
+        while self._peek() == ("name", "or"):
+            self._take()
+            tests.append(self._and())
+        if len(tests) == 1:
+            return tests[0]
+        if len(tests) == 2:
+            first, second = tests
+            return lambda flags: first(flags) or second(flags)
+        return lambda flags: any(test(flags) for test in tests)
+
+    def _and(self) -> Test:
+        tests = [self._not()]
+        while self._peek() == ("name", "and"):
+            self._take()
+            tests.append(self._not())
+        if len(tests) == 1:
+            return tests[0]
+        if len(tests) == 2:
+            first, second = tests
+            return lambda flags: first(flags) and second(flags)
+        return lambda flags: all(test(flags) for test in tests)
+
+    def _not(self) -> Test:
+        if self._peek() == ("name", "not"):
+            self._take()
+            test = self._not()
+            return lambda flags: not test(flags)
+        return self._comparison()
+
+    def _comparison(self) -> Test:
+        left = self._atom()
+        kind, text = self._peek()
+        if kind != "op" or text not in _COMPARISONS:
+            return left
+        self._take()
+        right = self._atom()
+        compare = _COMPARISONS[text]
+
+        def test(flags):
+            try:
+                return compare(left(flags), right(flags))
+            except TypeError:
+                # An unset flag (None) is neither less nor greater than 3.
+                return False
+
+        return test
+
+    def _atom(self) -> Test:
+        token = self._take()
+        kind, text = token
+        if token == ("op", "("):
+            test = self._or()
+            if self._take() != ("op", ")"):
+                raise ConditionError(f"Missing ')' in condition {self.source!r}")
+            return test
+        if kind == "number":
+            value = float(text) if "." in text else int(text)
+            return lambda flags: value
+        if kind == "string":
+            value = text[1:-1]
+            return lambda flags: value
+        if kind == "name" and text in _CONSTANTS:
+            value = _CONSTANTS[text]
+            return lambda flags: value
+        if kind == "name" and text not in _KEYWORDS:
+            self.flags.add(text)
+            return lambda flags: flags.get(text)
+        raise self._error(token)
+
+
+def compile_condition(source: str) -> Condition:
+    """Compile a condition such as ``"grate_open and not troll_present"`` or
+    ``"water_level >= 3"``. A bare flag is true if it is set and truthy."""
+    condition = _compiled.get(source)
+    if condition is None:
+        condition = _compiled[source] = _Compiler(source).compile()
+    return condition
+
+
+class ConditionSet:
+    """A world's conditions, with a reverse index from flag to the
+    conditions that read it."""
+
+    def __init__(self, sources: Iterable[str]):
+        self.conditions: Dict[str, Condition] = {
+            source: compile_condition(source) for source in sources
+        }
+        index: Dict[str, List[Condition]] = {}
+        for condition in self.conditions.values():
+            for flag in condition.flags:
+                index.setdefault(flag, []).append(condition)
+        self.dependents: Dict[str, Tuple[Condition, ...]] = {
+            flag: tuple(dependents) for flag, dependents in index.items()
+        }
+
+    @classmethod
+    def for_world(cls, world) -> "ConditionSet":
+        if not world.digest:
+            return cls(world.conditions())
+        conditions = _world_conditions.get(world.digest)
+        if conditions is None:
+            conditions = _world_conditions[world.digest] = cls(world.conditions())
+        return conditions
+
+    def bind(self, flags: Dict[str, Any]) -> "FlagState":
+        return FlagState(self, flags)
+
+
+class FlagState:
+    """One session's world flags, held in memory, and the truth of every
+    condition over them.
+
+    ``set`` re-evaluates only the conditions that read the flag, so checking
+    a condition is a dict lookup.
+    """
+
+    def __init__(self, conditions: ConditionSet, flags: Dict[str, Any]):
+        self.conditions = conditions
+        self.flags = dict(flags)
+        self.truth: Dict[str, bool] = {
+            source: condition(self.flags)
+            for source, condition in conditions.conditions.items()
+        }
+        self.evaluations = len(self.truth)
+
+    def get(self, key: str) -> Any:
+        return self.flags.get(key)
+
+    def set(self, key: str, value: Any):
+        self.flags[key] = value
+        for condition in self.conditions.dependents.get(key, ()):
+            self.truth[condition.source] = condition(self.flags)
+            self.evaluations += 1
+
+    def holds(self, source: str) -> bool:
+        truth = self.truth.get(source)
+        if truth is None:
+            # Not one of the world's conditions: evaluate it on the spot.
+            return compile_condition(source)(self.flags)
+        return truth
@@ -1,81 +1,586 @@
-from typing import Dict, List, Optional
+import asyncio
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from .models import Inventory, PlayerState, Room
-from .storage import GameStorage
+from .cache import ResponseCache, flag_hash, flags_digest, state_key
+from .conditions import ConditionSet, FlagState
+from .knowledge import KnowledgeGraph
+from .llm import LLMClient, LLMError, Prompt
+from .metrics import Metrics, Profiler
+from .models import Inventory, PlayerState
+from .parser import Command, CommandParser
+from .scheduler import Scheduler
+from .semantic import SemanticCache
+from .storage import Event, GameStorage, SaveJournal, checkpoint_event
+from .world import CompiledWorld, load_world
+
+UNKNOWN_COMMAND = "I don't understand that command."
+
+# Verbs whose response depends only on the room, inventory and world flags.
+# A move is only cached when it fails (a successful one changes the state).
+CACHEABLE_VERBS = frozenset(("look", "inventory", "go"))
+# Verbs that take game time, so the scheduler ticks after them. Saves,
+# loads, undo and the like happen outside the game world.
+WORLD_VERBS = frozenset(("look", "inventory", "go"))
 
 
 class GameEngine:
-    def __init__(self, db_path: Optional[str] = None):
-        self.storage = GameStorage(db_path)
-        self.state = PlayerState()
-        # Initialize rooms data as Pydantic models (could be loaded from a file later)
-        self.rooms: Dict[str, Room] = {
-            "start": Room(
-                description="You are standing at the end of a road before a small brick building.",
-                exits={"north": "building", "in": "building"},
-            ),
-            "building": Room(
-                description="You are inside a building, a well house for a large spring.",
-                exits={"south": "start", "out": "start"},
-            ),
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        write_behind: bool = False,
+        flush_every: int = 50,
+        flush_interval_ms: int = 2000,
+        world_path: Optional[str] = None,
+        world: Optional[CompiledWorld] = None,
+        storage: Optional[GameStorage] = None,
+        checkpoint_every: int = 20,
+        history_limit: Optional[int] = None,
+        response_cache: Optional[ResponseCache] = None,
+        llm: Optional[LLMClient] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        knowledge: Optional[KnowledgeGraph] = None,
+        metrics: Optional[Metrics] = None,
+        scheduler: Optional[Scheduler] = None,
+    ):
+        if checkpoint_every < 1:
+            raise ValueError("checkpoint_every must be at least 1")
+        if history_limit is not None and history_limit < 0:
+            raise ValueError("history_limit must not be negative")
+        self.storage = storage or GameStorage(db_path)
+        # With write-behind enabled, saves go through a journal that batches
+        # them; otherwise every save is written straight to storage.
+        self.journal: Optional[SaveJournal] = None
+        if write_behind:
+            self.journal = SaveJournal(
+                self.storage,
+                flush_every=flush_every,
+                flush_interval_ms=flush_interval_ms,
+            )
+        self.saves = self.journal or self.storage
+        # Every state change is appended to the event log, with the whole
+        # state every `checkpoint_every` turns so undo only replays from the
+        # last checkpoint. With `history_limit`, turns further back than that
+        # are compacted away at each checkpoint.
+        self.checkpoint_every = checkpoint_every
+        self.history_limit = history_limit
+        self.turn = 0
+        self.response_cache = response_cache
+        # Commands the parser does not understand go to the LLM, if any.
+        self.llm = llm
+        # Its replies are cached per scene, shared by every engine using
+        # the same cache, so paraphrased commands are not regenerated.
+        self.semantic_cache = semantic_cache
+        # Facts within two hops of the room are added to every prompt.
+        self.knowledge = knowledge
+        # Opt-in per-verb timings; the storage's database reports into the
+        # same Metrics.
+        self.metrics = metrics
+        if metrics is not None:
+            self.storage.database.instrument(metrics)
+        # NPCs and timed events, ticked once per in-world command. Its state
+        # lives in memory only: it is not saved, and undo does not rewind it.
+        self.scheduler = scheduler
+        # All world flags (the world's defaults under the saved ones), loaded
+        # on first use and kept up to date by set_world_flag, with the truth
+        # of every condition and a digest. Reloaded lazily after anything
+        # that replaces the flags.
+        self._flag_state: Optional[FlagState] = None
+        self._flags_digest = 0
+        self._fingerprint: Optional[Tuple[str, Inventory, int, int, str]] = None
+        # Compiled once per world file and cached on disk, so engines after
+        # the first skip parsing and validation entirely.
+        self.world = world or load_world(world_path)
+        if scheduler is not None and scheduler.world.digest != self.world.digest:
+            raise ValueError("scheduler is for a different world")
+        self.state = PlayerState(current_room=self.world.start_room)
+        self.parser = CommandParser.for_world(self.world)
+        # Canonical verb -> handler; the parser resolves aliases and prefixes.
+        self.handlers: Dict[str, Callable[[Command], str]] = {
+            "quit": self._cmd_quit,
+            "look": self._cmd_look,
+            "go": self._cmd_go,
+            "inventory": self._cmd_inventory,
+            "quicksave": self._cmd_quicksave,
+            "quickload": self._cmd_quickload,
+            "save": self._cmd_save,
+            "load": self._cmd_load,
+            "branch": self._cmd_branch,
+            "saves": self._cmd_saves,
+            "undo": self._cmd_undo,
+            "redo": self._cmd_redo,
+            "rewind": self._cmd_rewind,
         }
 
+    def flush(self):
+        if self.journal:
+            self.journal.flush()
+
+    def flush_if_due(self) -> bool:
+        if self.journal:
+            return self.journal.flush_if_due()
+        return False
+
+    def close(self):
+        self.flush()
+        self.storage.close()
+
     def start_new_game(self):
-        self.state = PlayerState()  # Reset state
-        self.storage.new_game(self.state)
+        self.state = PlayerState(current_room=self.world.start_room)  # Reset state
+        self.saves.new_game(self.state)
+        self.turn = 0
+        self._flag_state = None
         return self._get_room_description()
 
     def resume_game(self):
-        loaded_state = self.storage.load_player_state()
+        loaded_state = self.saves.load_player_state()
         if loaded_state:
             self.state = loaded_state
+            self.turn = self.storage.turn()
+            self._flag_state = None
+            if not self.storage.has_history():
+                # A save from before the event log: start it here.
+                self.storage.record_events(
+                    [checkpoint_event(self.turn, "resume", self.state)]
+                )
             return self._get_room_description()
         else:
             return self.start_new_game()
 
-    def process_command(self, command: str) -> str:
-        parts = command.lower().strip().split()
-        if not parts:
+    def save_slot(self, name: str) -> str:
+        # Slots share flags with the live game, so pending saves go first.
+        self.flush()
+        self.storage.save_slot(name, self.state)
+        return f"Saved as '{name}'."
+
+    def load_slot(self, name: str) -> str:
+        self._discard_unsaved()
+        state = self.storage.load_slot(name)
+        if state is None:
+            return f"There is no save called '{name}'."
+        self.state = state
+        self._flag_state = None
+        self._record(f"load {name}")
+        return f"Loaded '{name}'.\n\n{self._get_room_description()}"
+
+    def branch_slot(self, source: str, name: str) -> str:
+        try:
+            self.storage.branch_slot(source, name)
+        except KeyError:
+            return f"There is no save called '{source}'."
+        except ValueError:
+            return f"There is already a save called '{name}'."
+        return f"Branched '{source}' as '{name}'."
+
+    def list_slots(self) -> str:
+        slots = self.storage.list_slots()
+        if not slots:
+            return "There are no saves yet."
+        return "\n".join(f"{slot.name}: {slot.current_room}" for slot in slots)
+
+    def set_world_flag(self, key: str, value: Any):
+        flags = self.flags()
+        self._flags_digest ^= flag_hash(key, flags.get(key)) ^ flag_hash(key, value)
+        flags.set(key, value)
+        self.saves.set_world_flag(key, value)
+
+    def flags(self) -> FlagState:
+        """The world flags, read from storage once and then kept in memory."""
+        if self._flag_state is None:
+            # world_flags() only sees what has been written.
+            self.flush()
+            flags = self.world.flags()
+            flags.update(self.storage.world_flags())
+            self._flag_state = ConditionSet.for_world(self.world).bind(flags)
+            self._flags_digest = flags_digest(flags)
+        return self._flag_state
+
+    def _current_flags_digest(self) -> int:
+        self.flags()
+        return self._flags_digest
+
+    def visible_items(self) -> List[str]:
+        """Items placed in the current room that can be seen right now."""
+        room = self.world.index_of(self.state.current_room)
+        if room is None:
+            return []
+        items = self.world.room_items[room]
+        hidden = self.world.item_conditions
+        if not hidden:
+            return list(items)
+        flags = self.flags()
+        return [
+            item for item in items if item not in hidden or flags.holds(hidden[item])
+        ]
+
+    def state_key(self) -> str:
+        """Fingerprint of the room, inventory and flags; see cache.state_key."""
+        self._current_flags_digest()
+        room = self.state.current_room
+        inventory = self.state.inventory
+        memo = self._fingerprint
+        if (
+            memo is None
+            or memo[0] != room
+            or memo[1] is not inventory
+            or memo[2] != inventory.version
+            or memo[3] != self._flags_digest
+        ):
+            key = state_key(
+                self.world.digest, room, inventory.items, self._flags_digest
+            )
+            memo = self._fingerprint = (
+                room,
+                inventory,
+                inventory.version,
+                self._flags_digest,
+                key,
+            )
+        return memo[4]
+
+    def scene_key(self) -> str:
+        """Fingerprint of the room and flags, which generated text is cached
+        under. The inventory is left out so players in the same scene share
+        entries."""
+        return state_key(
+            self.world.digest, self.state.current_room, (), self._current_flags_digest()
+        )
+
+    def rewind(self, turn: int) -> bool:
+        """Go back (or forward again) to the state after ``turn``."""
+        self.flush()
+        if turn < 0:
+            return False
+        state = self.storage.rewind(turn)
+        if state is None:
+            return False
+        self.state = state
+        self.turn = turn
+        return True
+
+    def _record(self, command: str, *fields: str):
+        """Log the state change ``command`` made; no fields means all of them."""
+        self.turn += 1
+        if not fields or self.turn % self.checkpoint_every == 0:
+            event = checkpoint_event(self.turn, command, self.state)
+        else:
+            data: Dict[str, Any] = {}
+            if "room" in fields:
+                data["room"] = self.state.current_room
+            if "inventory" in fields:
+                data["inventory"] = self.state.inventory.items
+            event = Event(self.turn, command, data)
+        if self.journal:
+            self.journal.record_event(event)
+        else:
+            self.storage.record_events([event])
+        if event.checkpoint and self.history_limit is not None:
+            self.storage.compact(self.turn - self.history_limit)
+
+    def _discard_unsaved(self):
+        if self.journal:
+            # Unsaved progress is about to be replaced anyway.
+            self.journal.discard()
+            self.turn = self.storage.turn()
+
+    def prompt(self, command: str) -> Prompt:
+        room = self.state.current_room
+        facts = ()
+        if self.knowledge is not None:
+            facts = tuple(self.knowledge.around(room, 2))
+        return Prompt(
+            room=room,
+            description=self._get_room_description(),
+            inventory=tuple(self.state.inventory.items),
+            command=command.strip(),
+            facts=facts,
+        )
+
+    def wants_llm(self, command: str) -> bool:
+        """True if ``command`` would be answered by the LLM."""
+        return (
+            self.llm is not None
+            and bool(command.strip())
+            and self.parser.parse(command).verb is None
+        )
+
+    def narrate(
+        self, command: str, on_token: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Answer an unparsed command with the LLM, blocking until it is done.
+
+        ``on_token`` is called with each token as it arrives. If the backend
+        fails or times out, whatever arrived is kept, or the parser's usual
+        reply is given if nothing did.
+        """
+        cache = self.semantic_cache
+        if cache is not None:
+            context = self.scene_key()
+            text = cache.get(context, command)
+            if text is not None:
+                if on_token is not None:
+                    on_token(text)
+                return text
+        parts: List[str] = []
+        try:
+            for token in self.llm.stream_sync(self.prompt(command)):
+                parts.append(token)
+                if on_token is not None:
+                    on_token(token)
+        except LLMError:
+            # Partial replies are shown but never cached.
+            return "".join(parts) or UNKNOWN_COMMAND
+        text = "".join(parts)
+        if cache is not None and text:
+            cache.put(context, command, text)
+        return text or UNKNOWN_COMMAND
+
+    async def narrate_async(self, command: str) -> str:
+        """``narrate`` for callers on an event loop."""
+        if self.metrics is None:
+            return self._tick(await self._narrate_async(command))
+        start = time.perf_counter()
+        try:
+            response = await self._narrate_async(command)
+        finally:
+            self.metrics.observe("dispatch.llm", time.perf_counter() - start)
+        return self._tick(response)
+
+    async def _narrate_async(self, command: str) -> str:
+        cache = self.semantic_cache
+        if cache is not None:
+            context = self.scene_key()
+            text = cache.get(context, command)
+            if text is not None:
+                return text
+        try:
+            text = await self.llm.complete(self.prompt(command))
+        except LLMError:
+            return UNKNOWN_COMMAND
+        if cache is not None and text:
+            cache.put(context, command, text)
+        return text or UNKNOWN_COMMAND
+
+    def process_command(
+        self, command: str, on_token: Optional[Callable[[str], None]] = None
+    ) -> str:
+        if self.metrics is not None:
+            return self._timed_command(command, on_token)
+        return self._process_command(command, on_token)
+
+    def _timed_command(
+        self, command: str, on_token: Optional[Callable[[str], None]]
+    ) -> str:
+        start = time.perf_counter()
+        verb = self.parser.parse(command).verb
+        parsed = time.perf_counter()
+        # Parses again, which the parser's cache makes a lookup.
+        response = self._process_command(command, on_token)
+        done = time.perf_counter()
+        if verb is None:
+            verb = "llm" if self.wants_llm(command) else "unknown"
+        self.metrics.observe(f"parse.{verb}", parsed - start)
+        self.metrics.observe(f"dispatch.{verb}", done - parsed)
+        return response
+
+    def _process_command(
+        self, command: str, on_token: Optional[Callable[[str], None]] = None
+    ) -> str:
+        if self.wants_llm(command):
+            response = self.narrate(command, on_token)
+            # The fallback reply is returned, not streamed, and so is all
+            # that follows it.
+            if response is UNKNOWN_COMMAND:
+                on_token = None
+            return self._tick(response, on_token)
+        response = self._dispatch(command)
+        if self.journal:
+            self.journal.record_command()
+        if (
+            self.scheduler is not None
+            and self.parser.parse(command).verb in WORLD_VERBS
+        ):
+            response = self._tick(response)
+        return response
+
+    def _tick(
+        self, response: str, on_token: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Advance the scheduler one tick and add what the player saw."""
+        scheduler = self.scheduler
+        if scheduler is None:
+            return response
+        room = self.world.index_of(self.state.current_room)
+        if self.metrics is None:
+            messages = scheduler.tick(room)
+        else:
+            with self.metrics.timer("world.tick"):
+                messages = scheduler.tick(room)
+        if not messages:
+            return response
+        seen = "\n\n" + "\n".join(messages)
+        if on_token is not None:
+            on_token(seen)
+        return response + seen
+
+    def _dispatch(self, command: str) -> str:
+        if not command.strip():
             return "Please say something."
 
-        verb = parts[0]
+        parsed = self.parser.parse(command)
+        handler = self.handlers.get(parsed.verb)
+        if handler is None:
+            return UNKNOWN_COMMAND
+        cache = self.response_cache
+        if cache is None or parsed.verb not in CACHEABLE_VERBS:
+            return handler(parsed)
 
-        if verb in ["quit", "exit"]:
-            return "Goodbye!"
+        key = self.state_key()
+        request = f"{parsed.verb} {parsed.noun or ''}"
+        response = cache.get(key, request)
+        if response is None:
+            response = handler(parsed)
+            if self.state_key() == key:
+                cache.put(key, request, response)
+        return response
 
-        if verb in ["look", "l"]:
-            return self._get_room_description()
+    def _cmd_quit(self, command: Command) -> str:
+        return "Goodbye!"
+
+    def _cmd_look(self, command: Command) -> str:
+        return self._get_room_description()
+
+    def _cmd_go(self, command: Command) -> str:
+        if command.noun is None:
+            return "Where do you want to go?"
+        return self._move(command.noun)
+
+    def _cmd_inventory(self, command: Command) -> str:
+        if not self.state.inventory.items:
+            return "You are not carrying anything."
+        return f"You are carrying: {', '.join(self.state.inventory.items)}"
+
+    def _cmd_quicksave(self, command: Command) -> str:
+        # The snapshot reads flags from storage, so pending saves go first.
+        self.flush()
+        self.storage.quick_save(self.state)
+        return "Game saved."
+
+    def _cmd_quickload(self, command: Command) -> str:
+        self._discard_unsaved()
+        state = self.storage.quick_load()
+        if state is None:
+            return "There is no quick save."
+        self.state = state
+        self._flag_state = None
+        self._record("quickload")
+        return f"Game loaded.\n\n{self._get_room_description()}"
+
+    def _cmd_save(self, command: Command) -> str:
+        if not command.rest:
+            return "Save under what name?"
+        return self.save_slot(" ".join(command.rest))
+
+    def _cmd_load(self, command: Command) -> str:
+        if not command.rest:
+            return "Load which save?"
+        return self.load_slot(" ".join(command.rest))
+
+    def _cmd_branch(self, command: Command) -> str:
+        if len(command.rest) != 2:
+            return "Usage: branch <save> <new save>"
+        return self.branch_slot(*command.rest)
 
-        if verb in ["go", "move", "walk"] and len(parts) > 1:
-            direction = parts[1]
-            return self._move(direction)
+    def _cmd_saves(self, command: Command) -> str:
+        return self.list_slots()
 
-        # Simplified movement: just the direction
-        if verb in ["north", "south", "east", "west", "up", "down", "in", "out"]:
-            return self._move(verb)
+    def _cmd_undo(self, command: Command) -> str:
+        if not self.rewind(self.turn - 1):
+            return "There is nothing to undo."
+        return f"Undone.\n\n{self._get_room_description()}"
 
-        if verb == "inventory":
-            if not self.state.inventory.items:
-                return "You are not carrying anything."
-            return f"You are carrying: {', '.join(self.state.inventory.items)}"
+    def _cmd_redo(self, command: Command) -> str:
+        if not self.rewind(self.turn + 1):
+            return "There is nothing to redo."
+        return f"Redone.\n\n{self._get_room_description()}"
 
-        return "I don't understand that command."
+    def _cmd_rewind(self, command: Command) -> str:
+        if len(command.rest) != 1 or not command.rest[0].isdigit():
+            return f"Rewind to which turn? This is turn {self.turn}."
+        turn = int(command.rest[0])
+        if not self.rewind(turn):
+            return f"Turn {turn} is not in the history."
+        return f"Back at turn {turn}.\n\n{self._get_room_description()}"
 
     def _move(self, direction: str) -> str:
-        room_data = self.rooms.get(self.state.current_room)
-        if not room_data:
+        room = self.world.index_of(self.state.current_room)
+        if room is None:
             return "Error: You are in limbo."
 
-        exits = room_data.exits
-        if direction in exits:
-            self.state.current_room = exits[direction]
-            self.storage.save_player_state(self.state)
-            return self._get_room_description()
-        else:
+        slot = self.world.exit_slot(room, direction)
+        if slot is None:
             return "You can't go that way."
+        when = self.world.exit_conditions.get(slot)
+        if when is not None and not self.flags().holds(when):
+            return self.world.exit_messages.get(slot, "You can't go that way.")
+        self.state.current_room = self.world.room_ids[self.world.exit_targets[slot]]
+        self.saves.save_player_state(self.state)
+        self._record(f"go {direction}", "room")
+        return self._get_room_description()
 
     def _get_room_description(self) -> str:
-        room_data = self.rooms.get(self.state.current_room)
-        if room_data:
-            return room_data.description
-        return "You are lost in the void."
+        room = self.world.index_of(self.state.current_room)
+        if room is None:
+            return "You are lost in the void."
+        variants = self.world.room_variants.get(room)
+        if variants:
+            flags = self.flags()
+            for when, description in variants:
+                if flags.holds(when):
+                    return description
+        return self.world.description(room)
+
+
+class AsyncEngine:
+    """Runs a GameEngine's blocking calls on a single worker thread.
+
+    Storage I/O (and, later, model calls) then never blocks the caller's
+    event loop. With one thread, calls run strictly in submission order and
+    the engine is never used from two threads at once.
+    """
+
+    def __init__(self, engine: GameEngine, profiler: Optional[Profiler] = None):
+        self.engine = engine
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="adventuregpt-engine"
+        )
+        # cProfile only sees the thread that enabled it.
+        self.profiler = profiler
+        if profiler is not None:
+            self._executor.submit(profiler.enable)
+
+    def submit(self, fn: Callable[..., Any], *args) -> Future:
+        return self._executor.submit(fn, *args)
+
+    async def call(self, fn: Callable[..., Any], *args) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    async def process_command(
+        self, command: str, on_token: Optional[Callable[[str], None]] = None
+    ) -> str:
+        # on_token is called on the worker thread.
+        return await self.call(self.engine.process_command, command, on_token)
+
+    async def start_new_game(self) -> str:
+        return await self.call(self.engine.start_new_game)
+
+    async def resume_game(self) -> str:
+        return await self.call(self.engine.resume_game)
+
+    def close(self):
+        # Let queued commands finish, then flush on the worker thread.
+        self._executor.submit(self.engine.flush)
+        if self.profiler is not None:
+            self._executor.submit(self.profiler.disable)
+        self._executor.shutdown(wait=True)
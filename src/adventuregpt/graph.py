@@ -0,0 +1,153 @@
+from array import array
+from collections import OrderedDict, deque
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from .world import CompiledWorld
+
+
+class _Tree(NamedTuple):
+    # Breadth-first search tree from one source room: distance, predecessor
+    # room and the direction taken from it, per room index (-1 = unreached).
+    dist: array
+    parent: array
+    via: array
+
+
+class LintReport(NamedTuple):
+    unreachable: List[str]
+    dead_ends: List[str]
+
+    def __bool__(self) -> bool:
+        return bool(self.unreachable or self.dead_ends)
+
+
+class RoomGraph:
+    """Shortest paths and reachability over a world's exits.
+
+    A BFS tree is built the first time a room is used as a source and kept
+    in an LRU of ``capacity`` trees, so repeated queries from the same room
+    cost O(path length). Exits can be changed at runtime with ``set_exit``
+    (for example when a flag opens a grate); only the cached trees the
+    change can affect are dropped.
+    """
+
+    def __init__(self, world: CompiledWorld, capacity: int = 128):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.world = world
+        self.capacity = capacity
+        self.directions: List[str] = list(world.directions)
+        self._direction_index: Dict[str, int] = dict(world.direction_index)
+        # Per room: direction index -> target room index.
+        self._exits: List[Dict[int, int]] = [
+            {
+                world.exit_directions[i]: world.exit_targets[i]
+                for i in range(world.exit_offsets[room], world.exit_offsets[room + 1])
+            }
+            for room in range(len(world))
+        ]
+        self._trees: "OrderedDict[int, _Tree]" = OrderedDict()
+        self.builds = 0
+
+    def _room(self, room_id: str) -> int:
+        room = self.world.index_of(room_id)
+        if room is None:
+            raise KeyError(room_id)
+        return room
+
+    def _tree(self, source: int) -> _Tree:
+        tree = self._trees.get(source)
+        if tree is not None:
+            self._trees.move_to_end(source)
+            return tree
+
+        size = len(self.world)
+        dist = array("i", [-1]) * size
+        parent = array("i", [-1]) * size
+        via = array("i", [-1]) * size
+        dist[source] = 0
+        queue = deque([source])
+        exits = self._exits
+        while queue:
+            room = queue.popleft()
+            next_dist = dist[room] + 1
+            for direction, target in exits[room].items():
+                if dist[target] < 0:
+                    dist[target] = next_dist
+                    parent[target] = room
+                    via[target] = direction
+                    queue.append(target)
+
+        tree = self._trees[source] = _Tree(dist, parent, via)
+        self.builds += 1
+        if len(self._trees) > self.capacity:
+            self._trees.popitem(last=False)
+        return tree
+
+    def distance(self, start: str, end: str) -> Optional[int]:
+        dist = self._tree(self._room(start)).dist[self._room(end)]
+        return dist if dist >= 0 else None
+
+    def path(self, start: str, end: str) -> Optional[List[str]]:
+        """Directions of a shortest route from ``start`` to ``end``.
+
+        Returns ``[]`` when they are the same room and None when ``end``
+        cannot be reached.
+        """
+        tree = self._tree(self._room(start))
+        room = self._room(end)
+        if tree.dist[room] < 0:
+            return None
+        steps: List[str] = []
+        while tree.parent[room] >= 0:
+            steps.append(self.directions[tree.via[room]])
+            room = tree.parent[room]
+        steps.reverse()
+        return steps
+
+    def reachable(self, start: str) -> Set[str]:
+        dist = self._tree(self._room(start)).dist
+        return {room_id for room_id, d in zip(self.world.room_ids, dist) if d >= 0}
+
+    def set_exit(self, room_id: str, direction: str, target: Optional[str]):
+        """Add, redirect or (with ``target=None``) remove an exit."""
+        room = self._room(room_id)
+        direction_id = self._direction_index.get(direction)
+        if direction_id is None:
+            direction_id = self._direction_index[direction] = len(self.directions)
+            self.directions.append(direction)
+        exits = self._exits[room]
+
+        old = exits.get(direction_id)
+        new = self._room(target) if target is not None else None
+        if old == new:
+            return
+        if new is None:
+            del exits[direction_id]
+        else:
+            exits[direction_id] = new
+
+        for source, tree in list(self._trees.items()):
+            # Removing an edge only matters to trees that route through it;
+            # adding one only to trees it gives a shorter route.
+            removed = (
+                old is not None
+                and tree.parent[old] == room
+                and tree.via[old] == direction_id
+            )
+            added = (
+                new is not None
+                and tree.dist[room] >= 0
+                and (tree.dist[new] < 0 or tree.dist[room] + 1 < tree.dist[new])
+            )
+            if removed or added:
+                del self._trees[source]
+
+    def lint(self) -> LintReport:
+        """Rooms the start room cannot reach, and rooms with no way out."""
+        dist = self._tree(self.world.start).dist
+        room_ids = self.world.room_ids
+        return LintReport(
+            unreachable=[room_ids[i] for i, d in enumerate(dist) if d < 0],
+            dead_ends=[room_ids[i] for i, exits in enumerate(self._exits) if not exits],
+        )
@@ -0,0 +1,131 @@
+import json
+import os
+from array import array
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from rich.errors import MarkupError
+from rich.text import Text
+
+from .storage import TextStore
+
+
+class Entry(NamedTuple):
+    # "command" for player input, "text" for (markup) game output.
+    kind: str
+    text: str
+
+    @property
+    def plain(self) -> str:
+        if self.kind == "command":
+            return self.text
+        try:
+            return Text.from_markup(self.text).plain
+        except MarkupError:
+            return self.text
+
+
+class History:
+    """Append-only on-disk transcript of one save, read back lazily.
+
+    Entries are stored one JSON array per line. The byte offset of every
+    ``INDEX_EVERY``-th entry is kept in memory, so reading a page seeks close
+    to it instead of scanning from the start; ``search`` streams the file and
+    holds one entry at a time.
+
+    With ``texts``, output of at least ``REF_MIN`` characters is written to
+    the store (pinned) and the line keeps only its key, so a room described
+    on every visit is stored once.
+    """
+
+    INDEX_EVERY = 256
+    REF_MIN = 64
+
+    def __init__(self, path: str, texts: Optional[TextStore] = None):
+        self.path = path
+        self.texts = texts
+        self._checkpoints = array("Q")
+        self._count = 0
+        self._file = None
+        self._open()
+
+    def _open(self):
+        end = 0
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # A write cut short by a crash; drop the torn entry.
+                        break
+                    if self._count % self.INDEX_EVERY == 0:
+                        self._checkpoints.append(end)
+                    end += len(line)
+                    self._count += 1
+        self._file = open(self.path, "ab")
+        self._file.truncate(end)
+        self._file.seek(end)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, kind: str, text: str):
+        if self._count % self.INDEX_EVERY == 0:
+            self._checkpoints.append(self._file.tell())
+        stored = text
+        if self.texts is not None and kind == "text" and len(text) >= self.REF_MIN:
+            stored = {"ref": self.texts.put(text, pin=True).hex()}
+        self._file.write(json.dumps([kind, stored]).encode("utf-8") + b"\n")
+        # Flush per entry (entries arrive at typing speed) so a crash loses
+        # at most the line being written.
+        self._file.flush()
+        self._count += 1
+
+    def _entry(self, line: bytes) -> Entry:
+        kind, text = json.loads(line)
+        if isinstance(text, dict):
+            text = self.texts.get(bytes.fromhex(text["ref"])) if self.texts else None
+            if text is None:
+                # Opened without the store, or the database was replaced.
+                text = ""
+        return Entry(kind, text)
+
+    def read(self, start: int, stop: Optional[int] = None) -> List[Entry]:
+        """Entries ``start:stop``, read from disk."""
+        start = max(start, 0)
+        stop = self._count if stop is None else min(stop, self._count)
+        if start >= stop:
+            return []
+        checkpoint = start // self.INDEX_EVERY
+        entries: List[Entry] = []
+        with open(self.path, "rb") as f:
+            f.seek(self._checkpoints[checkpoint])
+            for index, line in enumerate(f, checkpoint * self.INDEX_EVERY):
+                if index >= stop:
+                    break
+                if index >= start:
+                    entries.append(self._entry(line))
+        return entries
+
+    def search(self, needle: str) -> Iterator[Tuple[int, Entry]]:
+        """Yield ``(index, entry)`` for entries whose text contains ``needle``.
+
+        Case-insensitive, matched against the text without markup.
+        """
+        needle = needle.lower()
+        with open(self.path, "rb") as f:
+            for index, line in enumerate(f):
+                if index >= self._count:
+                    break
+                entry = self._entry(line)
+                if needle in entry.plain.lower():
+                    yield index, entry
+
+    def clear(self):
+        self._file.truncate(0)
+        self._file.seek(0)
+        self._checkpoints = array("Q")
+        self._count = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
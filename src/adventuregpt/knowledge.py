@@ -0,0 +1,222 @@
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from .storage import (
+    ADD_FACT_SQL,
+    COUNT_FACTS_SQL,
+    FACTS_BY_RELATION_SQL,
+    FACTS_FROM_SQL,
+    FACTS_TO_SQL,
+    GRAPH_ID_SQL,
+    REMOVE_FACT_SQL,
+    Database,
+)
+from .world import CompiledWorld
+
+# Directions for neighbors and k_hop: follow facts from subject to object,
+# from object to subject, or both.
+DIRECTIONS = ("out", "in", "both")
+
+
+class Fact(NamedTuple):
+    subject: str
+    relation: str
+    # Another entity or a plain value; values are just entities with no
+    # facts of their own.
+    object: str
+
+
+# relation -> entities, for one entity and one direction.
+_Edges = Dict[str, Tuple[str, ...]]
+
+
+class KnowledgeGraph:
+    """Triples (subject, relation, object) stored in SQLite under ``name``.
+
+    Queries go through an LRU of per-entity adjacency lists
+    (``capacity`` entities per direction), each loaded with one covering-
+    index lookup the first time an entity is visited. Writes go to the
+    database at once and drop the adjacency lists they change.
+    """
+
+    def __init__(self, database: Database, name: str = "world", capacity: int = 65536):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.database = database
+        self.name = name
+        self.capacity = capacity
+        self._out: "OrderedDict[str, _Edges]" = OrderedDict()
+        self._in: "OrderedDict[str, _Edges]" = OrderedDict()
+        self.loads = 0
+        with database.connection() as conn:
+            row = conn.execute(GRAPH_ID_SQL, (name,)).fetchone()
+            if row:
+                self.graph_id = row[0]
+            else:
+                self.graph_id = conn.execute(
+                    "INSERT INTO graphs (name) VALUES (?)", (name,)
+                ).lastrowid
+                conn.commit()
+
+    @classmethod
+    def for_world(cls, database: Database, world: CompiledWorld) -> "KnowledgeGraph":
+        """The graph of ``world``'s facts, built the first time it is used."""
+        graph = cls(database, f"world:{world.digest}")
+        if not len(graph):
+            graph.add_many(world_facts(world))
+        return graph
+
+    def __len__(self) -> int:
+        with self.database.connection() as conn:
+            return conn.execute(COUNT_FACTS_SQL, (self.graph_id,)).fetchone()[0]
+
+    def _forget(self, fact: Fact):
+        self._out.pop(fact.subject, None)
+        self._in.pop(fact.object, None)
+
+    def add(self, subject: str, relation: str, object: str):
+        self.add_many([Fact(subject, relation, object)])
+
+    def add_many(self, facts: Iterable[Tuple[str, str, str]]):
+        facts = [Fact(*fact) for fact in facts]
+        with self.database.connection() as conn:
+            conn.executemany(ADD_FACT_SQL, [(self.graph_id, *fact) for fact in facts])
+            conn.commit()
+        for fact in facts:
+            self._forget(fact)
+
+    def remove(self, subject: str, relation: str, object: str) -> bool:
+        fact = Fact(subject, relation, object)
+        with self.database.connection() as conn:
+            removed = conn.execute(REMOVE_FACT_SQL, (self.graph_id, *fact)).rowcount
+            conn.commit()
+        self._forget(fact)
+        return bool(removed)
+
+    def _edges(self, entity: str, outgoing: bool) -> _Edges:
+        cache = self._out if outgoing else self._in
+        edges = cache.get(entity)
+        if edges is not None:
+            cache.move_to_end(entity)
+            return edges
+        sql = FACTS_FROM_SQL if outgoing else FACTS_TO_SQL
+        grouped: Dict[str, List[str]] = {}
+        with self.database.connection() as conn:
+            for relation, other in conn.execute(sql, (self.graph_id, entity)):
+                grouped.setdefault(relation, []).append(other)
+        edges = cache[entity] = {
+            relation: tuple(others) for relation, others in grouped.items()
+        }
+        self.loads += 1
+        if len(cache) > self.capacity:
+            cache.popitem(last=False)
+        return edges
+
+    def objects(self, subject: str, relation: str) -> Tuple[str, ...]:
+        return self._edges(subject, True).get(relation, ())
+
+    def subjects(self, relation: str, object: str) -> Tuple[str, ...]:
+        return self._edges(object, False).get(relation, ())
+
+    def _steps(
+        self, entity: str, relation: Optional[str], direction: str
+    ) -> Iterable[Tuple[Fact, str]]:
+        """Facts touching ``entity`` in ``direction``, with the entity at the
+        other end."""
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {', '.join(DIRECTIONS)}")
+        if direction != "in":
+            for rel, others in self._edges(entity, True).items():
+                if relation is None or rel == relation:
+                    for other in others:
+                        yield Fact(entity, rel, other), other
+        if direction != "out":
+            for rel, others in self._edges(entity, False).items():
+                if relation is None or rel == relation:
+                    for other in others:
+                        yield Fact(other, rel, entity), other
+
+    def neighbors(
+        self, entity: str, relation: Optional[str] = None, direction: str = "out"
+    ) -> Set[str]:
+        return {other for _, other in self._steps(entity, relation, direction)}
+
+    def k_hop(
+        self,
+        entity: str,
+        k: int,
+        relation: Optional[str] = None,
+        direction: str = "out",
+    ) -> Dict[str, int]:
+        """Entities at most ``k`` hops from ``entity``, with their distance."""
+        dist = {entity: 0}
+        queue = deque([entity])
+        while queue:
+            current = queue.popleft()
+            if dist[current] == k:
+                continue
+            for _, other in self._steps(current, relation, direction):
+                if other not in dist:
+                    dist[other] = dist[current] + 1
+                    queue.append(other)
+        return dist
+
+    def around(self, entity: str, k: int = 2) -> List[Fact]:
+        """Every fact on a path of at most ``k`` hops from ``entity``, in
+        either direction: the context to describe it with.
+
+        Paths do not continue through values (entities with no facts of
+        their own), so a type like "room" does not pull in every room.
+        """
+        facts: Dict[Fact, None] = {}
+        dist = {entity: 0}
+        queue = deque([entity])
+        while queue:
+            current = queue.popleft()
+            if dist[current] == k:
+                continue
+            for fact, other in self._steps(current, None, "both"):
+                facts[fact] = None
+                if other not in dist:
+                    dist[other] = dist[current] + 1
+                    if self._edges(other, True):
+                        queue.append(other)
+        return list(facts)
+
+    def match(
+        self,
+        subject: Optional[str] = None,
+        relation: Optional[str] = None,
+        object: Optional[str] = None,
+    ) -> List[Fact]:
+        """Facts matching a pattern; None matches anything."""
+        if subject is not None:
+            return [
+                fact
+                for fact, other in self._steps(subject, relation, "out")
+                if object is None or other == object
+            ]
+        if object is not None:
+            return [fact for fact, _ in self._steps(object, relation, "in")]
+        with self.database.connection() as conn:
+            if relation is not None:
+                rows = conn.execute(FACTS_BY_RELATION_SQL, (self.graph_id, relation))
+                return [Fact(s, relation, o) for s, o in rows]
+            rows = conn.execute(
+                "SELECT subject, relation, object FROM facts WHERE graph_id = ?",
+                (self.graph_id,),
+            )
+            return [Fact(*row) for row in rows]
+
+
+def world_facts(world: CompiledWorld) -> List[Fact]:
+    """Rooms, their exits and where items start."""
+    facts = []
+    for room, room_id in enumerate(world.room_ids):
+        facts.append(Fact(room_id, "is_a", "room"))
+        for direction, target in world.exits(room).items():
+            facts.append(Fact(room_id, direction, target))
+        for item in world.room_items[room]:
+            facts.append(Fact(item, "is_a", "item"))
+            facts.append(Fact(item, "located_in", room_id))
+    return facts
@@ -0,0 +1,279 @@
+import asyncio
+import hashlib
+import queue
+import re
+import threading
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Tuple,
+)
+
+from .knowledge import Fact
+
+
+class Prompt(NamedTuple):
+    room: str
+    description: str
+    inventory: Tuple[str, ...]
+    command: str
+    # World facts near the room, from the engine's knowledge graph.
+    facts: Tuple[Fact, ...] = ()
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMTimeout(LLMError):
+    pass
+
+
+class Backend:
+    """A text generator that works on batches of prompts.
+
+    ``stream`` yields ``(index, token)`` pairs, where ``index`` is the
+    prompt's position in the batch, as soon as each token is available.
+    """
+
+    max_batch = 8
+
+    async def stream(self, prompts: List[Prompt]) -> AsyncIterator[Tuple[int, str]]:
+        raise NotImplementedError
+        yield
+
+
+STUB_REPLIES = (
+    "You try to {command}, but nothing much happens.",
+    "Nothing here seems to care that you want to {command}.",
+    "You think about how to {command} for a moment, then decide against it.",
+    "A hollow voice says: 'You cannot {command} in a place like this.'",
+)
+
+_TOKEN = re.compile(r"\S+\s*")
+
+
+class StubBackend(Backend):
+    """Deterministic offline backend for tests and load tests.
+
+    The reply depends only on the prompt. Each batch waits
+    ``first_token_ms`` and then emits one token per prompt every
+    ``token_ms``, like a server decoding the batch in lockstep.
+    """
+
+    def __init__(
+        self, first_token_ms: float = 50.0, token_ms: float = 5.0, max_batch: int = 16
+    ):
+        self.first_token = first_token_ms / 1000
+        self.token_delay = token_ms / 1000
+        self.max_batch = max_batch
+        self.batches: List[int] = []
+
+    def reply(self, prompt: Prompt) -> str:
+        seed = f"{prompt.room}\0{prompt.command}".encode("utf-8")
+        choice = hashlib.blake2b(seed, digest_size=4).digest()
+        template = STUB_REPLIES[int.from_bytes(choice, "big") % len(STUB_REPLIES)]
+        return template.format(command=prompt.command)
+
+    async def stream(self, prompts: List[Prompt]) -> AsyncIterator[Tuple[int, str]]:
+        self.batches.append(len(prompts))
+        await asyncio.sleep(self.first_token)
+        tokens = [_TOKEN.findall(self.reply(prompt)) for prompt in prompts]
+        for step in range(max(map(len, tokens), default=0)):
+            if step:
+                await asyncio.sleep(self.token_delay)
+            for index, reply in enumerate(tokens):
+                if step < len(reply):
+                    yield index, reply[step]
+
+
+# Backend name -> factory, for the CLI's --llm option.
+BACKENDS: Dict[str, Callable[[], Backend]] = {"stub": StubBackend}
+
+
+def make_backend(name: str) -> Backend:
+    factory = BACKENDS.get(name)
+    if factory is None:
+        raise ValueError(f"unknown LLM backend {name!r} (have: {', '.join(BACKENDS)})")
+    return factory()
+
+
+_DONE = object()
+
+
+class _Request:
+    __slots__ = ("prompt", "deliver", "cancelled")
+
+    def __init__(self, prompt: Prompt, deliver: Callable[[Any], None]):
+        self.prompt = prompt
+        # Called on the client's loop with each token, then once with
+        # _DONE or an LLMError.
+        self.deliver = deliver
+        self.cancelled = False
+
+
+class LLMClient:
+    """Sends prompts to a Backend from any thread or event loop.
+
+    Requests are coalesced: the client waits up to ``batch_window_ms`` after
+    the first pending request and sends up to ``max_batch`` of them as one
+    batch. At most ``max_concurrency`` batches are in flight; requests that
+    arrive meanwhile queue up and join the next batch. Each request gets at
+    most ``timeout`` seconds from submission to its last token.
+
+    The client runs its own event loop on a daemon thread, so the
+    synchronous engine (on its worker thread) and the asyncio server can
+    share it and their requests batch together.
+    """
+
+    def __init__(
+        self,
+        backend: Backend,
+        max_batch: int = 8,
+        batch_window_ms: float = 5.0,
+        max_concurrency: int = 4,
+        timeout: float = 10.0,
+    ):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.backend = backend
+        self.max_batch = min(max_batch, backend.max_batch)
+        self.batch_window = batch_window_ms / 1000
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.requests = 0
+        self.batches = 0
+        self.timeouts = 0
+        self._loop = asyncio.new_event_loop()
+        self._pending: "asyncio.Queue[_Request]" = asyncio.Queue()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="adventuregpt-llm", daemon=True
+        )
+        self._thread.start()
+        self._batcher = asyncio.run_coroutine_threadsafe(self._batch_loop(), self._loop)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch": round(self.requests / self.batches, 2) if self.batches else 0,
+            "timeouts": self.timeouts,
+        }
+
+    def _submit(self, prompt: Prompt, deliver: Callable[[Any], None]) -> _Request:
+        request = _Request(prompt, deliver)
+        self._loop.call_soon_threadsafe(self._pending.put_nowait, request)
+        return request
+
+    async def _batch_loop(self):
+        slots = asyncio.Semaphore(self.max_concurrency)
+        while True:
+            await slots.acquire()
+            batch = [await self._pending.get()]
+            deadline = self._loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._pending.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._pending.get(), remaining))
+                except TimeoutError:
+                    break
+            self._loop.create_task(self._run(batch, slots))
+
+    async def _run(self, batch: List[_Request], slots: asyncio.Semaphore):
+        self.batches += 1
+        self.requests += len(batch)
+        result: Any = _DONE
+        try:
+            # A stuck backend must not hold a concurrency slot forever.
+            async with asyncio.timeout(self.timeout):
+                async for index, token in self.backend.stream(
+                    [request.prompt for request in batch]
+                ):
+                    request = batch[index]
+                    if not request.cancelled:
+                        request.deliver(token)
+        except TimeoutError:
+            result = LLMTimeout(f"no reply within {self.timeout:g}s")
+        except Exception as e:
+            result = LLMError(f"backend failed: {e!r}")
+        finally:
+            slots.release()
+        for request in batch:
+            if not request.cancelled:
+                request.deliver(result)
+
+    def stream_sync(self, prompt: Prompt) -> Iterator[str]:
+        """Yield tokens for ``prompt``; blocks, so call it off the event loop."""
+        tokens: "queue.Queue[Any]" = queue.Queue()
+        request = self._submit(prompt, tokens.put)
+        deadline = time.monotonic() + self.timeout
+        try:
+            while True:
+                try:
+                    item = tokens.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    self.timeouts += 1
+                    raise LLMTimeout(f"no reply within {self.timeout:g}s") from None
+                if item is _DONE:
+                    return
+                if isinstance(item, LLMError):
+                    raise item
+                yield item
+        finally:
+            request.cancelled = True
+
+    async def stream(self, prompt: Prompt) -> AsyncIterator[str]:
+        """Yield tokens for ``prompt`` on the caller's event loop."""
+        loop = asyncio.get_running_loop()
+        tokens: "asyncio.Queue[Any]" = asyncio.Queue()
+        request = self._submit(
+            prompt, lambda item: loop.call_soon_threadsafe(tokens.put_nowait, item)
+        )
+        try:
+            async with asyncio.timeout(self.timeout):
+                while True:
+                    item = await tokens.get()
+                    if item is _DONE:
+                        return
+                    if isinstance(item, LLMError):
+                        raise item
+                    yield item
+        except TimeoutError:
+            self.timeouts += 1
+            raise LLMTimeout(f"no reply within {self.timeout:g}s") from None
+        finally:
+            request.cancelled = True
+
+    async def complete(self, prompt: Prompt) -> str:
+        return "".join([token async for token in self.stream(prompt)])
+
+    async def _shutdown(self):
+        tasks = [
+            task for task in asyncio.all_tasks() if task is not asyncio.current_task()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
@@ -0,0 +1,177 @@
+import asyncio
+import bisect
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from .knowledge import KnowledgeGraph
+from .llm import LLMClient
+from .semantic import SemanticCache
+from .server import EnginePool, GameServer
+from .storage import Database
+from .world import load_world
+
+DEFAULT_SCRIPT = ("north", "look", "inventory", "south", "go in", "out")
+# With an LLM, some commands are ones only it can answer.
+LLM_SCRIPT = DEFAULT_SCRIPT + ("xyzzy", "examine the building")
+
+# Upper bounds (ms) of the latency histogram buckets.
+HISTOGRAM_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def histogram(values: Sequence[float]) -> Dict[str, int]:
+    """Count latencies (seconds) per ``HISTOGRAM_MS`` bucket."""
+    counts = [0] * (len(HISTOGRAM_MS) + 1)
+    for value in values:
+        counts[bisect.bisect_left(HISTOGRAM_MS, value * 1000)] += 1
+    labels = [f"<={bound}ms" for bound in HISTOGRAM_MS] + [f">{HISTOGRAM_MS[-1]}ms"]
+    return {label: count for label, count in zip(labels, counts) if count}
+
+
+def raise_fd_limit():
+    """Each simulated session holds a socket; lift the soft limit if we can."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or hard > soft:
+        target = 65536 if hard == resource.RLIM_INFINITY else hard
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        except (ValueError, OSError):
+            pass
+
+
+async def _request(reader, writer, line: str) -> Dict[str, Any]:
+    writer.write(line.encode("utf-8") + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def _client(
+    host: str,
+    port: int,
+    session: str,
+    commands: Sequence[str],
+    latencies: List[float],
+):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        await _request(reader, writer, f"session {session}")
+        for command in commands:
+            start = time.perf_counter()
+            await _request(reader, writer, command)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def run_load(
+    host: str,
+    port: int,
+    sessions: int,
+    rounds: int = 10,
+    script: Sequence[str] = DEFAULT_SCRIPT,
+    prefix: str = "load",
+) -> Dict[str, Any]:
+    """Drive ``sessions`` concurrent connections and report command latency."""
+    latencies: List[float] = []
+    commands = list(script) * rounds
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _client(host, port, f"{prefix}-{i}", commands, latencies)
+            for i in range(sessions)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    return {
+        "sessions": sessions,
+        "commands": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "commands_per_sec": round(len(latencies) / elapsed, 1),
+        "histogram": histogram(latencies),
+    }
+
+
+async def run_sweep(
+    session_counts: Sequence[int],
+    rounds: int = 10,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    capacity: int = 1024,
+    world_path: Optional[str] = None,
+    llm: Optional[LLMClient] = None,
+    semantic_cache: int = 0,
+) -> List[Dict[str, Any]]:
+    """Run ``run_load`` for each session count.
+
+    Without ``port`` an in-process server with a throwaway database is started,
+    so clients and server share one event loop (and its CPU).
+    """
+    raise_fd_limit()
+    results = []
+    script = LLM_SCRIPT if llm is not None else DEFAULT_SCRIPT
+    if port is not None:
+        for count in session_counts:
+            results.append(
+                await run_load(
+                    host or "127.0.0.1",
+                    port,
+                    count,
+                    rounds,
+                    script,
+                    prefix=f"load{count}",
+                )
+            )
+        return results
+
+    with tempfile.TemporaryDirectory(prefix="adventuregpt-load-") as tmp:
+        database = Database(os.path.join(tmp, "load.db"))
+        world = load_world(world_path)
+        knowledge = generated = None
+        if llm is not None:
+            knowledge = KnowledgeGraph.for_world(database, world)
+            if semantic_cache > 0:
+                generated = SemanticCache(database, semantic_cache)
+        pool = EnginePool(
+            database,
+            world,
+            capacity=capacity,
+            llm=llm,
+            semantic_cache=generated,
+            knowledge=knowledge,
+        )
+        server = GameServer(pool, "127.0.0.1", 0)
+        await server.start()
+        try:
+            for count in session_counts:
+                result = await run_load(
+                    "127.0.0.1", server.port, count, rounds, script, f"load{count}"
+                )
+                result["evictions"] = pool.evictions
+                if llm is not None:
+                    result["llm"] = llm.stats()
+                if generated is not None:
+                    result["semantic_cache"] = generated.stats()
+                results.append(result)
+        finally:
+            await server.stop()
+            database.close()
+    return results
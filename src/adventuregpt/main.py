@@ -1,12 +1,16 @@
+import json
 import os
 import shutil
-from typing import Optional
+from typing import List, Optional
 
 import typer
 
-from adventuregpt.engine import GameEngine
-from adventuregpt.storage import get_db_path
-from adventuregpt.tui import AdventureApp
+from adventuregpt.paths import get_db_path
+
+# Commands import what only they need (the engine, Pydantic, SQLite,
+# textual, asyncio, multiprocessing), so `nuke` and `--help` load little
+# more than typer and `replay` doesn't pay for the TUI. The startup budget
+# is checked by tests/test_startup.py.
 
 app = typer.Typer(
     name="adventuregpt",
@@ -16,21 +20,172 @@ app = typer.Typer(
 )
 
 
+LLM_HELP = "Answer commands the parser does not know with this backend (e.g. stub)."
+
+
+def _make_llm(name: Optional[str]):
+    if name is None:
+        return None
+    from adventuregpt.llm import LLMClient, make_backend
+
+    try:
+        return LLMClient(make_backend(name))
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--llm")
+
+
+SEMANTIC_CACHE_HELP = "With --llm: generated replies kept in the database (0: off)."
+SIMILARITY_HELP = (
+    "With --llm: also reuse a reply whose command is this similar (0-1, e.g. 0.75)."
+)
+
+
+def _make_semantic_cache(database, size: int, similarity: Optional[float]):
+    from adventuregpt.semantic import SemanticCache
+
+    try:
+        return SemanticCache(database, size, similarity=similarity)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+
+
+PROFILE_PATH = "adventuregpt.prof"
+METRICS_PATH = "adventuregpt-metrics.json"
+PROFILE_HELP = (
+    f"Record timings (shown by /stats) and write {PROFILE_PATH} (cProfile) "
+    f"and {METRICS_PATH} to the current directory on exit."
+)
+
+
+def _make_profiling(profile: bool):
+    if not profile:
+        return None, None
+    from adventuregpt.metrics import Metrics, Profiler
+
+    return Metrics(), Profiler()
+
+
+def _dump_profile(metrics, profiler):
+    profiler.disable()
+    profiler.dump(PROFILE_PATH)
+    metrics.dump(METRICS_PATH)
+    typer.echo(
+        f"Wrote {PROFILE_PATH} (python -m pstats {PROFILE_PATH}) and {METRICS_PATH}."
+    )
+
+
 @app.callback()
 def main(
     ctx: typer.Context,
     new: bool = typer.Option(
         False, "--new", "-n", help="Start a new game even if a save exists."
     ),
+    write_behind: bool = typer.Option(
+        False,
+        "--write-behind",
+        help="Batch saves in memory instead of committing on every move.",
+    ),
+    flush_every: int = typer.Option(
+        50,
+        "--flush-every",
+        help="Write-behind: flush after this many commands at most.",
+    ),
+    flush_interval_ms: int = typer.Option(
+        2000,
+        "--flush-interval-ms",
+        help="Write-behind: flush once unsaved changes are this old (ms).",
+    ),
+    world: Optional[str] = typer.Option(
+        None, "--world", help="Load rooms from a JSON/TOML/YAML world file."
+    ),
+    checkpoint_every: int = typer.Option(
+        20,
+        "--checkpoint-every",
+        help="Undo: store the whole state every N turns.",
+    ),
+    history_limit: Optional[int] = typer.Option(
+        None,
+        "--history-limit",
+        help="Undo: keep only about the last N turns (default: all).",
+    ),
+    cache_size: int = typer.Option(
+        1024,
+        "--cache-size",
+        help="Responses to look/inventory/failed moves kept in memory (0: off).",
+    ),
+    persist_cache: bool = typer.Option(
+        False,
+        "--persist-cache",
+        help="Keep the response cache in the app directory between runs.",
+    ),
+    llm: Optional[str] = typer.Option(None, "--llm", help=LLM_HELP),
+    semantic_cache: int = typer.Option(
+        10_000, "--semantic-cache", help=SEMANTIC_CACHE_HELP
+    ),
+    similarity: Optional[float] = typer.Option(
+        None, "--similarity", help=SIMILARITY_HELP
+    ),
+    profile: bool = typer.Option(False, "--profile", help=PROFILE_HELP),
 ):
     """
     AdventureGPT: Text Adventure Game (TUI).
     """
     # Only run the TUI if no subcommand is invoked (like 'nuke' or 'reset')
     if ctx.invoked_subcommand is None:
-        engine = GameEngine()
-        app = AdventureApp(engine, start_new=new)
-        app.run()
+        from adventuregpt.cache import ResponseCache
+        from adventuregpt.engine import GameEngine
+        from adventuregpt.tui import AdventureApp
+        from adventuregpt.world import get_cache_dir
+
+        cache = None
+        if cache_size > 0:
+            path = None
+            if persist_cache:
+                path = os.path.join(get_cache_dir(), "responses.json")
+            cache = ResponseCache(cache_size, path)
+        metrics, profiler = _make_profiling(profile)
+        client = _make_llm(llm)
+        llm_db = compiled = knowledge = generated = None
+        if client is not None:
+            from adventuregpt.knowledge import KnowledgeGraph
+            from adventuregpt.storage import Database
+            from adventuregpt.world import load_world
+
+            llm_db = Database()
+            llm_db.instrument(metrics)
+            compiled = load_world(world)
+            knowledge = KnowledgeGraph.for_world(llm_db, compiled)
+            if semantic_cache > 0:
+                generated = _make_semantic_cache(llm_db, semantic_cache, similarity)
+        engine = GameEngine(
+            write_behind=write_behind,
+            flush_every=flush_every,
+            flush_interval_ms=flush_interval_ms,
+            world_path=world,
+            world=compiled,
+            checkpoint_every=checkpoint_every,
+            history_limit=history_limit,
+            response_cache=cache,
+            llm=client,
+            semantic_cache=generated,
+            knowledge=knowledge,
+            metrics=metrics,
+        )
+        app = AdventureApp(engine, start_new=new, profiler=profiler)
+        if profiler is not None:
+            profiler.enable()
+        try:
+            app.run()
+        finally:
+            engine.close()
+            if cache is not None:
+                cache.save()
+            if client is not None:
+                client.close()
+            if llm_db is not None:
+                llm_db.close()
+            if profiler is not None:
+                _dump_profile(metrics, profiler)
 
 
 @app.command()
@@ -38,11 +193,297 @@ def reset():
     """
     Reset the game state completely.
     """
+    from adventuregpt.engine import GameEngine
+
     engine = GameEngine()
     engine.start_new_game()
+    engine.close()
     typer.echo("Game reset. Run 'adventuregpt' to start fresh.")
 
 
+@app.command()
+def save(name: str = typer.Argument(..., help="Name of the save slot.")):
+    """
+    Save the current game to a named slot.
+    """
+    from adventuregpt.engine import GameEngine
+
+    engine = GameEngine()
+    try:
+        engine.resume_game()
+        typer.echo(engine.save_slot(name))
+    finally:
+        engine.close()
+
+
+@app.command()
+def load(name: str = typer.Argument(..., help="Name of the save slot.")):
+    """
+    Continue from a named save slot next time you play.
+    """
+    from adventuregpt.engine import GameEngine
+
+    engine = GameEngine()
+    try:
+        if engine.storage.slot(name) is None:
+            typer.echo(f"There is no save called '{name}'.", err=True)
+            raise typer.Exit(1)
+        typer.echo(engine.load_slot(name))
+    finally:
+        engine.close()
+
+
+@app.command()
+def branch(
+    source: str = typer.Argument(..., help="Save slot to branch from."),
+    name: str = typer.Argument(..., help="Name of the new save slot."),
+):
+    """
+    Copy a save slot under a new name.
+    """
+    from adventuregpt.storage import GameStorage
+
+    storage = GameStorage()
+    try:
+        storage.branch_slot(source, name)
+    except KeyError:
+        typer.echo(f"There is no save called '{source}'.", err=True)
+        raise typer.Exit(1)
+    except ValueError:
+        typer.echo(f"There is already a save called '{name}'.", err=True)
+        raise typer.Exit(1)
+    finally:
+        storage.close()
+    typer.echo(f"Branched '{source}' as '{name}'.")
+
+
+@app.command()
+def saves():
+    """
+    List the save slots.
+    """
+    from adventuregpt.engine import GameEngine
+
+    engine = GameEngine()
+    try:
+        typer.echo(engine.list_slots())
+    finally:
+        engine.close()
+
+
+@app.command()
+def replay(
+    transcripts: Optional[List[str]] = typer.Argument(
+        None, help="Transcript files, one command per line. Reads stdin if omitted."
+    ),
+    out: Optional[str] = typer.Option(
+        None, "--out", "-o", help="JSONL output file for a single transcript."
+    ),
+    out_dir: Optional[str] = typer.Option(
+        None, "--out-dir", help="Directory for per-transcript JSONL output."
+    ),
+    jobs: Optional[int] = typer.Option(
+        None, "--jobs", "-j", help="Worker processes (default: all cores)."
+    ),
+    db_dir: Optional[str] = typer.Option(
+        None, "--db-dir", help="Keep each transcript's database in this directory."
+    ),
+    world: Optional[str] = typer.Option(None, "--world", help="World file to load."),
+    write_behind: bool = typer.Option(
+        True, "--write-behind/--no-write-behind", help="Batch saves during replay."
+    ),
+):
+    """
+    Replay scripted commands headlessly and write responses as JSONL.
+    Never touches your saved game: each transcript runs against its own database.
+    """
+    import sys
+    import tempfile
+
+    from adventuregpt.replay import replay_many, replay_to
+
+    transcripts = transcripts or ["-"]
+    for name in transcripts:
+        if name != "-" and not os.path.isfile(name):
+            raise typer.BadParameter(f"no such transcript: {name}")
+    if len(transcripts) == 1 and out_dir is None:
+        # Single transcript: stream records as they are produced.
+        name = transcripts[0]
+        with tempfile.TemporaryDirectory(prefix="adventuregpt-replay-") as tmp:
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            db_path = os.path.join(db_dir or tmp, "replay.db")
+            src = sys.stdin if name == "-" else open(name)
+            dst = open(out, "w") if out else sys.stdout
+            try:
+                summary = replay_to(src, dst, db_path, name, world, write_behind)
+            finally:
+                if src is not sys.stdin:
+                    src.close()
+                if dst is not sys.stdout:
+                    dst.close()
+        typer.echo(json.dumps(summary), err=True)
+        return
+
+    if out_dir is None:
+        raise typer.BadParameter("--out-dir is required for multiple transcripts")
+    if "-" in transcripts:
+        raise typer.BadParameter("stdin can only be replayed on its own")
+    summaries = replay_many(transcripts, out_dir, db_dir, jobs, world, write_behind)
+    for summary in summaries:
+        typer.echo(json.dumps(summary), err=True)
+    if any("error" in summary for summary in summaries):
+        raise typer.Exit(1)
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", "--host", help="Interface to bind."),
+    port: int = typer.Option(4000, "--port", "-p", help="TCP port to listen on."),
+    max_engines: int = typer.Option(
+        1024, "--max-engines", help="Live engines kept in memory (LRU)."
+    ),
+    db: Optional[str] = typer.Option(None, "--db", help="Database file to use."),
+    world: Optional[str] = typer.Option(None, "--world", help="World file to load."),
+    llm: Optional[str] = typer.Option(None, "--llm", help=LLM_HELP),
+    semantic_cache: int = typer.Option(
+        10_000, "--semantic-cache", help=SEMANTIC_CACHE_HELP
+    ),
+    similarity: Optional[float] = typer.Option(
+        None, "--similarity", help=SIMILARITY_HELP
+    ),
+    profile: bool = typer.Option(False, "--profile", help=PROFILE_HELP),
+):
+    """
+    Host many players over a line-based TCP protocol.
+    Send 'session <name>' first, then one command per line.
+    """
+    import asyncio
+
+    from adventuregpt.server import EnginePool, GameServer
+    from adventuregpt.storage import Database
+    from adventuregpt.world import load_world
+
+    metrics, profiler = _make_profiling(profile)
+    client = _make_llm(llm)
+    database = Database(db)
+    database.instrument(metrics)
+    compiled = load_world(world)
+    knowledge = generated = None
+    if client is not None:
+        from adventuregpt.knowledge import KnowledgeGraph
+
+        knowledge = KnowledgeGraph.for_world(database, compiled)
+        if semantic_cache > 0:
+            generated = _make_semantic_cache(database, semantic_cache, similarity)
+    pool = EnginePool(
+        database,
+        compiled,
+        capacity=max_engines,
+        llm=client,
+        semantic_cache=generated,
+        knowledge=knowledge,
+        metrics=metrics,
+    )
+    server = GameServer(pool, host, port)
+    typer.echo(f"Serving on {host}:{port} (Ctrl+C to stop)")
+    if profiler is not None:
+        profiler.enable()
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.close()
+        database.close()
+        if client is not None:
+            client.close()
+        if profiler is not None:
+            _dump_profile(metrics, profiler)
+
+
+@app.command()
+def loadgen(
+    sessions: str = typer.Option(
+        "10,100,1000", "--sessions", help="Comma-separated concurrent session counts."
+    ),
+    rounds: int = typer.Option(
+        10, "--rounds", help="Times each session runs its script."
+    ),
+    host: str = typer.Option("127.0.0.1", "--host", help="Server to target."),
+    port: Optional[int] = typer.Option(
+        None,
+        "--port",
+        "-p",
+        help="Target a running server instead of an in-process one.",
+    ),
+    max_engines: int = typer.Option(
+        1024, "--max-engines", help="LRU size for the in-process server."
+    ),
+    llm: Optional[str] = typer.Option(
+        None,
+        "--llm",
+        help="In-process server: send unknown commands to this backend (e.g. stub).",
+    ),
+    semantic_cache: int = typer.Option(
+        0, "--semantic-cache", help="With --llm: cache this many generated replies."
+    ),
+):
+    """
+    Measure p50/p99 command latency as the number of sessions grows.
+    """
+    import asyncio
+
+    from adventuregpt.loadgen import run_sweep
+
+    try:
+        counts = [int(count) for count in sessions.split(",") if count.strip()]
+    except ValueError:
+        raise typer.BadParameter("--sessions must be comma-separated integers")
+    client = _make_llm(llm)
+    try:
+        results = asyncio.run(
+            run_sweep(
+                counts,
+                rounds,
+                host,
+                port,
+                capacity=max_engines,
+                llm=client,
+                semantic_cache=semantic_cache,
+            )
+        )
+    finally:
+        if client is not None:
+            client.close()
+    for result in results:
+        typer.echo(json.dumps(result))
+
+
+@app.command()
+def lint(
+    world: Optional[str] = typer.Option(None, "--world", help="World file to check."),
+):
+    """
+    Report rooms that cannot be reached from the start, and dead ends.
+    """
+    from adventuregpt.graph import RoomGraph
+    from adventuregpt.world import WorldError, load_world
+
+    try:
+        compiled = load_world(world)
+    except (OSError, WorldError) as e:
+        raise typer.BadParameter(str(e))
+    report = RoomGraph(compiled).lint()
+    for room_id in report.unreachable:
+        typer.echo(f"unreachable: {room_id}")
+    for room_id in report.dead_ends:
+        typer.echo(f"dead end: {room_id}")
+    if report:
+        raise typer.Exit(1)
+    typer.echo(f"{len(compiled)} rooms, all reachable, no dead ends.")
+
+
 @app.command()
 def nuke():
     """
@@ -0,0 +1,163 @@
+import bisect
+import cProfile
+import json
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+# Upper bounds (microseconds) of the histogram buckets; anything slower
+# goes in one overflow bucket.
+BUCKETS_US = (
+    5,
+    10,
+    20,
+    50,
+    100,
+    200,
+    500,
+    1000,
+    2000,
+    5000,
+    10_000,
+    20_000,
+    50_000,
+    100_000,
+    200_000,
+    500_000,
+    1_000_000,
+)
+
+
+def _label(bound_us: int) -> str:
+    return f"<={bound_us / 1000:g}ms" if bound_us >= 1000 else f"<={bound_us}us"
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_US) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS_US, seconds * 1e6)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound (seconds) of the bucket holding the ``pct`` percentile."""
+        rank = pct / 100 * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_US, self.counts):
+            seen += count
+            if seen >= rank and seen:
+                return min(bound / 1e6, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        labels = [_label(bound) for bound in BUCKETS_US]
+        labels.append(f">{_label(BUCKETS_US[-1])[2:]}")
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0,
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "buckets": {
+                label: count for label, count in zip(labels, self.counts) if count
+            },
+        }
+
+
+class Metrics:
+    """Named latency histograms and counters, recorded from any thread.
+
+    Nothing records into this unless it is handed one: the engine,
+    Database and TUI check for ``None`` once per operation, so leaving
+    metrics off costs an attribute lookup.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "histograms": {
+                    name: histogram.summary()
+                    for name, histogram in sorted(self.histograms.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def report(self) -> List[str]:
+        """One line per histogram and counter, for humans."""
+        snapshot = self.snapshot()
+        lines = [
+            f"{name}: n={h['count']} mean={h['mean_ms']}ms "
+            f"p50<={h['p50_ms']}ms p99<={h['p99_ms']}ms max={h['max_ms']}ms"
+            for name, h in snapshot["histograms"].items()
+        ]
+        lines += [f"{name}: {value}" for name, value in snapshot["counters"].items()]
+        return lines
+
+    def dump(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+class Profiler:
+    """cProfile across threads.
+
+    A cProfile.Profile only sees the thread that enabled it, so each thread
+    to be profiled calls ``enable`` and, before ``dump``, ``disable`` itself.
+    ``dump`` merges them into one pstats file.
+    """
+
+    def __init__(self):
+        self._profiles: List[cProfile.Profile] = []
+        self._local = threading.local()
+
+    def enable(self):
+        profile = cProfile.Profile()
+        self._local.profile = profile
+        self._profiles.append(profile)
+        profile.enable()
+
+    def disable(self):
+        profile = getattr(self._local, "profile", None)
+        if profile is not None:
+            profile.disable()
+            self._local.profile = None
+
+    def dump(self, path: str):
+        profiles = [profile for profile in self._profiles if profile.getstats()]
+        if profiles:
+            pstats.Stats(*profiles).dump_stats(path)
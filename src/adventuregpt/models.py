@@ -1,23 +1,148 @@
-from typing import Dict, List, Optional
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
 
 from pydantic import BaseModel, Field
 
+# Runtime state is plain slotted classes: one is created or saved on every
+# move, for every live session. Pydantic models below are only used to
+# validate data coming in from files.
 
-class Inventory(BaseModel):
-    items: List[str] = Field(default_factory=list)
 
+class Inventory:
+    """Items carried, as an insertion-ordered set of interned names.
 
-class PlayerState(BaseModel):
-    current_room: str = "start"
-    inventory: Inventory = Field(default_factory=Inventory)
+    ``changed`` is set by every mutation and cleared once the inventory has
+    been saved, so saves can skip re-serialising an unchanged inventory.
+    ``version`` counts mutations, so caches can tell it changed without
+    comparing items.
+    """
+
+    __slots__ = ("_items", "changed", "version")
+
+    def __init__(self, items: Iterable[str] = ()):
+        self._items: Dict[str, None] = dict.fromkeys(map(sys.intern, items))
+        self.changed = True
+        self.version = 0
+
+    @property
+    def items(self) -> List[str]:
+        return list(self._items)
+
+    def add(self, item: str):
+        self._items[sys.intern(item)] = None
+        self.changed = True
+        self.version += 1
+
+    def remove(self, item: str):
+        del self._items[item]
+        self.changed = True
+        self.version += 1
+
+    def __contains__(self, item: str) -> bool:
+        return item in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Inventory):
+            return NotImplemented
+        return self.items == other.items
+
+    def __repr__(self) -> str:
+        return f"Inventory(items={self.items!r})"
+
+
+class PlayerState:
+    """The player's room and inventory, tracking what changed since the last save."""
+
+    __slots__ = ("_current_room", "_room_changed", "inventory")
+
+    def __init__(
+        self, current_room: str = "start", inventory: Optional[Inventory] = None
+    ):
+        self.current_room = current_room
+        self.inventory = inventory if inventory is not None else Inventory()
+
+    @property
+    def current_room(self) -> str:
+        return self._current_room
+
+    @current_room.setter
+    def current_room(self, room: str):
+        self._current_room = sys.intern(room)
+        self._room_changed = True
+
+    def changes(self) -> Set[str]:
+        """Fields changed since ``mark_saved``; everything for a new state."""
+        changed = set()
+        if self._room_changed:
+            changed.add("current_room")
+        if self.inventory.changed:
+            changed.add("inventory")
+        return changed
+
+    def mark_saved(self):
+        self._room_changed = False
+        self.inventory.changed = False
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PlayerState):
+            return NotImplemented
+        return (self.current_room, self.inventory) == (
+            other.current_room,
+            other.inventory,
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"PlayerState(current_room={self.current_room!r}, "
+            f"inventory={self.inventory!r})"
+        )
+
+
+class Exit(BaseModel):
+    """An exit that is only open while ``when`` holds (see conditions.py)."""
+
+    to: str
+    when: Optional[str] = None
+    # Shown instead of "You can't go that way." while it is closed.
+    locked: Optional[str] = None
+
+
+class Item(BaseModel):
+    """An item that can only be seen while ``when`` holds."""
+
+    name: str
+    when: Optional[str] = None
+
+
+class Variant(BaseModel):
+    """A description used instead of the room's while ``when`` holds."""
+
+    when: str
+    description: str
 
 
 class Room(BaseModel):
     description: str
-    exits: Dict[str, str] = Field(default_factory=dict)
-    items: List[str] = Field(default_factory=list)
+    # A target room ID, or an Exit for a conditional one.
+    exits: Dict[str, Union[str, Exit]] = Field(default_factory=dict)
+    items: List[Union[str, Item]] = Field(default_factory=list)
+    # The first variant whose condition holds wins.
+    variants: List[Variant] = Field(default_factory=list)
 
 
-class WorldState(BaseModel):
+@dataclass(slots=True)
+class WorldState:
     # For now, simple key-value flags, but can be expanded
-    flags: Dict[str, str] = Field(default_factory=dict)
+    flags: Dict[str, str] = field(default_factory=dict)
+
+
+class WorldData(BaseModel):
+    """On-disk world definition, validated once when the world is compiled."""
+
+    start: str = "start"
+    rooms: Dict[str, Room]
+    flags: Dict[str, Any] = Field(default_factory=dict)
@@ -0,0 +1,303 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .spelling import SpellIndex
+
+DIRECTIONS = ("north", "south", "east", "west", "up", "down", "in", "out")
+
+# Canonical verb -> words and phrases (of up to two words) that mean it.
+VERBS: Dict[str, Tuple[str, ...]] = {
+    "quit": ("quit", "exit"),
+    "look": ("look", "look around"),
+    "go": ("go", "move", "walk"),
+    "inventory": ("inventory", "take inventory"),
+    "quicksave": ("quicksave",),
+    "quickload": ("quickload",),
+    "save": ("save",),
+    "load": ("load", "restore"),
+    "branch": ("branch",),
+    "saves": ("saves", "list saves"),
+    "undo": ("undo",),
+    "redo": ("redo",),
+    "rewind": ("rewind",),
+}
+
+# Short forms that would otherwise be ambiguous prefixes ("i" could be "in"
+# or "inventory"; "e" could be "east" or "exit"). Exact matches always beat
+# prefix matches, so these pin the classic one-letter commands.
+VERB_ALIASES = {"l": "look", "i": "inventory", "q": "quit"}
+
+# Verbs that only match a whole word on its own: "qu" or "exit building"
+# must never end the game.
+EXACT_VERBS = ("quit",)
+
+# Parsed inputs remembered per parser; players repeat the same few commands.
+PARSE_CACHE_SIZE = 4096
+DIRECTION_ALIASES = {
+    "n": "north",
+    "s": "south",
+    "e": "east",
+    "w": "west",
+    "u": "up",
+    "d": "down",
+}
+
+# Words dropped before parsing: "please go to the north" is "go north".
+# Names after "save", "load" and "branch" are kept as typed.
+STOP_WORDS = frozenset(
+    ("a", "an", "the", "at", "to", "towards", "toward", "please", "my", "some")
+)
+
+_AMBIGUOUS = object()
+
+# Parsers built by CommandParser.for_world, keyed by world digest.
+_world_parsers: Dict[str, "CommandParser"] = {}
+
+
+class _Node:
+    __slots__ = ("children", "value", "below", "completion")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # Value stored at this exact word, if any.
+        self.value = None
+        # The single value reachable below this node, or _AMBIGUOUS.
+        self.below = None
+        # First suggestible word below this node, for autocomplete.
+        self.completion: Optional[str] = None
+
+
+class Trie:
+    """Prefix trie mapping words (or space-separated phrases) to values.
+
+    Every node remembers whether all words below it resolve to the same
+    value, so unique-prefix lookups and completions cost O(len(prefix)).
+    """
+
+    def __init__(self):
+        self.root = _Node()
+
+    def insert(self, word: str, value, suggest: bool = True, abbreviate: bool = True):
+        node = self.root
+        path = [node]
+        for char in word:
+            node = node.children.setdefault(char, _Node())
+            path.append(node)
+        node.value = value
+        # A phrase is only abbreviated in its last word: "take inv" finds
+        # "take inventory", but "take" alone must not.
+        first = word.rfind(" ") + 1
+        for depth, n in enumerate(path):
+            if suggest and n.completion is None:
+                n.completion = word
+            if not abbreviate or depth <= first:
+                continue
+            if n.below is None:
+                n.below = value
+            elif n.below != value:
+                n.below = _AMBIGUOUS
+
+    def _find(self, prefix: str) -> Optional[_Node]:
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def get(self, word: str):
+        node = self._find(word)
+        return node.value if node else None
+
+    def resolve(self, prefix: str):
+        """Return the value for an exact word, else for a unique prefix."""
+        node = self._find(prefix)
+        if node is None or not prefix:
+            return None
+        if node.value is not None:
+            return node.value
+        if node.below is _AMBIGUOUS:
+            return None
+        return node.below
+
+    def complete(self, prefix: str) -> Optional[str]:
+        node = self._find(prefix)
+        return node.completion if node else None
+
+
+class Command(NamedTuple):
+    verb: Optional[str]
+    noun: Optional[str] = None
+    # Words left over after the verb, lowercased, for handlers that want them.
+    rest: Tuple[str, ...] = ()
+
+
+class CommandParser:
+    """Turns raw input into a ``Command`` using tries of verbs and nouns."""
+
+    def __init__(self, nouns: Iterable[str] = ()):
+        # Words that may start a command: verbs, and bare directions.
+        self.heads = Trie()
+        self.directions = Trie()
+        self.nouns = Trie()
+
+        for verb, words in VERBS.items():
+            for word in words:
+                self.heads.insert(
+                    word, ("verb", verb), abbreviate=verb not in EXACT_VERBS
+                )
+        for alias, verb in VERB_ALIASES.items():
+            self.heads.insert(
+                alias, ("verb", verb), suggest=False, abbreviate=verb not in EXACT_VERBS
+            )
+        for direction in DIRECTIONS:
+            self.heads.insert(direction, ("direction", direction))
+            self.directions.insert(direction, direction)
+        for alias, direction in DIRECTION_ALIASES.items():
+            self.heads.insert(alias, ("direction", direction), suggest=False)
+            self.directions.insert(alias, direction, suggest=False)
+        for noun in nouns:
+            self.nouns.insert(noun.lower(), noun)
+
+        # Spelling correction for words the tries cannot resolve. "quit"
+        # and "exit" are never guessed at.
+        self.head_spelling = SpellIndex(
+            word
+            for verb, words in VERBS.items()
+            if verb not in EXACT_VERBS
+            for phrase in words
+            for word in phrase.split()[:1]
+        )
+        for direction in DIRECTIONS:
+            self.head_spelling.add(direction)
+        self.direction_spelling = SpellIndex(DIRECTIONS)
+        self.noun_spelling = SpellIndex(
+            word for noun in nouns for word in noun.lower().split()
+        )
+
+        # First words of multi-word phrases; only these need a phrase lookup.
+        self.phrase_starts = {
+            word.split()[0] for words in VERBS.values() for word in words if " " in word
+        }
+        # Exact single-word hits skip the trie walk entirely.
+        self.exact_heads = {
+            word: self.heads.get(word)
+            for words in VERBS.values()
+            for word in words
+            if " " not in word
+        }
+        self.exact_heads.update(
+            (alias, self.heads.get(alias)) for alias in VERB_ALIASES
+        )
+        self.exact_heads.update(
+            (word, self.heads.get(word)) for word in (*DIRECTIONS, *DIRECTION_ALIASES)
+        )
+        self._parsed: Dict[str, Command] = {}
+
+    @classmethod
+    def for_world(cls, world) -> "CommandParser":
+        # Parsers are immutable once built, so every engine on the same world
+        # shares one instead of rebuilding the tries.
+        if not world.digest:
+            return cls(nouns=world.item_rooms)
+        parser = _world_parsers.get(world.digest)
+        if parser is None:
+            parser = _world_parsers[world.digest] = cls(nouns=world.item_rooms)
+        return parser
+
+    def parse(self, text: str) -> Command:
+        # Commands are immutable, so a repeated input reuses its parse.
+        command = self._parsed.get(text)
+        if command is None:
+            if len(self._parsed) >= PARSE_CACHE_SIZE:
+                self._parsed.clear()
+            command = self._parsed[text] = self._parse(text)
+        return command
+
+    def is_quit(self, text: str) -> bool:
+        return self.parse(text).verb == "quit"
+
+    def _head_word(self, word: str) -> str:
+        """``word``, or its spelling correction if it cannot start a command."""
+        if (
+            word in self.exact_heads
+            or word in self.phrase_starts
+            or self.heads.resolve(word) is not None
+        ):
+            return word
+        return self.head_spelling.correct(word) or word
+
+    def _noun(self, words: List[str]) -> Optional[str]:
+        noun = self.nouns.resolve(" ".join(words))
+        if noun is None and self.noun_spelling:
+            corrected = [self.noun_spelling.correct(word) or word for word in words]
+            noun = self.nouns.resolve(" ".join(corrected))
+        return noun
+
+    def _parse(self, text: str) -> Command:
+        words = text.lower().split()
+        while words and words[0] in STOP_WORDS:
+            del words[0]
+        if not words:
+            return Command(None)
+        words[0] = self._head_word(words[0])
+
+        # Multi-word phrases first ("look around" before "look").
+        head = None
+        length = 1
+        if len(words) > 1 and words[0] in self.phrase_starts:
+            head = self.heads.resolve(words[0] + " " + words[1])
+            length = 2
+        if head is None:
+            length = 1
+            head = self.exact_heads.get(words[0]) or self.heads.resolve(words[0])
+        if head is None:
+            return Command(None, rest=tuple(words))
+
+        kind, value = head
+        rest = tuple(words[length:])
+        if value in EXACT_VERBS and rest:
+            return Command(None, rest=tuple(words))
+        if kind == "direction":
+            return Command("go", value, rest)
+        args = [word for word in rest if word not in STOP_WORDS]
+        if value == "go" and args:
+            # Unknown directions are passed through so the engine can say
+            # "You can't go that way." rather than failing to parse.
+            direction = (
+                self.directions.resolve(args[0])
+                or self.direction_spelling.correct(args[0])
+                or args[0]
+            )
+            return Command("go", direction, rest)
+        if args:
+            return Command(value, self._noun(args) or " ".join(args), rest)
+        return Command(value, None, rest)
+
+    def suggest(self, text: str) -> Optional[str]:
+        """Complete the last word of ``text``; returns the full suggestion."""
+        if not text or text.endswith(" "):
+            return None
+        lowered = text.lower()
+        words = lowered.split()
+        completion = None
+        head = self.heads.get(lowered)
+        if head is not None:
+            # Aliases complete to their canonical word, so "e" suggests
+            # "east" rather than "exit".
+            kind, value = head
+            canonical = value if kind == "direction" else VERBS[value][0]
+            if canonical.startswith(lowered):
+                completion = canonical
+        if completion is None:
+            completion = self.heads.complete(lowered)
+        if completion is None and len(words) > 1:
+            # A misspelt verb still picks the right vocabulary: "wlak nor"
+            # completes to "wlak north", which parses as "walk north".
+            head = self.heads.resolve(self._head_word(words[0]))
+            trie = self.directions if head == ("verb", "go") else self.nouns
+            completion = trie.complete(words[-1])
+            if completion is not None:
+                completion = lowered[: len(lowered) - len(words[-1])] + completion
+        if completion is None or completion == lowered:
+            return None
+        return text + completion[len(text) :]
@@ -0,0 +1,17 @@
+import os
+from pathlib import Path
+
+import typer
+
+# Kept free of heavy imports: `nuke` and the CLI entry point load this
+# without pulling in the engine, Pydantic or SQLite.
+
+
+def get_app_dir() -> str:
+    return typer.get_app_dir("adventuregpt")
+
+
+def get_db_path() -> str:
+    app_dir = get_app_dir()
+    os.makedirs(app_dir, exist_ok=True)
+    return str(Path(app_dir) / "adventure.db")
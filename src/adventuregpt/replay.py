@@ -0,0 +1,124 @@
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from .engine import GameEngine
+
+
+def read_commands(lines: Iterable[str]) -> Iterator[str]:
+    """Yield commands from a transcript, skipping blank lines and # comments."""
+    for line in lines:
+        command = line.strip()
+        if command and not command.startswith("#"):
+            yield command
+
+
+def replay(
+    commands: Iterable[str],
+    db_path: str,
+    name: str = "-",
+    world_path: Optional[str] = None,
+    write_behind: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """Run commands through a fresh game and yield one record per command."""
+    engine = GameEngine(
+        db_path=db_path,
+        world_path=world_path,
+        write_behind=write_behind,
+        flush_every=1000,
+        flush_interval_ms=5000,
+    )
+    try:
+        engine.start_new_game()
+        for index, command in enumerate(read_commands(commands)):
+            start = time.perf_counter()
+            response = engine.process_command(command)
+            latency = time.perf_counter() - start
+            yield {
+                "transcript": name,
+                "index": index,
+                "command": command,
+                "response": response,
+                "latency_ms": round(latency * 1000, 4),
+            }
+    finally:
+        engine.close()
+
+
+def replay_to(
+    commands: Iterable[str],
+    out: TextIO,
+    db_path: str,
+    name: str = "-",
+    world_path: Optional[str] = None,
+    write_behind: bool = True,
+) -> Dict[str, Any]:
+    """Replay ``commands`` and write JSONL records to ``out``; returns a summary."""
+    count = 0
+    total = 0.0
+    start = time.perf_counter()
+    for record in replay(commands, db_path, name, world_path, write_behind):
+        out.write(json.dumps(record) + "\n")
+        count += 1
+        total += record["latency_ms"]
+    return {
+        "transcript": name,
+        "commands": count,
+        "engine_ms": round(total, 3),
+        "wall_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+def _replay_file(
+    path: str,
+    out_path: str,
+    db_path: str,
+    world_path: Optional[str],
+    write_behind: bool,
+) -> Dict[str, Any]:
+    # Runs in a worker process: every transcript gets its own database, so
+    # workers never contend on SQLite locks.
+    try:
+        with open(path) as src, open(out_path, "w") as out:
+            return replay_to(src, out, db_path, path, world_path, write_behind)
+    except Exception as e:
+        # One bad transcript must not cost the summaries of all the others.
+        return {"transcript": path, "error": f"{type(e).__name__}: {e}"}
+
+
+def replay_many(
+    paths: List[str],
+    out_dir: str,
+    db_dir: Optional[str] = None,
+    jobs: Optional[int] = None,
+    world_path: Optional[str] = None,
+    write_behind: bool = True,
+) -> List[Dict[str, Any]]:
+    """Replay transcripts in parallel, one ``<out_dir>/<NNNN>-<stem>.jsonl`` each.
+
+    Returns one summary per transcript, in the order given; a transcript that
+    failed has an ``error`` entry instead of counts.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="adventuregpt-replay-") as tmp:
+        db_dir = db_dir or tmp
+        os.makedirs(db_dir, exist_ok=True)
+        tasks = []
+        for i, path in enumerate(paths):
+            stem = f"{i:04d}-{Path(path).stem}"
+            tasks.append(
+                (
+                    path,
+                    os.path.join(out_dir, f"{stem}.jsonl"),
+                    os.path.join(db_dir, f"{stem}.db"),
+                    world_path,
+                    write_behind,
+                )
+            )
+        with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+            futures = [pool.submit(_replay_file, *task) for task in tasks]
+            return [future.result() for future in futures]
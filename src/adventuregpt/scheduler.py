@@ -0,0 +1,258 @@
+import heapq
+import random
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .world import CompiledWorld
+
+# Queue key for events that belong to no room and run every tick.
+EVERYWHERE = -1
+
+# Called with the scheduler, the event and a Random seeded for this
+# occurrence; may move the event (``event.room``) and return a message.
+Action = Callable[["Scheduler", "TimedEvent", random.Random], Optional[str]]
+
+
+_MASK64 = (1 << 64) - 1
+
+
+class SplitMix64(random.Random):
+    """A Random that is cheap to reseed.
+
+    The scheduler reseeds once per event occurrence, and seeding a Mersenne
+    Twister costs more than most actions. Every ``random.Random`` method
+    works on top of ``random`` and ``getrandbits``.
+    """
+
+    def seed(self, a: Optional[int] = None, version: int = 2):
+        self._state = (a or 0) & _MASK64
+        self.gauss_next = None
+
+    def _next(self) -> int:
+        self._state = z = (self._state + 0x9E3779B97F4A7C15) & _MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+        return z ^ (z >> 31)
+
+    def random(self) -> float:
+        return (self._next() >> 11) * (1.0 / (1 << 53))
+
+    def getrandbits(self, k: int) -> int:
+        value = bits = 0
+        while bits < k:
+            value = (value << 64) | self._next()
+            bits += 64
+        return value >> (bits - k)
+
+    def getstate(self):
+        return self._state
+
+    def setstate(self, state: int):
+        self._state = state
+
+
+class TimedEvent:
+    """A one-off or repeating event, or an NPC (a named repeating event)."""
+
+    __slots__ = ("ident", "name", "room", "every", "action", "due", "cancelled")
+
+    def __init__(
+        self,
+        ident: int,
+        name: str,
+        room: int,
+        every: Optional[int],
+        action: Action,
+        due: int,
+    ):
+        self.ident = ident
+        self.name = name
+        self.room = room
+        self.every = every
+        self.action = action
+        self.due = due
+        self.cancelled = False
+
+    def __repr__(self) -> str:
+        return f"TimedEvent({self.name!r}, room={self.room}, due={self.due})"
+
+
+def wander(scheduler: "Scheduler", npc: TimedEvent, rng: random.Random):
+    """NPC behaviour: walk through a random exit."""
+    exits = scheduler.world.neighbours(npc.room)
+    if not len(exits):
+        return None
+    here = npc.room
+    npc.room = exits[rng.randrange(len(exits))]
+    if here == scheduler.player and npc.room != here:
+        return f"The {npc.name} leaves."
+    if npc.room == scheduler.player and npc.room != here:
+        return f"The {npc.name} arrives."
+    return None
+
+
+class Scheduler:
+    """Timed world events and NPCs, advanced one tick per turn.
+
+    Each room has its own heap of events keyed by due tick. A tick only
+    looks at rooms within ``radius`` exits of the player, rooms marked with
+    ``activate`` and events that belong to no room, so NPCs elsewhere cost
+    nothing per turn. A room's overdue events are caught up, without
+    messages, when it next becomes active.
+
+    Every occurrence draws from a Random seeded by (seed, event, due tick),
+    so an event does the same thing whenever it is caught up: after
+    ``catch_up`` a lazy run is in the same state as one that simulated
+    every room on every tick.
+    """
+
+    def __init__(self, world: CompiledWorld, seed: int = 0, radius: int = 1):
+        if radius < 0:
+            raise ValueError("radius must not be negative")
+        self.world = world
+        self.seed = seed
+        self.radius = radius
+        self.now = 0
+        # Room index of the player at the last tick, if any.
+        self.player: Optional[int] = None
+        self.runs = 0
+        self._queues: Dict[int, List[Tuple[int, int, TimedEvent]]] = {}
+        self._marked: Set[int] = set()
+        self._near: Tuple[int, ...] = ()
+        self._seq = 0
+        self._next_ident = 0
+        self._rng = SplitMix64()
+
+    def _room(self, room_id: Optional[str]) -> int:
+        if room_id is None:
+            return EVERYWHERE
+        room = self.world.index_of(room_id)
+        if room is None:
+            raise KeyError(room_id)
+        return room
+
+    def _push(self, event: TimedEvent):
+        self._seq += 1
+        queue = self._queues.get(event.room)
+        if queue is None:
+            queue = self._queues[event.room] = []
+        heapq.heappush(queue, (event.due, self._seq, event))
+
+    def schedule(
+        self,
+        action: Action,
+        delay: int = 1,
+        room: Optional[str] = None,
+        every: Optional[int] = None,
+        name: str = "",
+    ) -> TimedEvent:
+        """Run ``action`` ``delay`` ticks from now, then every ``every`` ticks.
+
+        An event in a ``room`` only runs while that room is active; one with
+        no room runs on time wherever the player is.
+        """
+        if delay < 1:
+            raise ValueError("delay must be at least 1")
+        if every is not None and every < 1:
+            raise ValueError("every must be at least 1")
+        self._next_ident += 1
+        event = TimedEvent(
+            self._next_ident, name, self._room(room), every, action, self.now + delay
+        )
+        self._push(event)
+        return event
+
+    def add_npc(
+        self, name: str, room: str, behaviour: Action = wander, every: int = 1
+    ) -> TimedEvent:
+        return self.schedule(behaviour, every, room=room, every=every, name=name)
+
+    def cancel(self, event: TimedEvent):
+        # Dropped when it reaches the front of its queue.
+        event.cancelled = True
+
+    def activate(self, room_id: str):
+        """Keep ``room_id`` running on every tick, wherever the player is."""
+        self._marked.add(self._room(room_id))
+
+    def deactivate(self, room_id: str):
+        self._marked.discard(self._room(room_id))
+
+    def _within(self, room: int) -> Tuple[int, ...]:
+        seen = {room}
+        frontier = [room]
+        for _ in range(self.radius):
+            reached = []
+            for here in frontier:
+                for target in self.world.neighbours(here):
+                    if target not in seen:
+                        seen.add(target)
+                        reached.append(target)
+            frontier = reached
+        return tuple(seen)
+
+    def tick(self, player: Optional[int], ticks: int = 1) -> List[str]:
+        """Advance ``ticks`` and run what is due near room index ``player``.
+
+        Returns the messages of events due on this tick, in order.
+        """
+        self.now += ticks
+        if player != self.player:
+            self.player = player
+            self._near = self._within(player) if player is not None else ()
+        return self._run((EVERYWHERE, *self._near, *self._marked))
+
+    def catch_up(self):
+        """Run every overdue event in every room."""
+        self._run(tuple(self._queues), everywhere=True)
+
+    def _run(self, rooms: Iterable[int], everywhere: bool = False) -> List[str]:
+        active = set(rooms)
+        pending = list(active)
+        messages: List[Tuple[int, int, str]] = []
+        now = self.now
+        rng = self._rng
+        while pending:
+            room = pending.pop()
+            queue = self._queues.get(room)
+            while queue and queue[0][0] <= now:
+                due, seq, event = heapq.heappop(queue)
+                if event.cancelled:
+                    continue
+                rng.seed((self.seed * 0x9E3779B97F4A7C15) ^ (event.ident << 32) ^ due)
+                text = event.action(self, event, rng)
+                self.runs += 1
+                # Caught-up occurrences happened out of the player's sight.
+                if text and due == now:
+                    messages.append((due, seq, text))
+                if event.every is None or event.cancelled:
+                    continue
+                event.due = due + event.every
+                self._push(event)
+                # An NPC that walked into an active room finishes there.
+                if (
+                    event.room != room
+                    and event.due <= now
+                    and (everywhere or event.room in active)
+                ):
+                    pending.append(event.room)
+            if not queue:
+                self._queues.pop(room, None)
+        messages.sort()
+        return [text for _, _, text in messages]
+
+    def events(self, room_id: Optional[str] = None) -> List[TimedEvent]:
+        """Events queued in ``room_id`` (or in no room), soonest first.
+
+        A room that is not active may still hold NPCs that, caught up,
+        would have walked on.
+        """
+        queue = self._queues.get(self._room(room_id), [])
+        return [event for _, _, event in sorted(queue) if not event.cancelled]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tick": self.now,
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "active_rooms": len(self._marked.union(self._near)),
+            "runs": self.runs,
+        }
@@ -0,0 +1,230 @@
+import hashlib
+import math
+import re
+import time
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .storage import (
+    EXPIRE_GENERATIONS_SQL,
+    GET_GENERATION_SQL,
+    PUT_GENERATION_SQL,
+    SIMILAR_GENERATIONS_SQL,
+    TOUCH_GENERATION_SQL,
+    TRIM_GENERATIONS_SQL,
+    Database,
+    TextStore,
+)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Words and phrases that ask for the same thing, mapped to one canonical
+# form. Two-word phrases are matched before single words.
+INTENT_SYNONYMS = {
+    "look at": "examine",
+    "look in": "examine",
+    "check out": "examine",
+    "inspect": "examine",
+    "check": "examine",
+    "study": "examine",
+    "search": "examine",
+    "x": "examine",
+    "grab": "take",
+    "get": "take",
+    "pick up": "take",
+}
+
+# Words that do not change what is being asked.
+FILLER_WORDS = frozenset(
+    ("a", "an", "the", "please", "some", "this", "that", "my", "carefully")
+)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Size of the hashed feature vectors used for similarity lookups.
+EMBED_DIM = 256
+
+# The size bound is enforced every this many puts, so it may be exceeded by
+# up to this many entries in between.
+TRIM_EVERY = 64
+
+
+def normalize(command: str) -> str:
+    """Canonical form of a command: lowercase words, synonyms and plurals
+    folded and filler dropped, so "Look at the buildings!" and "examine
+    building" match.
+    """
+    words = _WORD.findall(command.lower())
+    intent: List[str] = []
+    i = 0
+    while i < len(words):
+        phrase = " ".join(words[i : i + 2])
+        if phrase in INTENT_SYNONYMS:
+            word = INTENT_SYNONYMS[phrase]
+            i += 2
+        else:
+            word = INTENT_SYNONYMS.get(words[i], words[i])
+            i += 1
+        if word in FILLER_WORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            # Crude plural folding: "lamps" asks about the lamp.
+            word = word[:-1]
+        intent.append(word)
+    return " ".join(intent)
+
+
+def _feature_slot(feature: str) -> Tuple[int, float]:
+    raw = hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest()
+    value = int.from_bytes(raw, "big")
+    return value % EMBED_DIM, 1.0 if value & 0x80000000 else -1.0
+
+
+def embed(intent: str) -> array:
+    """Unit-length hashed bag of words and character trigrams.
+
+    Cheap and local: paraphrases that share most words or spellings
+    ("examin building", "examine the old building") land close together.
+    """
+    vector = [0.0] * EMBED_DIM
+    for word in intent.split():
+        slot, sign = _feature_slot(word)
+        vector[slot] += sign
+        padded = f"#{word}#"
+        for start in range(len(padded) - 2):
+            slot, sign = _feature_slot(padded[start : start + 3])
+            vector[slot] += 0.5 * sign
+    norm = math.sqrt(sum(x * x for x in vector))
+    if norm:
+        vector = [x / norm for x in vector]
+    return array("f", vector)
+
+
+def _best_match(query: array, vectors: Sequence[bytes]) -> Tuple[int, float]:
+    """Index and cosine similarity of the closest of ``vectors``."""
+    if numpy is not None:
+        matrix = numpy.frombuffer(b"".join(vectors), dtype=numpy.float32)
+        scores = matrix.reshape(len(vectors), EMBED_DIM) @ numpy.asarray(query)
+        best = int(scores.argmax())
+        return best, float(scores[best])
+    best, best_score = -1, -1.0
+    for index, blob in enumerate(vectors):
+        score = sum(a * b for a, b in zip(query, array("f", blob)))
+        if score > best_score:
+            best, best_score = index, score
+    return best, best_score
+
+
+class SemanticCache:
+    """Generated text in SQLite, shared by every session using ``database``.
+
+    Entries are keyed by ``context`` (a fingerprint of the scene: room and
+    world flags) and the command's normalized intent. Entries older than
+    ``ttl`` seconds are ignored and later deleted, and the least recently
+    used are trimmed to ``capacity``. With ``similarity`` set, a miss falls
+    back to the closest cached intent for the same context whose embedding
+    has at least that cosine similarity. Replies are kept in ``texts``
+    (a ``TextStore`` on the same database), so identical replies in
+    different scenes are stored once.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        capacity: int = 10_000,
+        ttl: float = 7 * 24 * 3600,
+        similarity: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+        texts: Optional[TextStore] = None,
+    ):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if similarity is not None and not 0 < similarity <= 1:
+            raise ValueError("similarity must be in (0, 1]")
+        self.database = database
+        self.capacity = capacity
+        self.ttl = ttl
+        self.similarity = similarity
+        self.clock = clock
+        self.texts = texts or TextStore(database)
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self._puts = 0
+
+    def get(self, context: str, command: str) -> Optional[str]:
+        intent = normalize(command)
+        now = self.clock()
+        oldest = now - self.ttl
+        with self.database.connection() as conn:
+            row = conn.execute(GET_GENERATION_SQL, (context, intent, oldest))
+            row = row.fetchone()
+            if row is not None:
+                self.hits += 1
+            elif self.similarity is not None and intent:
+                rows = conn.execute(SIMILAR_GENERATIONS_SQL, (context, oldest))
+                rows = rows.fetchall()
+                if rows:
+                    best, score = _best_match(
+                        embed(intent), [row["vector"] for row in rows]
+                    )
+                    if score >= self.similarity:
+                        row = rows[best]
+                        self.similar_hits += 1
+            text = None if row is None else self.texts.get(row["text_hash"])
+            if text is None:
+                self.misses += 1
+                return None
+            conn.execute(TOUCH_GENERATION_SQL, (now, row["id"]))
+            conn.commit()
+            return text
+
+    def put(self, context: str, command: str, text: str):
+        intent = normalize(command)
+        vector = None
+        if self.similarity is not None and intent:
+            vector = embed(intent).tobytes()
+        now = self.clock()
+        with self.database.connection() as conn:
+            key = self.texts.store(conn, text)
+            conn.execute(PUT_GENERATION_SQL, (context, intent, vector, key, now, now))
+            conn.commit()
+        self._puts += 1
+        if self._puts % TRIM_EVERY == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """Delete expired entries, then the least recently used over
+        capacity, then the texts only they used."""
+        with self.database.connection() as conn:
+            removed = conn.execute(
+                EXPIRE_GENERATIONS_SQL, (self.clock() - self.ttl,)
+            ).rowcount
+            size = conn.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+            if size > self.capacity:
+                removed += conn.execute(
+                    TRIM_GENERATIONS_SQL, (size - self.capacity,)
+                ).rowcount
+            conn.commit()
+        self.texts.sweep()
+        return removed
+
+    def clear(self):
+        with self.database.connection() as conn:
+            conn.execute("DELETE FROM generations")
+            conn.commit()
+        self.texts.sweep()
+
+    def stats(self) -> Dict[str, int]:
+        with self.database.connection() as conn:
+            size = conn.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+        return {
+            "size": size,
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,211 @@
+import asyncio
+import json
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from .engine import GameEngine
+from .knowledge import KnowledgeGraph
+from .llm import LLMClient
+from .metrics import Metrics
+from .semantic import SemanticCache
+from .storage import Database, GameStorage
+from .world import CompiledWorld
+
+
+class EnginePool:
+    """LRU cache of live engines keyed by session name.
+
+    Engines run in write-behind mode; an evicted engine is flushed to storage
+    and transparently reloaded the next time its session sends a command.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        world: CompiledWorld,
+        capacity: int = 1024,
+        flush_every: int = 50,
+        flush_interval_ms: int = 2000,
+        llm: Optional[LLMClient] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        knowledge: Optional[KnowledgeGraph] = None,
+        metrics: Optional[Metrics] = None,
+    ):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.database = database
+        self.world = world
+        self.capacity = capacity
+        self.flush_every = flush_every
+        self.flush_interval_ms = flush_interval_ms
+        self.llm = llm
+        self.semantic_cache = semantic_cache
+        self.knowledge = knowledge
+        self.metrics = metrics
+        self._engines: "OrderedDict[str, GameEngine]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._engines)
+
+    def __contains__(self, session: str) -> bool:
+        return session in self._engines
+
+    def get(self, session: str) -> GameEngine:
+        engine = self._engines.get(session)
+        if engine is not None:
+            self._engines.move_to_end(session)
+            self.hits += 1
+            return engine
+
+        self.misses += 1
+        engine = GameEngine(
+            world=self.world,
+            storage=GameStorage(session=session, database=self.database),
+            write_behind=True,
+            flush_every=self.flush_every,
+            flush_interval_ms=self.flush_interval_ms,
+            llm=self.llm,
+            semantic_cache=self.semantic_cache,
+            knowledge=self.knowledge,
+            metrics=self.metrics,
+        )
+        engine.resume_game()
+        self._engines[session] = engine
+        if len(self._engines) > self.capacity:
+            _, evicted = self._engines.popitem(last=False)
+            evicted.close()
+            self.evictions += 1
+        return engine
+
+    def flush_due(self):
+        for engine in self._engines.values():
+            engine.flush_if_due()
+
+    def close(self):
+        while self._engines:
+            _, engine = self._engines.popitem()
+            engine.close()
+
+
+class GameServer:
+    """Line-based TCP server hosting many sessions in one process.
+
+    Protocol: the client's first line is ``session <name>``; every following
+    line is a game command. Each reply is a single JSON object per line,
+    ``{"session": ..., "response": ...}`` or ``{"error": ...}``.
+    """
+
+    def __init__(
+        self,
+        pool: EnginePool,
+        host: str = "127.0.0.1",
+        port: int = 4000,
+        flush_interval: float = 0.5,
+    ):
+        self.pool = pool
+        self.host = host
+        self.port = port
+        self.flush_interval = flush_interval
+        self.connections = 0
+        # Writers of open connections, closed on shutdown: since Python 3.12
+        # Server.wait_closed() waits for every connection handler to finish.
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._server: Optional[asyncio.Server] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def start(self) -> asyncio.Server:
+        # A deep accept backlog so thousands of clients can connect at once.
+        self._server = await asyncio.start_server(
+            self._handle, self.host, self.port, limit=4096, backlog=4096
+        )
+        # Port 0 means "pick one"; report what we actually got.
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._flusher = asyncio.create_task(self._flush_loop())
+        return self._server
+
+    async def stop(self):
+        try:
+            if self._flusher:
+                self._flusher.cancel()
+            if self._server:
+                self._server.close()
+                for writer in list(self._writers):
+                    writer.close()
+                await self._server.wait_closed()
+        finally:
+            # Always flush every session's write-behind state.
+            self.pool.close()
+
+    async def serve_forever(self):
+        server = await self.start()
+        try:
+            await server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.pool.flush_due()
+
+    @staticmethod
+    def _reply(writer: asyncio.StreamWriter, payload: Dict[str, str]):
+        writer.write(json.dumps(payload).encode("utf-8") + b"\n")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.add(writer)
+        session: Optional[str] = None
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                if not line:
+                    break
+                text = line.decode("utf-8", errors="replace").strip()
+                if not text:
+                    continue
+
+                if session is None:
+                    verb, _, name = text.partition(" ")
+                    if verb.lower() != "session" or not name.strip():
+                        self._reply(writer, {"error": "Start with: session <name>"})
+                    else:
+                        session = name.strip()
+                        engine = self.pool.get(session)
+                        self._reply(
+                            writer,
+                            {
+                                "session": session,
+                                "response": engine.process_command("look"),
+                            },
+                        )
+                else:
+                    # Commands are CPU-bound and take microseconds, so they run
+                    # inline; write-behind keeps SQLite commits off this path.
+                    engine = self.pool.get(session)
+                    if engine.wants_llm(text):
+                        # Generation is awaited, not run inline, so other
+                        # sessions keep playing and their requests can join
+                        # the same batch.
+                        response = await engine.narrate_async(text)
+                    else:
+                        response = engine.process_command(text)
+                    self._reply(writer, {"session": session, "response": response})
+                    if engine.parser.is_quit(text):
+                        await writer.drain()
+                        break
+                await writer.drain()
+        finally:
+            self.connections -= 1
+            self._writers.discard(writer)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
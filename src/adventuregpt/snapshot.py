@@ -0,0 +1,149 @@
+import struct
+from typing import Any, Dict, List, Tuple
+
+from .models import Inventory, PlayerState
+
+# Compact, versioned binary snapshots of a game (player state plus flags).
+# Layout: MAGIC, a version byte, then one tagged value: a map with "room",
+# "inventory" and "flags". Values are encoded msgpack-style as a one-byte
+# tag followed by a varint length or the payload. Integers are zigzag
+# varints, floats little-endian doubles and strings UTF-8.
+MAGIC = b"AGS"
+VERSION = 1
+
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _LIST, _MAP = range(8)
+_DOUBLE = struct.Struct("<d")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def _varint(out: bytearray, value: int):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _str(out: bytearray, value: str):
+    raw = value.encode("utf-8")
+    _varint(out, len(raw))
+    out += raw
+
+
+def _encode(out: bytearray, value: Any):
+    if value is None:
+        out.append(_NONE)
+    elif value is True:
+        out.append(_TRUE)
+    elif value is False:
+        out.append(_FALSE)
+    elif isinstance(value, int):
+        out.append(_INT)
+        _varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+    elif isinstance(value, float):
+        out.append(_FLOAT)
+        out += _DOUBLE.pack(value)
+    elif isinstance(value, str):
+        out.append(_STR)
+        _str(out, value)
+    elif isinstance(value, (list, tuple)):
+        out.append(_LIST)
+        _varint(out, len(value))
+        for item in value:
+            _encode(out, item)
+    elif isinstance(value, dict):
+        out.append(_MAP)
+        _varint(out, len(value))
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise SnapshotError(f"Map keys must be strings, not {key!r}")
+            _str(out, key)
+            _encode(out, item)
+    else:
+        raise SnapshotError(f"Cannot snapshot value of type {type(value).__name__}")
+
+
+class _Reader:
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data: bytes, pos: int):
+        self.data = data
+        self.pos = pos
+
+    def varint(self) -> int:
+        result = shift = 0
+        while True:
+            byte = self.data[self.pos]
+            self.pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def text(self) -> str:
+        length = self.varint()
+        end = self.pos + length
+        if end > len(self.data):
+            raise IndexError
+        value = self.data[self.pos : end].decode("utf-8")
+        self.pos = end
+        return value
+
+    def value(self) -> Any:
+        tag = self.data[self.pos]
+        self.pos += 1
+        if tag == _NONE:
+            return None
+        if tag == _FALSE:
+            return False
+        if tag == _TRUE:
+            return True
+        if tag == _INT:
+            n = self.varint()
+            return n >> 1 if not n & 1 else -((n + 1) >> 1)
+        if tag == _FLOAT:
+            (value,) = _DOUBLE.unpack_from(self.data, self.pos)
+            self.pos += _DOUBLE.size
+            return value
+        if tag == _STR:
+            return self.text()
+        if tag == _LIST:
+            return [self.value() for _ in range(self.varint())]
+        if tag == _MAP:
+            return {self.text(): self.value() for _ in range(self.varint())}
+        raise SnapshotError(f"Unknown tag {tag}")
+
+
+def dumps(state: PlayerState, flags: Dict[str, Any]) -> bytes:
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    _encode(
+        out,
+        {
+            "room": state.current_room,
+            "inventory": state.inventory.items,
+            "flags": flags,
+        },
+    )
+    return bytes(out)
+
+
+def loads(data: bytes) -> Tuple[PlayerState, Dict[str, Any]]:
+    if data[: len(MAGIC)] != MAGIC:
+        raise SnapshotError("Not a game snapshot")
+    version = data[len(MAGIC)] if len(data) > len(MAGIC) else None
+    if version != VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {version}")
+    reader = _Reader(data, len(MAGIC) + 1)
+    try:
+        body = reader.value()
+        items: List[str] = body["inventory"]
+        state = PlayerState(body["room"], Inventory(items))
+        flags: Dict[str, Any] = body["flags"]
+    except (IndexError, KeyError, TypeError, UnicodeDecodeError) as e:
+        raise SnapshotError(f"Corrupt snapshot: {e!r}") from e
+    if reader.pos != len(data):
+        raise SnapshotError("Corrupt snapshot: trailing data")
+    return state, flags
@@ -0,0 +1,141 @@
+from typing import Dict, Iterable, List, Optional, Set
+
+# Largest edit distance the index is built for.
+MAX_DISTANCE = 2
+
+
+def max_distance(word: str) -> int:
+    """Edits allowed when correcting ``word``: short words are too easy to
+    turn into other words ("in" and "up" are one edit from "on")."""
+    if len(word) < 4:
+        return 0
+    if len(word) < 7:
+        return 1
+    return MAX_DISTANCE
+
+
+def deletes(word: str, distance: int) -> Set[str]:
+    """``word`` with up to ``distance`` characters deleted, itself included."""
+    found = {word}
+    frontier = [word]
+    for _ in range(distance):
+        reached = []
+        for variant in frontier:
+            for i in range(len(variant)):
+                candidate = variant[:i] + variant[i + 1 :]
+                if candidate not in found:
+                    found.add(candidate)
+                    reached.append(candidate)
+        frontier = reached
+    return found
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (a swap of neighbours is one edit),
+    or ``limit + 1`` if it is larger than ``limit``.
+
+    Only cells within ``limit`` of the diagonal can stay under the limit, so
+    only that band of the table is filled in.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    width = len(b)
+    previous2: List[int] = []
+    previous = [j if j <= limit else over for j in range(width + 1)]
+    for i in range(1, len(a) + 1):
+        char_a = a[i - 1]
+        current = [i if i <= limit else over] + [over] * width
+        row_min = current[0]
+        for j in range(max(1, i - limit), min(width, i + limit) + 1):
+            char_b = b[j - 1]
+            cost = previous[j - 1] + (char_a != char_b)
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            if (
+                i > 1
+                and j > 1
+                and char_a == b[j - 2]
+                and a[i - 2] == char_b
+                and previous2[j - 2] + 1 < cost
+            ):
+                cost = previous2[j - 2] + 1
+            current[j] = cost
+            if cost < row_min:
+                row_min = cost
+        if row_min > limit:
+            return over
+        previous2, previous = previous, current
+    return min(previous[-1], over)
+
+
+class SpellIndex:
+    """Spelling correction over a fixed vocabulary, SymSpell-style.
+
+    Every word's deletions (up to ``MAX_DISTANCE`` characters) are indexed
+    up front. A misspelling is looked up through its own deletions, so only
+    the few words sharing one are compared with a real edit distance,
+    however large the vocabulary.
+    """
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.words: Set[str] = set()
+        self._deletes: Dict[str, List[str]] = {}
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str):
+        if word in self.words:
+            return
+        self.words.add(word)
+        for variant in deletes(word, min(MAX_DISTANCE, len(word) - 1)):
+            self._deletes.setdefault(variant, []).append(word)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.words
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def correct(self, word: str) -> Optional[str]:
+        """The one closest vocabulary word within ``max_distance(word)``
+        edits, or None if there is none or several tie."""
+        if word in self.words:
+            return word
+        limit = max_distance(word)
+        if not limit:
+            return None
+        best: Optional[str] = None
+        best_distance = limit + 1
+        tied = False
+        seen = set()
+        found = {word}
+        frontier = [word]
+        # A word d edits away shares a variant with ``word`` at most d
+        # deletions deep, so once one that close is found (ties included)
+        # the deeper variants cannot beat it.
+        for depth in range(limit + 1):
+            if depth:
+                reached = []
+                for variant in frontier:
+                    for i in range(len(variant)):
+                        candidate = variant[:i] + variant[i + 1 :]
+                        if candidate not in found:
+                            found.add(candidate)
+                            reached.append(candidate)
+                frontier = reached
+            for variant in frontier:
+                for candidate in self._deletes.get(variant, ()):
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    distance = edit_distance(word, candidate, limit)
+                    if distance < best_distance:
+                        best, best_distance, tied = candidate, distance, False
+                    elif distance == best_distance:
+                        tied = True
+            if best_distance <= depth:
+                break
+        return None if tied else best
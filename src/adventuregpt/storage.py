@@ -1,95 +1,1128 @@
+import hashlib
 import json
 import os
 import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
 from contextlib import contextmanager
-from pathlib import Path
-from typing import Any, Dict, List, Optional
-
-import typer
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
+from . import snapshot
+from .metrics import Metrics
 from .models import Inventory, PlayerState
+from .paths import get_db_path
 
+# Valid values for PRAGMA synchronous. NORMAL is safe with WAL (a crash can lose
+# the last few commits but never corrupts the database) and avoids an fsync per
+# commit, which is what made every move pay for a disk flush.
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
 
-def get_db_path() -> str:
-    app_dir = typer.get_app_dir("adventuregpt")
-    os.makedirs(app_dir, exist_ok=True)
-    return str(Path(app_dir) / "adventure.db")
+# Statements are kept as module constants so the connection's statement cache
+# (keyed by SQL text) hands back the same prepared statement on every call.
+SAVE_PLAYER_SQL = (
+    "INSERT OR REPLACE INTO player (session_id, current_room, inventory) "
+    "VALUES (?, ?, ?)"
+)
+LOAD_PLAYER_SQL = "SELECT current_room, inventory FROM player WHERE session_id = ?"
+# Delta saves: a move only rewrites the room, not the whole inventory.
+UPDATE_ROOM_SQL = "UPDATE player SET current_room = ? WHERE session_id = ?"
+UPDATE_INVENTORY_SQL = "UPDATE player SET inventory = ? WHERE session_id = ?"
+# World flags live in copy-on-write layers: a layer holds only the flags set
+# since it was forked and falls back to its parent for the rest. The live
+# game and every save slot each own one leaf layer; shared ancestors are
+# never written again.
+LIVE_LAYER_SQL = "SELECT layer_id FROM sessions WHERE id = ?"
+SET_LIVE_LAYER_SQL = "UPDATE sessions SET layer_id = ? WHERE id = ?"
+# Leaves with fewer flags of their own than this are copied when forked.
+FORK_COPY_LIMIT = 64
+SET_FLAG_SQL = (
+    "INSERT OR REPLACE INTO world_state (layer_id, key, value) "
+    "VALUES ((SELECT layer_id FROM sessions WHERE id = ?), ?, ?)"
+)
+_CHAIN = """
+    WITH RECURSIVE chain (id, depth) AS (
+        SELECT layer_id, 0 FROM sessions WHERE id = ?
+        UNION ALL
+        SELECT layers.parent, chain.depth + 1 FROM layers JOIN chain
+        ON layers.id = chain.id WHERE layers.parent IS NOT NULL
+    )
+"""
+GET_FLAG_SQL = (
+    _CHAIN + "SELECT value FROM world_state JOIN chain ON layer_id = chain.id "
+    "WHERE key = ? ORDER BY depth LIMIT 1"
+)
+# Nearest layer last, so later rows override earlier ones.
+ALL_FLAGS_SQL = (
+    _CHAIN + "SELECT key, value FROM world_state JOIN chain ON layer_id = chain.id "
+    "ORDER BY depth DESC"
+)
+SLOT_SQL = (
+    "SELECT name, layer_id, current_room, inventory, saved_at FROM slots "
+    "WHERE session_id = ? AND name = ?"
+)
+SAVE_SLOT_SQL = (
+    "INSERT OR REPLACE INTO slots "
+    "(session_id, name, layer_id, current_room, inventory, saved_at) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+SAVE_SNAPSHOT_SQL = "INSERT OR REPLACE INTO snapshots (session_id, data) VALUES (?, ?)"
+LOAD_SNAPSHOT_SQL = "SELECT data FROM snapshots WHERE session_id = ?"
+# The event log: ``events`` is append-only, ``timeline`` maps each turn of the
+# current line of play to its event (undone turns stay there for redo until
+# a new turn replaces them).
+INSERT_EVENT_SQL = (
+    "INSERT INTO events (session_id, turn, command, data, checkpoint) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+TRUNCATE_TIMELINE_SQL = "DELETE FROM timeline WHERE session_id = ? AND turn >= ?"
+INSERT_TIMELINE_SQL = (
+    "INSERT INTO timeline (session_id, turn, event_id) VALUES (?, ?, ?)"
+)
+SET_TURN_SQL = "UPDATE sessions SET turn = ? WHERE id = ?"
+LAST_CHECKPOINT_SQL = (
+    "SELECT timeline.turn, timeline.event_id FROM timeline "
+    "JOIN events ON events.id = timeline.event_id "
+    "WHERE timeline.session_id = ? AND timeline.turn <= ? AND events.checkpoint "
+    "ORDER BY timeline.turn DESC LIMIT 1"
+)
+REPLAY_SQL = (
+    "SELECT timeline.turn, events.data FROM timeline "
+    "JOIN events ON events.id = timeline.event_id "
+    "WHERE timeline.session_id = ? AND timeline.turn BETWEEN ? AND ? "
+    "ORDER BY timeline.turn"
+)
+# Generated text shared by every session (semantic.SemanticCache). Entries
+# are keyed by scene context and normalized intent; ``vector`` is the
+# intent's embedding when similarity lookups are on. The text itself is in
+# ``texts`` (TextStore), so a reply given in many scenes is stored once.
+GET_GENERATION_SQL = (
+    "SELECT id, text_hash FROM generations "
+    "WHERE context = ? AND intent = ? AND created_at >= ?"
+)
+SIMILAR_GENERATIONS_SQL = (
+    "SELECT id, vector, text_hash FROM generations "
+    "WHERE context = ? AND vector IS NOT NULL AND created_at >= ?"
+)
+TOUCH_GENERATION_SQL = "UPDATE generations SET used_at = ? WHERE id = ?"
+PUT_GENERATION_SQL = (
+    "INSERT INTO generations "
+    "(context, intent, vector, text_hash, created_at, used_at) "
+    "VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (context, intent) DO UPDATE SET vector = excluded.vector, "
+    "text_hash = excluded.text_hash, created_at = excluded.created_at, "
+    "used_at = excluded.used_at"
+)
+EXPIRE_GENERATIONS_SQL = "DELETE FROM generations WHERE created_at < ?"
+TRIM_GENERATIONS_SQL = (
+    "DELETE FROM generations WHERE id IN "
+    "(SELECT id FROM generations ORDER BY used_at LIMIT ?)"
+)
+# Knowledge graph triples (knowledge.KnowledgeGraph). ``facts`` is keyed
+# subject-first; facts_ops and facts_pso cover lookups by object and by
+# relation, so every query is answered from an index alone.
+GRAPH_ID_SQL = "SELECT id FROM graphs WHERE name = ?"
+ADD_FACT_SQL = (
+    "INSERT OR IGNORE INTO facts (graph_id, subject, relation, object) "
+    "VALUES (?, ?, ?, ?)"
+)
+REMOVE_FACT_SQL = (
+    "DELETE FROM facts "
+    "WHERE graph_id = ? AND subject = ? AND relation = ? AND object = ?"
+)
+FACTS_FROM_SQL = "SELECT relation, object FROM facts WHERE graph_id = ? AND subject = ?"
+FACTS_TO_SQL = "SELECT relation, subject FROM facts WHERE graph_id = ? AND object = ?"
+FACTS_BY_RELATION_SQL = (
+    "SELECT subject, object FROM facts WHERE graph_id = ? AND relation = ?"
+)
+COUNT_FACTS_SQL = "SELECT COUNT(*) FROM facts WHERE graph_id = ?"
+# Content-addressed text (TextStore). A pinned text is referred to from
+# outside the database (a transcript), so only unpinned texts that no
+# generation refers to are swept.
+PUT_TEXT_SQL = (
+    "INSERT INTO texts (hash, codec, data, pinned) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (hash) DO UPDATE SET pinned = 1 WHERE excluded.pinned"
+)
+GET_TEXT_SQL = "SELECT codec, data, pinned FROM texts WHERE hash = ?"
+SWEEP_TEXTS_SQL = (
+    "DELETE FROM texts WHERE NOT pinned "
+    "AND hash NOT IN (SELECT text_hash FROM generations)"
+)
 
+# Stored in PRAGMA user_version. Version 1 is the original single-player
+# schema (player.id = 1, world_state keyed by flag name only); version 3
+# adds quick-save snapshots, version 4 save slots with layered flags,
+# version 5 the event log, version 6 the generated-text cache, version 7
+# the knowledge graph and version 8 the text store.
+SCHEMA_VERSION = 8
 
-class GameStorage:
-    def __init__(self, db_path: Optional[str] = None):
+# Codecs of stored text, by the id kept in ``texts.codec``.
+TEXT_PLAIN = 0
+TEXT_ZLIB = 1
+TEXT_ZSTD = 2
+TEXT_CODECS = {"none": TEXT_PLAIN, "zlib": TEXT_ZLIB, "zstd": TEXT_ZSTD}
+# Shorter texts are stored as they are: a compressed frame's header and
+# checksum cost more than compression saves on a line or two.
+COMPRESS_MIN = 64
+
+DEFAULT_SESSION = "default"
+
+
+class SlotInfo(NamedTuple):
+    name: str
+    current_room: str
+    saved_at: float
+
+
+class Event(NamedTuple):
+    turn: int
+    command: str
+    # Fields the command changed ("room", "inventory"); every field for a
+    # checkpoint, which replays start from.
+    data: Dict[str, Any]
+    checkpoint: bool = False
+
+
+def checkpoint_event(turn: int, command: str, state: PlayerState) -> Event:
+    data = {"room": state.current_room, "inventory": state.inventory.items}
+    return Event(turn, command, data, True)
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ValueError(
+            "zstd text compression requires zstandard (pip install zstandard)"
+        ) from e
+    return zstandard
+
+
+def text_key(text: str) -> bytes:
+    """Content address of ``text``: the same for every codec."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def encode_text(text: str, codec: str = "zlib") -> Tuple[int, bytes]:
+    """``(codec id, data)`` for ``text``, compressed only if that is smaller."""
+    raw = text.encode("utf-8")
+    if codec == "none" or len(raw) < COMPRESS_MIN:
+        return TEXT_PLAIN, raw
+    if codec == "zstd":
+        codec_id, data = TEXT_ZSTD, _zstd().ZstdCompressor().compress(raw)
+    else:
+        codec_id, data = TEXT_ZLIB, zlib.compress(raw)
+    if len(data) >= len(raw):
+        return TEXT_PLAIN, raw
+    return codec_id, data
+
+
+def decode_text(codec_id: int, data: bytes) -> str:
+    if codec_id == TEXT_ZLIB:
+        data = zlib.decompress(data)
+    elif codec_id == TEXT_ZSTD:
+        data = _zstd().ZstdDecompressor().decompress(data)
+    return data.decode("utf-8")
+
+
+class Database:
+    """A long-lived SQLite connection, shareable by many GameStorage sessions."""
+
+    def __init__(self, db_path: Optional[str] = None, synchronous: str = "NORMAL"):
         self.db_path = db_path if db_path else get_db_path()
-        self._init_db()
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(
+                f"synchronous must be one of {', '.join(SYNCHRONOUS_LEVELS)}"
+            )
+        self.synchronous = synchronous
+        # One long-lived connection. The lock serialises access so the
+        # connection can be shared with worker threads.
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.metrics: Optional[Metrics] = None
+        self._migrate()
 
-    @contextmanager
-    def _get_conn(self):
-        conn = sqlite3.connect(self.db_path)
+    def instrument(self, metrics: Optional[Metrics]):
+        """Count statements and commits and time each storage operation
+        (one ``connection()`` block) into ``metrics``; None turns it off."""
+        with self._lock:
+            self.metrics = metrics
+            if self._conn is not None:
+                self._conn.set_trace_callback(self._trace if metrics else None)
+
+    def _trace(self, statement: str):
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.count("storage.statements")
+            if statement.startswith("COMMIT"):
+                metrics.count("storage.commits")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, cached_statements=128
+        )
         conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-        finally:
-            conn.close()
-
-    def _init_db(self):
-        with self._get_conn() as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS player (
-                    id INTEGER PRIMARY KEY CHECK (id = 1),
-                    current_room TEXT NOT NULL,
-                    inventory TEXT DEFAULT '[]'
-                )
-            """)
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS world_state (
-                    key TEXT PRIMARY KEY,
-                    value TEXT
-                )
-            """)
+        # WAL is a no-op for in-memory databases; ignore the returned mode.
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        if self.metrics is not None:
+            conn.set_trace_callback(self._trace)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._connect()
+            metrics = self.metrics
+            start = time.perf_counter() if metrics is not None else 0.0
+            try:
+                yield self._conn
+            except BaseException:
+                # The connection is long-lived: a failed write must not leave
+                # a half-finished transaction for the next commit to pick up.
+                self._conn.rollback()
+                raise
+            finally:
+                if metrics is not None:
+                    metrics.observe("storage.op", time.perf_counter() - start)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _migrate(self):
+        with self.connection() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                return
+            conn.execute("BEGIN")
+            if version < 2:
+                self._migrate_sessions(conn, version)
+            if version < 3:
+                conn.execute("""
+                    CREATE TABLE snapshots (
+                        session_id INTEGER PRIMARY KEY REFERENCES sessions (id),
+                        data BLOB NOT NULL
+                    )
+                """)
+            if version < 4:
+                self._migrate_slots(conn)
+            if version < 5:
+                self._migrate_events(conn)
+            if version < 6:
+                conn.execute("""
+                    CREATE TABLE generations (
+                        id INTEGER PRIMARY KEY,
+                        context TEXT NOT NULL,
+                        intent TEXT NOT NULL,
+                        vector BLOB,
+                        text TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        used_at REAL NOT NULL,
+                        UNIQUE (context, intent)
+                    )
+                """)
+                conn.execute("CREATE INDEX generations_used ON generations (used_at)")
+            if version < 7:
+                self._migrate_facts(conn)
+            if version < 8:
+                self._migrate_texts(conn)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
             conn.commit()
 
+    def _migrate_sessions(self, conn: sqlite3.Connection, version: int):
+        legacy = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'player'"
+        ).fetchone()
+        if legacy:
+            conn.execute("ALTER TABLE player RENAME TO player_v1")
+            conn.execute("ALTER TABLE world_state RENAME TO world_state_v1")
+        conn.execute("""
+            CREATE TABLE sessions (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE player (
+                session_id INTEGER PRIMARY KEY REFERENCES sessions (id),
+                current_room TEXT NOT NULL,
+                inventory TEXT DEFAULT '[]'
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE world_state (
+                session_id INTEGER NOT NULL REFERENCES sessions (id),
+                key TEXT NOT NULL,
+                value TEXT,
+                PRIMARY KEY (session_id, key)
+            ) WITHOUT ROWID
+        """)
+        if legacy:
+            # The single-player save becomes the default session.
+            conn.execute(
+                "INSERT INTO sessions (id, name) VALUES (1, ?)", (DEFAULT_SESSION,)
+            )
+            conn.execute(
+                "INSERT INTO player SELECT 1, current_room, inventory FROM player_v1"
+            )
+            conn.execute(
+                "INSERT INTO world_state SELECT 1, key, value FROM world_state_v1"
+            )
+            conn.execute("DROP TABLE player_v1")
+            conn.execute("DROP TABLE world_state_v1")
+
+    def _migrate_slots(self, conn: sqlite3.Connection):
+        conn.execute("""
+            CREATE TABLE layers (
+                id INTEGER PRIMARY KEY,
+                parent INTEGER REFERENCES layers (id)
+            )
+        """)
+        conn.execute("CREATE INDEX layers_parent ON layers (parent)")
+        # Each existing session's flags become its live layer, same id.
+        conn.execute("INSERT INTO layers (id) SELECT id FROM sessions")
+        conn.execute(
+            "ALTER TABLE sessions ADD COLUMN layer_id INTEGER REFERENCES layers (id)"
+        )
+        conn.execute("UPDATE sessions SET layer_id = id")
+        conn.execute("ALTER TABLE world_state RENAME TO world_state_v3")
+        conn.execute("""
+            CREATE TABLE world_state (
+                layer_id INTEGER NOT NULL REFERENCES layers (id),
+                key TEXT NOT NULL,
+                value TEXT,
+                PRIMARY KEY (layer_id, key)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("INSERT INTO world_state SELECT * FROM world_state_v3")
+        conn.execute("DROP TABLE world_state_v3")
+        # The UNIQUE index makes looking up, listing and switching slots
+        # cheap however many a session has.
+        conn.execute("""
+            CREATE TABLE slots (
+                id INTEGER PRIMARY KEY,
+                session_id INTEGER NOT NULL REFERENCES sessions (id),
+                name TEXT NOT NULL,
+                layer_id INTEGER NOT NULL REFERENCES layers (id),
+                current_room TEXT NOT NULL,
+                inventory TEXT NOT NULL,
+                saved_at REAL NOT NULL,
+                UNIQUE (session_id, name)
+            )
+        """)
+
+    def _migrate_events(self, conn: sqlite3.Connection):
+        conn.execute("""
+            CREATE TABLE events (
+                id INTEGER PRIMARY KEY,
+                session_id INTEGER NOT NULL REFERENCES sessions (id),
+                turn INTEGER NOT NULL,
+                command TEXT NOT NULL,
+                data TEXT NOT NULL,
+                checkpoint INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE INDEX events_session ON events (session_id, id)")
+        conn.execute("""
+            CREATE TABLE timeline (
+                session_id INTEGER NOT NULL REFERENCES sessions (id),
+                turn INTEGER NOT NULL,
+                event_id INTEGER NOT NULL REFERENCES events (id),
+                PRIMARY KEY (session_id, turn)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("ALTER TABLE sessions ADD COLUMN turn INTEGER NOT NULL DEFAULT 0")
+
+    def _migrate_facts(self, conn: sqlite3.Connection):
+        conn.execute("""
+            CREATE TABLE graphs (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE facts (
+                graph_id INTEGER NOT NULL REFERENCES graphs (id),
+                subject TEXT NOT NULL,
+                relation TEXT NOT NULL,
+                object TEXT NOT NULL,
+                PRIMARY KEY (graph_id, subject, relation, object)
+            ) WITHOUT ROWID
+        """)
+        # Index entries of a WITHOUT ROWID table carry the whole primary
+        # key, so both indexes cover every column.
+        conn.execute("CREATE INDEX facts_ops ON facts (graph_id, object, relation)")
+        conn.execute("CREATE INDEX facts_pso ON facts (graph_id, relation, subject)")
+
+    def _migrate_texts(self, conn: sqlite3.Connection):
+        conn.execute("""
+            CREATE TABLE texts (
+                hash BLOB PRIMARY KEY,
+                codec INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                pinned INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        """)
+        # Generated text moves into ``texts``; entries keep its hash.
+        conn.execute("DROP INDEX generations_used")
+        conn.execute("ALTER TABLE generations RENAME TO generations_v7")
+        conn.execute("""
+            CREATE TABLE generations (
+                id INTEGER PRIMARY KEY,
+                context TEXT NOT NULL,
+                intent TEXT NOT NULL,
+                vector BLOB,
+                text_hash BLOB NOT NULL REFERENCES texts (hash),
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL,
+                UNIQUE (context, intent)
+            )
+        """)
+        conn.execute("CREATE INDEX generations_used ON generations (used_at)")
+        rows = conn.execute(
+            "SELECT id, context, intent, vector, text, created_at, used_at "
+            "FROM generations_v7"
+        )
+        for row in rows.fetchall():
+            key = text_key(row["text"])
+            conn.execute(PUT_TEXT_SQL, (key, *encode_text(row["text"]), 0))
+            conn.execute(
+                "INSERT INTO generations VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    row["id"],
+                    row["context"],
+                    row["intent"],
+                    row["vector"],
+                    key,
+                    row["created_at"],
+                    row["used_at"],
+                ),
+            )
+        conn.execute("DROP TABLE generations_v7")
+
+    def session_id(self, name: str) -> int:
+        with self.connection() as conn:
+            row = conn.execute("SELECT id FROM sessions WHERE name = ?", (name,))
+            row = row.fetchone()
+            if row:
+                return row[0]
+            layer = conn.execute("INSERT INTO layers DEFAULT VALUES").lastrowid
+            session = conn.execute(
+                "INSERT INTO sessions (name, layer_id) VALUES (?, ?)", (name, layer)
+            ).lastrowid
+            conn.commit()
+            return session
+
+    def sessions(self) -> List[str]:
+        with self.connection() as conn:
+            rows = conn.execute("SELECT name FROM sessions ORDER BY id").fetchall()
+            return [row["name"] for row in rows]
+
+
+class TextStore:
+    """Each distinct text stored once in ``texts``, keyed by a hash of its
+    contents and compressed with ``codec`` ("zlib", "zstd" or "none") when
+    that makes it smaller.
+
+    Other rows refer to a text by its key. Reads are served from an LRU of
+    up to ``cache_size`` decoded texts. A text put with ``pin`` survives
+    ``sweep``, for keys held outside the database such as transcripts.
+    """
+
+    def __init__(self, database: Database, codec: str = "zlib", cache_size: int = 1024):
+        if codec not in TEXT_CODECS:
+            raise ValueError(f"codec must be one of {', '.join(TEXT_CODECS)}")
+        if codec == "zstd":
+            # Fail now rather than on the first put.
+            _zstd()
+        if cache_size < 1:
+            raise ValueError("cache_size must be at least 1")
+        self.database = database
+        self.codec = codec
+        self.cache_size = cache_size
+        # Shared by the UI and engine threads, like the connection.
+        self._lock = threading.Lock()
+        # key -> (text, pinned)
+        self._cache: "OrderedDict[bytes, Tuple[str, bool]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, key: bytes, text: str, pinned: bool):
+        with self._lock:
+            self._cache[key] = (text, pinned)
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def store(self, conn: sqlite3.Connection, text: str, pin: bool = False) -> bytes:
+        """Add ``text`` in the caller's transaction and return its key."""
+        key = text_key(text)
+        with self._lock:
+            cached = self._cache.get(key)
+        # Pinned texts are never swept, so one known to be stored is skipped.
+        if cached is None or not cached[1]:
+            conn.execute(PUT_TEXT_SQL, (key, *encode_text(text, self.codec), pin))
+        self._remember(key, text, pin or (cached is not None and cached[1]))
+        return key
+
+    def put(self, text: str, pin: bool = False) -> bytes:
+        with self.database.connection() as conn:
+            key = self.store(conn, text, pin)
+            if conn.in_transaction:
+                conn.commit()
+        return key
+
+    def get(self, key: bytes) -> Optional[str]:
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+        with self.database.connection() as conn:
+            row = conn.execute(GET_TEXT_SQL, (key,)).fetchone()
+        if row is None:
+            return None
+        text = decode_text(row["codec"], row["data"])
+        self._remember(key, text, bool(row["pinned"]))
+        return text
+
+    def sweep(self) -> int:
+        """Delete unpinned texts that no generation refers to."""
+        with self.database.connection() as conn:
+            removed = conn.execute(SWEEP_TEXTS_SQL).rowcount
+            conn.commit()
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self.database.connection() as conn:
+            size, stored = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM texts"
+            ).fetchone()
+        return {
+            "size": size,
+            "bytes": stored,
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class GameStorage:
+    """One player's save, stored under ``session`` in a (possibly shared) Database."""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        synchronous: str = "NORMAL",
+        session: str = DEFAULT_SESSION,
+        database: Optional[Database] = None,
+    ):
+        self._owns_database = database is None
+        self.database = database or Database(db_path, synchronous)
+        self.db_path = self.database.db_path
+        self.session = session
+        self.session_id = self.database.session_id(session)
+
+    @property
+    def history_path(self) -> str:
+        # The transcript sits next to the database so it is part of the
+        # save: a new game starts it afresh and `nuke` removes it.
+        return f"{self.db_path}-history-{self.session_id}.jsonl"
+
+    def _get_conn(self):
+        return self.database.connection()
+
+    def close(self):
+        # A shared database outlives the sessions that use it.
+        if self._owns_database:
+            self.database.close()
+
     def new_game(self, initial_state: PlayerState):
+        if os.path.exists(self.history_path):
+            os.remove(self.history_path)
         with self._get_conn() as conn:
-            conn.execute("DELETE FROM player")
-            conn.execute("DELETE FROM world_state")
+            conn.execute("DELETE FROM player WHERE session_id = ?", (self.session_id,))
+            conn.execute(
+                "DELETE FROM snapshots WHERE session_id = ?", (self.session_id,)
+            )
+            # Save slots are kept; only the live game's flags start afresh.
+            self._set_live_layer(conn, self._new_layer(conn, None))
+            self._write_full(conn, initial_state)
             conn.execute(
-                "INSERT INTO player (id, current_room, inventory) VALUES (1, ?, ?)",
-                (initial_state.current_room, json.dumps(initial_state.inventory.items)),
+                "DELETE FROM timeline WHERE session_id = ?", (self.session_id,)
             )
+            conn.execute("DELETE FROM events WHERE session_id = ?", (self.session_id,))
+            self._append_events(conn, [checkpoint_event(0, "new game", initial_state)])
             conn.commit()
+        initial_state.mark_saved()
+
+    def _write_full(self, conn: sqlite3.Connection, state: PlayerState):
+        conn.execute(
+            SAVE_PLAYER_SQL,
+            (
+                self.session_id,
+                state.current_room,
+                json.dumps(state.inventory.items),
+            ),
+        )
+
+    def _write_player(self, conn: sqlite3.Connection, state: PlayerState):
+        # Only the fields changed since the state was last saved or loaded
+        # are written; a move does not re-serialise the inventory.
+        changes = state.changes()
+        if not changes:
+            return
+        if changes == {"current_room"}:
+            cursor = conn.execute(
+                UPDATE_ROOM_SQL, (state.current_room, self.session_id)
+            )
+        elif changes == {"inventory"}:
+            cursor = conn.execute(
+                UPDATE_INVENTORY_SQL,
+                (json.dumps(state.inventory.items), self.session_id),
+            )
+        else:
+            cursor = None
+        if cursor is None or cursor.rowcount == 0:
+            # Both fields changed, or there is no row to update yet.
+            self._write_full(conn, state)
 
     def save_player_state(self, state: PlayerState):
         with self._get_conn() as conn:
-            conn.execute(
-                "INSERT OR REPLACE INTO player (id, current_room, inventory) VALUES (1, ?, ?)",
-                (state.current_room, json.dumps(state.inventory.items)),
-            )
+            self._write_player(conn, state)
             conn.commit()
+        state.mark_saved()
 
     def load_player_state(self) -> Optional[PlayerState]:
         with self._get_conn() as conn:
-            row = conn.execute(
-                "SELECT current_room, inventory FROM player WHERE id = 1"
-            ).fetchone()
+            row = conn.execute(LOAD_PLAYER_SQL, (self.session_id,)).fetchone()
             if row:
-                return PlayerState(
+                state = PlayerState(
                     current_room=row["current_room"],
                     inventory=Inventory(items=json.loads(row["inventory"])),
                 )
+                state.mark_saved()
+                return state
             return None
 
-    def set_world_flag(self, key: str, value: Any):
+    def save_batch(
+        self,
+        state: Optional[PlayerState],
+        flags: Dict[str, Any],
+        events: List[Event] = (),
+    ):
+        """Write a player state, flags and events in one transaction."""
+        with self._get_conn() as conn:
+            if state is not None:
+                self._write_player(conn, state)
+            self._append_events(conn, events)
+            if flags:
+                conn.executemany(
+                    SET_FLAG_SQL,
+                    [
+                        (self.session_id, key, json.dumps(value))
+                        for key, value in flags.items()
+                    ],
+                )
+            conn.commit()
+        if state is not None:
+            state.mark_saved()
+
+    def _append_events(self, conn: sqlite3.Connection, events: List[Event]):
+        for event in events:
+            event_id = conn.execute(
+                INSERT_EVENT_SQL,
+                (
+                    self.session_id,
+                    event.turn,
+                    event.command,
+                    json.dumps(event.data),
+                    event.checkpoint,
+                ),
+            ).lastrowid
+            # A new turn replaces whatever was undone after it.
+            conn.execute(TRUNCATE_TIMELINE_SQL, (self.session_id, event.turn))
+            conn.execute(INSERT_TIMELINE_SQL, (self.session_id, event.turn, event_id))
+        if events:
+            conn.execute(SET_TURN_SQL, (events[-1].turn, self.session_id))
+
+    def record_events(self, events: List[Event]):
+        with self._get_conn() as conn:
+            self._append_events(conn, events)
+            conn.commit()
+
+    def turn(self) -> int:
+        with self._get_conn() as conn:
+            return conn.execute(
+                "SELECT turn FROM sessions WHERE id = ?", (self.session_id,)
+            ).fetchone()[0]
+
+    def has_history(self) -> bool:
         with self._get_conn() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM timeline WHERE session_id = ? LIMIT 1",
+                (self.session_id,),
+            ).fetchone()
+            return row is not None
+
+    def state_at(self, turn: int) -> Optional[PlayerState]:
+        """The player's state after ``turn``, replayed from the nearest checkpoint.
+
+        None if the turn is not on the current line of play (never played,
+        or compacted away).
+        """
+        with self._get_conn() as conn:
+            checkpoint = conn.execute(
+                LAST_CHECKPOINT_SQL, (self.session_id, turn)
+            ).fetchone()
+            if checkpoint is None:
+                return None
+            rows = conn.execute(
+                REPLAY_SQL, (self.session_id, checkpoint["turn"], turn)
+            ).fetchall()
+        if rows[-1]["turn"] != turn:
+            return None
+        data: Dict[str, Any] = {}
+        for row in rows:
+            data.update(json.loads(row["data"]))
+        return PlayerState(data["room"], Inventory(data["inventory"]))
+
+    def rewind(self, turn: int) -> Optional[PlayerState]:
+        """Make ``turn`` the current turn; later turns stay available to redo."""
+        state = self.state_at(turn)
+        if state is None:
+            return None
+        with self._get_conn() as conn:
+            self._write_full(conn, state)
+            conn.execute(SET_TURN_SQL, (turn, self.session_id))
+            conn.commit()
+        state.mark_saved()
+        return state
+
+    def compact(self, before: int):
+        """Drop the event log up to the last checkpoint at or before ``before``."""
+        with self._get_conn() as conn:
+            base = conn.execute(LAST_CHECKPOINT_SQL, (self.session_id, before))
+            base = base.fetchone()
+            if base is None:
+                return
+            conn.execute(
+                "DELETE FROM timeline WHERE session_id = ? AND turn < ?",
+                (self.session_id, base["turn"]),
+            )
+            # Event ids grow with time, so this also drops abandoned
+            # branches older than the checkpoint.
             conn.execute(
-                "INSERT OR REPLACE INTO world_state (key, value) VALUES (?, ?)",
-                (key, json.dumps(value)),
+                "DELETE FROM events WHERE session_id = ? AND id < ?",
+                (self.session_id, base["event_id"]),
+            )
+            conn.commit()
+
+    def world_flags(self) -> Dict[str, Any]:
+        with self._get_conn() as conn:
+            rows = conn.execute(ALL_FLAGS_SQL, (self.session_id,)).fetchall()
+            return {row["key"]: json.loads(row["value"]) for row in rows}
+
+    def quick_save(self, state: PlayerState) -> int:
+        """Store the whole game as one binary snapshot; returns its size."""
+        data = snapshot.dumps(state, self.world_flags())
+        with self._get_conn() as conn:
+            conn.execute(SAVE_SNAPSHOT_SQL, (self.session_id, data))
+            conn.commit()
+        return len(data)
+
+    def quick_load(self) -> Optional[PlayerState]:
+        """Restore the quick save, if any, replacing the current save."""
+        with self._get_conn() as conn:
+            row = conn.execute(LOAD_SNAPSHOT_SQL, (self.session_id,)).fetchone()
+            if row is None:
+                return None
+            state, flags = snapshot.loads(row["data"])
+            self._set_live_layer(conn, self._new_layer(conn, None))
+            self._write_full(conn, state)
+            conn.executemany(
+                SET_FLAG_SQL,
+                [
+                    (self.session_id, key, json.dumps(value))
+                    for key, value in flags.items()
+                ],
             )
             conn.commit()
+        state.mark_saved()
+        return state
+
+    def _new_layer(self, conn: sqlite3.Connection, parent: Optional[int]) -> int:
+        return conn.execute(
+            "INSERT INTO layers (parent) VALUES (?)", (parent,)
+        ).lastrowid
+
+    def _fork(self, conn: sqlite3.Connection, layer: int) -> Tuple[int, int]:
+        """Freeze ``layer`` and return two writable leaves that share it.
+
+        The holder of ``layer`` takes the first leaf, the new holder the
+        second. At most ``FORK_COPY_LIMIT`` flags are copied, so this is O(1)
+        however many flags the game has.
+        """
+        own = conn.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM world_state WHERE layer_id = ? "
+            "LIMIT ?)",
+            (layer, FORK_COPY_LIMIT),
+        ).fetchone()[0]
+        if own < FORK_COPY_LIMIT:
+            # A small leaf is cheaper to copy than to nest under: copying
+            # keeps the chain a flag lookup walks from growing on every save.
+            parent = conn.execute(
+                "SELECT parent FROM layers WHERE id = ?", (layer,)
+            ).fetchone()[0]
+            copy = self._new_layer(conn, parent)
+            conn.execute(
+                "INSERT INTO world_state "
+                "SELECT ?, key, value FROM world_state WHERE layer_id = ?",
+                (copy, layer),
+            )
+            return layer, copy
+        return self._new_layer(conn, layer), self._new_layer(conn, layer)
+
+    def _drop_layer(self, conn: sqlite3.Connection, layer: int):
+        """Delete a leaf no longer held, then tidy the ancestors it shared."""
+        while layer is not None:
+            parent = conn.execute(
+                "SELECT parent FROM layers WHERE id = ?", (layer,)
+            ).fetchone()[0]
+            conn.execute("DELETE FROM world_state WHERE layer_id = ?", (layer,))
+            conn.execute("DELETE FROM layers WHERE id = ?", (layer,))
+            if parent is None:
+                return
+            children = conn.execute(
+                "SELECT id FROM layers WHERE parent = ? LIMIT 2", (parent,)
+            ).fetchall()
+            if len(children) == 1:
+                # An ancestor with one child left is folded into it, which
+                # keeps chains short as slots are overwritten and loaded.
+                child = children[0][0]
+                conn.execute(
+                    "INSERT OR IGNORE INTO world_state "
+                    "SELECT ?, key, value FROM world_state WHERE layer_id = ?",
+                    (child, parent),
+                )
+                conn.execute(
+                    "UPDATE layers SET parent = "
+                    "(SELECT parent FROM layers WHERE id = ?) WHERE id = ?",
+                    (parent, child),
+                )
+            elif children:
+                return
+            layer = parent
+
+    def _set_live_layer(self, conn: sqlite3.Connection, layer: int):
+        old = conn.execute(LIVE_LAYER_SQL, (self.session_id,)).fetchone()[0]
+        conn.execute(SET_LIVE_LAYER_SQL, (layer, self.session_id))
+        if old is not None and old != layer:
+            self._drop_layer(conn, old)
+
+    def slot(self, name: str) -> Optional[SlotInfo]:
+        with self._get_conn() as conn:
+            row = conn.execute(SLOT_SQL, (self.session_id, name)).fetchone()
+            if row:
+                return SlotInfo(row["name"], row["current_room"], row["saved_at"])
+            return None
+
+    def list_slots(self) -> List[SlotInfo]:
+        with self._get_conn() as conn:
+            rows = conn.execute(
+                "SELECT name, current_room, saved_at FROM slots "
+                "WHERE session_id = ? ORDER BY name",
+                (self.session_id,),
+            ).fetchall()
+            return [SlotInfo(*row) for row in rows]
+
+    def save_slot(self, name: str, state: PlayerState):
+        """Save the live game as slot ``name``, replacing any slot so named."""
+        with self._get_conn() as conn:
+            live = conn.execute(LIVE_LAYER_SQL, (self.session_id,)).fetchone()[0]
+            live, layer = self._fork(conn, live)
+            conn.execute(SET_LIVE_LAYER_SQL, (live, self.session_id))
+            old = conn.execute(SLOT_SQL, (self.session_id, name)).fetchone()
+            conn.execute(
+                SAVE_SLOT_SQL,
+                (
+                    self.session_id,
+                    name,
+                    layer,
+                    state.current_room,
+                    json.dumps(state.inventory.items),
+                    time.time(),
+                ),
+            )
+            if old:
+                self._drop_layer(conn, old["layer_id"])
+            conn.commit()
+
+    def load_slot(self, name: str) -> Optional[PlayerState]:
+        """Make slot ``name`` the live game; the slot itself is unchanged."""
+        with self._get_conn() as conn:
+            row = conn.execute(SLOT_SQL, (self.session_id, name)).fetchone()
+            if row is None:
+                return None
+            layer, live = self._fork(conn, row["layer_id"])
+            conn.execute(
+                "UPDATE slots SET layer_id = ? WHERE session_id = ? AND name = ?",
+                (layer, self.session_id, name),
+            )
+            self._set_live_layer(conn, live)
+            state = PlayerState(
+                current_room=row["current_room"],
+                inventory=Inventory(items=json.loads(row["inventory"])),
+            )
+            self._write_full(conn, state)
+            conn.commit()
+        state.mark_saved()
+        return state
+
+    def branch_slot(self, source: str, name: str):
+        """Copy slot ``source`` to a new slot ``name`` in O(1)."""
+        with self._get_conn() as conn:
+            row = conn.execute(SLOT_SQL, (self.session_id, source)).fetchone()
+            if row is None:
+                raise KeyError(source)
+            if conn.execute(SLOT_SQL, (self.session_id, name)).fetchone():
+                raise ValueError(f"slot {name!r} already exists")
+            layer, branch = self._fork(conn, row["layer_id"])
+            conn.execute(
+                "UPDATE slots SET layer_id = ? WHERE session_id = ? AND name = ?",
+                (layer, self.session_id, source),
+            )
+            conn.execute(
+                SAVE_SLOT_SQL,
+                (
+                    self.session_id,
+                    name,
+                    branch,
+                    row["current_room"],
+                    row["inventory"],
+                    time.time(),
+                ),
+            )
+            conn.commit()
+
+    def set_world_flag(self, key: str, value: Any):
+        with self._get_conn() as conn:
+            conn.execute(SET_FLAG_SQL, (self.session_id, key, json.dumps(value)))
+            conn.commit()
 
     def get_world_flag(self, key: str) -> Any:
         with self._get_conn() as conn:
-            row = conn.execute(
-                "SELECT value FROM world_state WHERE key = ?", (key,)
-            ).fetchone()
+            row = conn.execute(GET_FLAG_SQL, (self.session_id, key)).fetchone()
             if row:
                 return json.loads(row["value"])
             return None
+
+
+class SaveJournal:
+    """Write-behind front for GameStorage.
+
+    Saves are coalesced in memory and flushed in a single transaction once
+    ``flush_every`` commands have run or ``flush_interval_ms`` has elapsed
+    since the oldest unsaved change, whichever comes first. A crash therefore
+    loses at most that much progress; ``flush()``/``close()`` write everything
+    out.
+    """
+
+    def __init__(
+        self,
+        storage: GameStorage,
+        flush_every: int = 50,
+        flush_interval_ms: int = 2000,
+        clock=time.monotonic,
+    ):
+        if flush_every < 1:
+            raise ValueError("flush_every must be at least 1")
+        if flush_interval_ms < 0:
+            raise ValueError("flush_interval_ms must not be negative")
+        self.storage = storage
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval_ms / 1000
+        self._clock = clock
+        self._state: Optional[PlayerState] = None
+        self._flags: Dict[str, Any] = {}
+        self._events: List[Event] = []
+        self._commands = 0
+        self._dirty_since: Optional[float] = None
+        self.flushes = 0
+
+    @property
+    def dirty(self) -> bool:
+        return self._state is not None or bool(self._flags) or bool(self._events)
+
+    def save_player_state(self, state: PlayerState):
+        # Keep a reference rather than a copy: the latest state wins anyway,
+        # and it is serialised when the journal is flushed.
+        self._state = state
+        self._mark_dirty()
+
+    def load_player_state(self) -> Optional[PlayerState]:
+        if self._state is not None:
+            return self._state
+        return self.storage.load_player_state()
+
+    def set_world_flag(self, key: str, value: Any):
+        self._flags[key] = value
+        self._mark_dirty()
+
+    def get_world_flag(self, key: str) -> Any:
+        if key in self._flags:
+            return self._flags[key]
+        return self.storage.get_world_flag(key)
+
+    def record_event(self, event: Event):
+        self._events.append(event)
+        self._mark_dirty()
+
+    def new_game(self, initial_state: PlayerState):
+        self.discard()
+        self.storage.new_game(initial_state)
+
+    def _mark_dirty(self):
+        if self._dirty_since is None:
+            self._dirty_since = self._clock()
+
+    def record_command(self):
+        if self.dirty:
+            self._commands += 1
+        self.flush_if_due()
+
+    def flush_if_due(self) -> bool:
+        if not self.dirty:
+            return False
+        if (
+            self._commands >= self.flush_every
+            or self._clock() - self._dirty_since >= self.flush_interval
+        ):
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        if self.dirty:
+            self.storage.save_batch(self._state, self._flags, self._events)
+            self.flushes += 1
+        self.discard()
+
+    def discard(self):
+        self._state = None
+        self._flags = {}
+        self._events = []
+        self._commands = 0
+        self._dirty_since = None
+
+    def close(self):
+        self.flush()
+        self.storage.close()
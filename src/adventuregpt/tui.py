@@ -1,34 +1,231 @@
 import asyncio
-from typing import List
+import time
+from itertools import islice
+from typing import List, Optional
 
+from rich.errors import MarkupError as RichMarkupError
+from rich.markup import escape
+from rich.text import Text
 from textual.app import App, ComposeResult
+from textual.content import Content
+from textual.markup import MarkupError
+from textual.message import Message
 from textual.suggester import Suggester
 from textual.widgets import Footer, Header, Input, RichLog, Static
 
-from adventuregpt.engine import GameEngine
+from adventuregpt.engine import AsyncEngine, GameEngine
+from adventuregpt.history import Entry, History
+from adventuregpt.metrics import Profiler
+from adventuregpt.parser import CommandParser, Trie
+from adventuregpt.storage import TextStore
 
 
 class CommandSuggester(Suggester):
-    """Simple autocomplete for game commands."""
+    """Autocomplete backed by the engine's command parser tries."""
 
-    def __init__(self, commands: List[str]):
+    def __init__(self, parser: CommandParser, slash_commands: List[str]):
         super().__init__()
-        self.commands = commands
+        self.parser = parser
+        self.slash_commands = Trie()
+        for command in slash_commands:
+            self.slash_commands.insert(command, command)
 
     async def get_suggestion(self, value: str) -> str | None:
         if not value:
             return None
-        for command in self.commands:
-            if command.startswith(value):
-                return command
-        return None
+        if value.startswith("/"):
+            completion = self.slash_commands.complete(value.lower())
+            return value + completion[len(value) :] if completion else None
+        return self.parser.suggest(value)
+
+
+class Typewriter:
+    """Reveals a message a few characters at a time.
+
+    Markup is parsed once up front, so styled text animates like plain text
+    and each frame only slices the parsed ``Content`` (which ``Static``
+    renders as is) instead of re-parsing the whole prefix.
+    """
+
+    def __init__(self, message: str, closed: bool = True):
+        self.message = message
+        try:
+            self.source = Content.from_markup(message)
+        except MarkupError:
+            self.source = Content(message)
+        self.position = 0
+        # An open typewriter is still receiving text (see extend/close).
+        self.closed = closed
+
+    def __len__(self) -> int:
+        return len(self.source)
+
+    @property
+    def done(self) -> bool:
+        return self.closed and self.position >= len(self.source)
+
+    def extend(self, text: str):
+        """Append plain (unmarked-up) text to an open typewriter."""
+        self.message += escape(text)
+        self.source += Content(text)
+
+    def close(self):
+        self.closed = True
+
+    def advance(self, count: int) -> Content:
+        self.position = min(self.position + max(count, 0), len(self.source))
+        return self.source[: self.position]
 
 
 class TypewriterLog(Static):
-    """Widget to display text with a typewriter effect."""
+    """Widget to display text with a typewriter effect.
+
+    One timer drives every message. It ticks at ``FPS`` while text is being
+    revealed and is paused otherwise. Each frame reveals whatever is due at
+    ``CHARS_PER_SECOND``; long messages speed up so none takes longer than
+    ``MAX_SECONDS``. ``Static`` re-renders its whole content on every update,
+    so capping the frames per message is what keeps long text linear.
+    """
+
+    FPS = 60
+    CHARS_PER_SECOND = 50
+    MAX_SECONDS = 2.0
+
+    class Finished(Message):
+        """Posted when a message has been fully revealed."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.typewriter: Optional[Typewriter] = None
+        self._timer = None
+        self._started = 0.0
+        self._rate = float(self.CHARS_PER_SECOND)
+
+    def on_mount(self) -> None:
+        self._timer = self.set_interval(1 / self.FPS, self._tick, pause=True)
+
+    @property
+    def typing(self) -> bool:
+        return self.typewriter is not None and not self.typewriter.done
+
+    def play(self, message: str):
+        self.typewriter = Typewriter(message)
+        self._started = time.monotonic()
+        self._rate = max(self.CHARS_PER_SECOND, len(self.typewriter) / self.MAX_SECONDS)
+        self.update("")
+        self._timer.resume()
+
+    def stream(self):
+        """Start a message whose text arrives in pieces, via feed and end."""
+        self.play("")
+        self.typewriter.closed = False
+
+    def feed(self, text: str):
+        self.typewriter.extend(text)
+        self._rate = max(self._rate, len(self.typewriter) / self.MAX_SECONDS)
+        self._timer.resume()
+
+    def end(self):
+        self.typewriter.close()
+        if self.typewriter.done:
+            self.post_message(self.Finished())
+        else:
+            self._timer.resume()
 
-    def update_text(self, text: str):
-        self.update(text)
+    def clear(self):
+        self._timer.pause()
+        self.typewriter = None
+        self.update("")
+
+    def _tick(self):
+        if not self.typing:
+            self._timer.pause()
+            return
+        if self.typewriter.position >= len(self.typewriter):
+            # Caught up with a stream; feed or end resumes the timer.
+            self._timer.pause()
+            return
+        due = int((time.monotonic() - self._started) * self._rate) + 1
+        self._show(due - self.typewriter.position)
+
+    def _show(self, count: int):
+        self.update(self.typewriter.advance(count))
+        if self.typewriter.done:
+            self._timer.pause()
+            self.post_message(self.Finished())
+
+
+def render_entry(entry: Entry) -> Text:
+    if entry.kind == "command":
+        return Text.assemble("> ", (entry.text, "bold yellow"))
+    try:
+        return Text.from_markup(entry.text)
+    except RichMarkupError:
+        return Text(entry.text)
+
+
+class HistoryLog(RichLog):
+    """The game history, backed by an on-disk ``History``.
+
+    At most ``WINDOW`` entries are rendered at a time. Scrolling to the top
+    pages older entries in from disk, ``PAGE`` at a time; new output jumps
+    back to the latest entries.
+    """
+
+    WINDOW = 500
+    PAGE = 100
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.history: Optional[History] = None
+        # Entries history[first:last] are rendered.
+        self.first = 0
+        self.last = 0
+
+    def attach(self, history: History):
+        self.history = history
+        self.show_latest()
+
+    def add(self, kind: str, text: str):
+        self.history.append(kind, text)
+        total = len(self.history)
+        if self.last != total - 1 or total - self.first > self.WINDOW + self.PAGE:
+            self.show_latest()
+        else:
+            self.write(render_entry(Entry(kind, text)))
+            self.last = total
+
+    def show_latest(self):
+        total = len(self.history)
+        self.clear()
+        self.first = max(total - self.WINDOW, 0)
+        for entry in self.history.read(self.first, total):
+            self.write(render_entry(entry))
+        self.last = total
+
+    def load_older(self) -> int:
+        """Prepend up to ``PAGE`` older entries; returns how many were added."""
+        if self.history is None or self.first == 0:
+            return 0
+        start = max(self.first - self.PAGE, 0)
+        older = self.history.read(start, self.first)
+        shown = self.history.read(self.first, min(self.last, start + self.WINDOW))
+        self.clear()
+        for entry in older:
+            self.write(render_entry(entry), scroll_end=False)
+        # Keep the entry the reader was looking at in view.
+        anchor = len(self.lines)
+        for entry in shown:
+            self.write(render_entry(entry), scroll_end=False)
+        self.first = start
+        self.last = self.first + len(older) + len(shown)
+        self.scroll_to(y=anchor, animate=False)
+        return len(older)
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        if new_value == 0 and old_value > 0 and self.first > 0:
+            self.call_later(self.load_older)
 
 
 class AdventureApp(App):
@@ -60,165 +257,161 @@ class AdventureApp(App):
 
     BINDINGS = [("ctrl+c", "quit", "Quit"), ("ctrl+l", "clear_screen", "Clear Log")]
 
-    COMMANDS = [
-        "go north",
-        "go south",
-        "go east",
-        "go west",
-        "go in",
-        "go out",
-        "look",
-        "inventory",
-        "quit",
-        "exit",
-        "/help",
-        "/learn",
-    ]
-
-    def __init__(self, engine: GameEngine, start_new: bool = False):
+    SLASH_COMMANDS = ["/help", "/learn", "/search", "/stats"]
+
+    # Matches shown by /search; the rest are only counted.
+    SEARCH_LIMIT = 20
+
+    def __init__(
+        self,
+        engine: GameEngine,
+        start_new: bool = False,
+        profiler: Optional[Profiler] = None,
+    ):
         super().__init__()
         self.engine = engine
+        # Engine calls (and their SQLite commits) run off the UI thread.
+        self.runner = AsyncEngine(engine, profiler)
+        self.commands: asyncio.Queue = asyncio.Queue()
         self.start_new = start_new
         self.current_text = ""
-        self.is_typing = False
-        self.typing_queue = []
+        self.current_type_message = ""
+        self.typing_queue: List[str] = []
+        # True while a generated reply is streaming into the typewriter.
+        self.streaming = False
+        self.history: Optional[History] = None
 
     def compose(self) -> ComposeResult:
         yield Header()
-        yield RichLog(id="game_log", markup=True)
+        yield HistoryLog(id="game_log")
         yield TypewriterLog(id="active_text")
         yield Input(
             placeholder="Type your command (TAB to autocomplete)...",
             id="command_input",
-            suggester=CommandSuggester(self.COMMANDS),
+            suggester=CommandSuggester(self.engine.parser, self.SLASH_COMMANDS),
         )
         yield Footer()
 
     def on_mount(self) -> None:
+        self.query_one(Input).focus()
+        self.run_worker(self.run_commands(), name="commands", exit_on_error=True)
+
+        # In write-behind mode, make sure idle sessions still honour the
+        # journal's time bound instead of waiting for the next command.
+        # Polling at T/10 keeps the real bound within ~1.1 x T.
+        if self.engine.journal:
+            interval = max(self.engine.journal.flush_interval / 10, 0.05)
+            self.set_interval(
+                interval, lambda: self.runner.submit(self.engine.flush_if_due)
+            )
+
+    def on_unmount(self) -> None:
+        self.runner.close()
+        if self.history is not None:
+            self.history.close()
+
+    async def run_commands(self) -> None:
+        """Run submitted commands one at a time, in the order they were typed.
+
+        The engine call is awaited on a worker thread, so the UI keeps
+        rendering and accepting input while it runs; later commands wait in
+        the queue, so their output can never overtake an earlier response.
+        """
         if self.start_new:
-            intro = self.engine.start_new_game()
+            intro = await self.runner.start_new_game()
         else:
-            intro = self.engine.resume_game()
-
+            intro = await self.runner.resume_game()
+        # Opened after the intro: starting a new game deletes the transcript.
+        self.history = History(
+            self.engine.storage.history_path, TextStore(self.engine.storage.database)
+        )
+        self.query_one(HistoryLog).attach(self.history)
         self.log_message(intro)
-        self.query_one(Input).focus()
+
+        while True:
+            command = await self.commands.get()
+            self.finish_typing()
+
+            self.query_one(HistoryLog).add("command", command)
+
+            # Handle Slash Commands
+            if command.lower().startswith("/search"):
+                await self.search_history(command[len("/search") :].strip())
+                continue
+            if command.startswith("/"):
+                self.handle_slash_command(command)
+                continue
+
+            if self.engine.parser.is_quit(command):
+                self.exit()
+                return
+
+            loop = asyncio.get_running_loop()
+            response = await self.runner.process_command(
+                command,
+                lambda token: loop.call_soon_threadsafe(self.stream_token, token),
+            )
+            start = time.perf_counter()
+            if self.streaming:
+                # Tokens were scheduled before the response, so all are in.
+                self.query_one(TypewriterLog).end()
+                self.streaming = False
+            else:
+                self.log_message(response)
+            metrics = self.engine.metrics
+            if metrics is not None:
+                # Until the first screen refresh that shows the response.
+                self.call_after_refresh(
+                    lambda: metrics.observe("ui.render", time.perf_counter() - start)
+                )
+
+    def stream_token(self, token: str):
+        """Show one token of a generated reply as soon as it arrives."""
+        typewriter = self.query_one(TypewriterLog)
+        if not self.streaming:
+            self.finalize_active_text()
+            typewriter.stream()
+            self.streaming = True
+        typewriter.feed(token)
 
     def log_message(self, message: str, animate: bool = True) -> None:
         if animate:
             self.animate_typewriter(message)
         else:
-            log = self.query_one(RichLog)
-            log.write(message)
+            self.query_one(HistoryLog).add("text", message)
 
     def animate_typewriter(self, message: str):
-        # Cancel any existing typing? Or queue? For now, let's force finish previous
-        # Ideally, we should move previous active text to log first.
-
-        active_widget = self.query_one(TypewriterLog)
-        history_log = self.query_one(RichLog)
-
-        # If there is content in active widget, move it to history
-        # We need to access the renderable or just rely on what we stored.
-        # But for simplicity, let's assume we always move PREVIOUS message to history before starting NEW one.
-        # However, at startup, there is no previous message.
-
-        # Actually simplified flow:
-        # 1. Write the *completed* string of any current animation to history immediately (skip animation).
-        # 2. Clear active widget.
-        # 3. Start new animation on active widget.
-
-        # Since we don't track state perfectly here yet, let's just push what we INTENDED to write previously to history.
-        # But wait, if I call log_message multiple times, they might overlap.
-        # Let's enforce sequentiality or instant-finish.
-
-        # Simplest approach for Phase 1:
-        # Just write to history log directly IF it's a command echo.
-        # Only animate descriptions/responses.
-
+        # Messages animate one after another; the last one stays on screen
+        # until the next arrives, then moves to the history log.
         self.typing_queue.append(message)
-        if not self.is_typing:
+        if not self.query_one(TypewriterLog).typing:
             self.process_queue()
 
     def process_queue(self):
         if not self.typing_queue:
-            self.is_typing = False
             return
-
-        self.is_typing = True
-        message = self.typing_queue.pop(0)
-        self.current_type_message = message
-
-        # Strip markup for typewriter effect, OR disable markup on the widget temporarily
-        # Textual Static supports 'markup=False' in constructor or update?
-        # A simpler way: The typewriter effect is complex with Rich Text tags.
-        # For Phase 1, let's just show the full message if it contains markup tags,
-        # or strip them if we really want to animate (but we lose colors).
-
-        # Smart compromise: Detect if message has markup.
-        if "[" in message and "]" in message:
-            # Fast-forward for markup messages to avoid invalid XML-like slicing
-            self.finalize_active_text()
-            # We need to manually set current_type_message for finalize to work?
-            # No, process_queue sets it.
-            # Wait, finalize_active_text uses current_type_message.
-
-            # But we want to show it in Active Text first?
-            # Let's just update active text fully and wait a bit.
-            self.get_widget_by_id("active_text").update(message)
-            self.set_timer(1.0, self.finish_typing_markup_message)
-            return
-
-        self.current_type_message = message
-        self.current_type_index = 0
-        self.get_widget_by_id("active_text").update("")
-        self.set_interval(0.02, self.type_next_char)
-
-    def finish_typing_markup_message(self):
         self.finalize_active_text()
-        self.process_queue()
+        self.current_type_message = self.typing_queue.pop(0)
+        self.query_one(TypewriterLog).play(self.current_type_message)
 
-    def type_next_char(self):
-        # Determine how many chars to type (speed up for long text)
-        chunk_size = 3 if len(self.current_type_message) > 100 else 1
-
-        next_chunk = self.current_type_message[
-            self.current_type_index : self.current_type_index + chunk_size
-        ]
-        self.current_type_index += len(next_chunk)
-
-        active_widget = self.get_widget_by_id("active_text")
-
-        current_display = self.current_type_message[: self.current_type_index]
-        active_widget.update(current_display)
-
-        if self.current_type_index >= len(self.current_type_message):
-            # Done typing this message
-            # Move it to history after a brief pause?
-            # Or just keep it there until NEXT message comes?
-            # User wants to read it.
-            # So, keep it in "active_text".
-            # BUT, if we have a queue, we need to move it to history.
-
-            # Use call_later to finish up
-            # Check if queue has more
-            if self.typing_queue:
-                self.finalize_active_text()
-                self.process_queue()  # recursive-ish via interval?
-                return False  # Stop this interval
-            else:
-                self.is_typing = False
-                return False  # Stop interval
+    def on_typewriter_log_finished(self, message: TypewriterLog.Finished) -> None:
+        self.process_queue()
 
     def finalize_active_text(self):
         """Move active text to history log."""
-        active_widget = self.get_widget_by_id("active_text")
-        # We assume active widget holds the self.current_type_message fully now
-        # But wait, renderable might differ if we used markup.
-        # For this prototype we assume plain text or provided markup works.
-        # RichLog handles markup.
-        history_log = self.query_one(RichLog)
-        history_log.write(self.current_type_message)
-        active_widget.update("")
+        active_widget = self.query_one(TypewriterLog)
+        if active_widget.typewriter is not None:
+            self.query_one(HistoryLog).add("text", active_widget.typewriter.message)
+        active_widget.clear()
+        self.current_type_message = ""
+
+    def finish_typing(self):
+        """Skip any running animation and move all pending text to the log."""
+        self.finalize_active_text()
+        history_log = self.query_one(HistoryLog)
+        for message in self.typing_queue:
+            history_log.add("text", message)
+        self.typing_queue = []
 
     def on_input_submitted(self, message: Input.Submitted) -> None:
         command = message.value.strip()
@@ -226,37 +419,56 @@ class AdventureApp(App):
             return
 
         self.query_one(Input).value = ""
+        self.commands.put_nowait(command)
+
+    def stats_lines(self) -> List[str]:
+        engine = self.engine
+        sources = (
+            ("Response cache", engine.response_cache),
+            ("Generated text cache", engine.semantic_cache),
+            ("LLM", engine.llm),
+        )
+        lines = []
+        for name, source in sources:
+            if source is not None:
+                stats = ", ".join(f"{k}: {v}" for k, v in source.stats().items())
+                lines.append(f"{name}: {stats}")
+        if engine.response_cache is None:
+            lines.append("The response cache is off.")
+        if engine.metrics is None:
+            lines.append("Timings are off (start with --profile).")
+        else:
+            lines += engine.metrics.report()
+        return lines
 
-        # If user types while we are typing, should we skip to end?
-        if self.is_typing:
-            # Skip animation: finish it immediately
-            self.finalize_active_text()
-            self.is_typing = False
-            self.typing_queue = []  # Clear queue to stop further typing
-        elif hasattr(self, "current_type_message") and self.current_type_message:
-            # Just in case some text was left hanging
-            self.finalize_active_text()
-
-        # Simplified strategy:
-        # ALWAYS finalize active text before processing new input.
-        if hasattr(self, "current_type_message") and self.current_type_message:
-            self.finalize_active_text()
-            self.current_type_message = ""  # Clear it
-
-        log = self.query_one(RichLog)
-        log.write(f"> [bold yellow]{command}[/bold yellow]")
-
-        # Handle Slash Commands
-        if command.startswith("/"):
-            self.handle_slash_command(command)
+    async def search_history(self, needle: str):
+        if not needle:
+            self.log_message("[red]Usage: /search <text>[/red]")
             return
-
-        if command.lower() in ["quit", "exit"]:
-            self.exit()
+        history = self.history
+
+        def search():
+            # Streams the transcript from disk; only the shown matches are kept.
+            matches = (
+                (index, entry)
+                for index, entry in history.search(needle)
+                if not (entry.kind == "command" and entry.text.startswith("/"))
+            )
+            shown = list(islice(matches, self.SEARCH_LIMIT))
+            return shown, sum(1 for _ in matches)
+
+        shown, more = await asyncio.to_thread(search)
+        if not shown:
+            self.log_message(f"No matches for '{escape(needle)}'.")
             return
-
-        response = self.engine.process_command(command)
-        self.log_message(response)
+        lines = [f"[bold]Matches for '{escape(needle)}':[/bold]"]
+        for index, entry in shown:
+            text = entry.plain.strip()
+            snippet = text.splitlines()[0][:80] if text else ""
+            lines.append(f"#{index}: {escape(snippet)}")
+        if more:
+            lines.append(f"[italic]...and {more} more[/italic]")
+        self.log_message("\n".join(lines))
 
     def handle_slash_command(self, command: str):
         cmd = command.lower()
@@ -265,8 +477,10 @@ class AdventureApp(App):
 [bold cyan]Available Commands:[/bold cyan]
 - [bold]Movement[/bold]: go north, SOUTH, in, out...
 - [bold]Actions[/bold]: look (l), inventory (i)
+- [bold]Saves[/bold]: save/load <name>, branch <save> <new>, saves, quicksave, quickload
+- [bold]Time[/bold]: undo, redo, rewind <turn>
 - [bold]System[/bold]: quit, exit
-- [bold]Slash[/bold]: /help, /learn
+- [bold]Slash[/bold]: /help, /learn, /search <text>, /stats
 
 [italic]Pro-tip: Use TAB to autocomplete common commands.[/italic]
             """
@@ -280,5 +494,7 @@ It uses a Python-based engine with SQLite persistence.
 Phase 2 will introduce AI-generated dynamic content.
             """
             self.log_message(learn_text)
+        elif cmd == "/stats":
+            self.log_message(escape("\n".join(self.stats_lines())))
         else:
             self.log_message(f"[red]Unknown slash command: {cmd}[/red]")
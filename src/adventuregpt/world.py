@@ -0,0 +1,324 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tomllib
+from array import array
+from dataclasses import dataclass, fields
+from importlib import resources
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Set, Tuple
+
+import typer
+
+from .conditions import ConditionError, compile_condition
+from .models import Exit, Item, WorldData
+
+# Bump when CompiledWorld's layout changes so stale cache files are ignored.
+COMPILER_VERSION = 3
+
+# Compiled worlds already loaded in this process, keyed by content digest.
+_loaded: Dict[str, "CompiledWorld"] = {}
+
+
+class WorldError(ValueError):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledWorld:
+    """Immutable, index-based form of a world definition.
+
+    Room IDs and directions are interned and addressed by integer index.
+    Exits are stored CSR-style: the exits of room ``i`` are the entries
+    ``exit_offsets[i]:exit_offsets[i + 1]`` of ``exit_directions`` (direction
+    indices) and ``exit_targets`` (room indices). Lookup tables are read-only
+    mappings and the exit arrays read-only memoryviews, because one instance
+    is shared by every engine in the process.
+    """
+
+    digest: str
+    start: int
+    room_ids: Tuple[str, ...]
+    room_index: Mapping[str, int]
+    descriptions: Tuple[str, ...]
+    directions: Tuple[str, ...]
+    direction_index: Mapping[str, int]
+    exit_offsets: memoryview
+    exit_directions: memoryview
+    exit_targets: memoryview
+    room_items: Tuple[Tuple[str, ...], ...]
+    item_rooms: Mapping[str, int]
+    initial_flags: Tuple[Tuple[str, Any], ...]
+    # Condition sources (see conditions.py), keyed by exit slot (an index
+    # into the exit arrays), item name and room index. Most worlds have none.
+    exit_conditions: Mapping[int, str]
+    exit_messages: Mapping[int, str]
+    item_conditions: Mapping[str, str]
+    room_variants: Mapping[int, Tuple[Tuple[str, str], ...]]
+
+    # Neither mappingproxy nor memoryview pickles; store plain dicts/arrays
+    # in the cache and re-freeze them on load.
+    def __getstate__(self):
+        state = {}
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if isinstance(value, MappingProxyType):
+                value = dict(value)
+            elif isinstance(value, memoryview):
+                value = array(value.format, value)
+            state[field.name] = value
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            if isinstance(value, dict):
+                value = MappingProxyType(value)
+            elif isinstance(value, array):
+                value = _readonly(value)
+            object.__setattr__(self, name, value)
+
+    @property
+    def start_room(self) -> str:
+        return self.room_ids[self.start]
+
+    def __len__(self) -> int:
+        return len(self.room_ids)
+
+    def index_of(self, room_id: str) -> Optional[int]:
+        return self.room_index.get(room_id)
+
+    def description(self, room: int) -> str:
+        return self.descriptions[room]
+
+    def exit_slot(self, room: int, direction: str) -> Optional[int]:
+        """Index of the exit into the exit arrays, open or not."""
+        direction_id = self.direction_index.get(direction)
+        if direction_id is None:
+            return None
+        for i in range(self.exit_offsets[room], self.exit_offsets[room + 1]):
+            if self.exit_directions[i] == direction_id:
+                return i
+        return None
+
+    def exit(self, room: int, direction: str) -> Optional[int]:
+        slot = self.exit_slot(room, direction)
+        return None if slot is None else self.exit_targets[slot]
+
+    def exits(self, room: int) -> Dict[str, str]:
+        return {
+            self.directions[self.exit_directions[i]]: self.room_ids[
+                self.exit_targets[i]
+            ]
+            for i in range(self.exit_offsets[room], self.exit_offsets[room + 1])
+        }
+
+    def neighbours(self, room: int) -> memoryview:
+        return self.exit_targets[self.exit_offsets[room] : self.exit_offsets[room + 1]]
+
+    def flags(self) -> Dict[str, Any]:
+        return dict(self.initial_flags)
+
+    def conditions(self) -> Set[str]:
+        """Every distinct condition in the world."""
+        return {
+            *self.exit_conditions.values(),
+            *self.item_conditions.values(),
+            *(when for variants in self.room_variants.values() for when, _ in variants),
+        }
+
+
+def _readonly(values: array) -> memoryview:
+    return memoryview(values.tobytes()).cast(values.typecode)
+
+
+def default_world_path() -> Path:
+    return Path(str(resources.files("adventuregpt") / "data" / "world.json"))
+
+
+def get_cache_dir() -> str:
+    cache_dir = Path(typer.get_app_dir("adventuregpt")) / "cache"
+    os.makedirs(cache_dir, exist_ok=True)
+    return str(cache_dir)
+
+
+def parse_world(raw: bytes, suffix: str) -> Dict[str, Any]:
+    try:
+        if suffix == ".json":
+            return json.loads(raw)
+        if suffix == ".toml":
+            return tomllib.loads(raw.decode("utf-8"))
+    except ValueError as e:
+        raise WorldError(f"Could not parse world file: {e}") from e
+    if suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise WorldError("YAML worlds require PyYAML (pip install pyyaml)") from e
+        try:
+            return yaml.safe_load(raw)
+        except yaml.YAMLError as e:
+            raise WorldError(f"Could not parse world file: {e}") from e
+    raise WorldError(f"Unsupported world file format: {suffix}")
+
+
+def compile_world(data: WorldData, digest: str = "") -> CompiledWorld:
+    room_ids = tuple(sys.intern(room_id) for room_id in data.rooms)
+    room_index = {room_id: i for i, room_id in enumerate(room_ids)}
+    if data.start not in room_index:
+        raise WorldError(f"Start room '{data.start}' is not defined")
+
+    directions: Dict[str, int] = {}
+    exit_offsets = array("I", [0])
+    exit_directions = array("H")
+    exit_targets = array("I")
+    room_items = []
+    item_rooms: Dict[str, int] = {}
+    exit_conditions: Dict[int, str] = {}
+    exit_messages: Dict[int, str] = {}
+    item_conditions: Dict[str, str] = {}
+    room_variants: Dict[int, Tuple[Tuple[str, str], ...]] = {}
+    # Equal texts (maze rooms "all alike", shared locked-exit messages)
+    # become one string object, and stay shared in the pickled cache.
+    texts: Dict[str, str] = {}
+
+    def text(value: str) -> str:
+        return texts.setdefault(value, value)
+
+    def condition(source: str, where: str) -> str:
+        # Compiled now so a bad condition fails at load, not mid-game.
+        try:
+            compile_condition(source)
+        except ConditionError as e:
+            raise WorldError(f"{where}: {e}") from e
+        return sys.intern(source)
+
+    for i, room_id in enumerate(room_ids):
+        room = data.rooms[room_id]
+        for direction, target in room.exits.items():
+            if isinstance(target, Exit):
+                where = f"Room '{room_id}' exit '{direction}'"
+                if target.when is not None:
+                    exit_conditions[len(exit_targets)] = condition(target.when, where)
+                if target.locked is not None:
+                    exit_messages[len(exit_targets)] = text(target.locked)
+                target = target.to
+            if target not in room_index:
+                raise WorldError(
+                    f"Room '{room_id}' exit '{direction}' leads to unknown room '{target}'"
+                )
+            direction = sys.intern(direction)
+            exit_directions.append(directions.setdefault(direction, len(directions)))
+            exit_targets.append(room_index[target])
+        exit_offsets.append(len(exit_targets))
+
+        names = []
+        for item in room.items:
+            if isinstance(item, Item):
+                if item.when is not None:
+                    item_conditions[sys.intern(item.name)] = condition(
+                        item.when, f"Item '{item.name}'"
+                    )
+                item = item.name
+            if item in item_rooms:
+                raise WorldError(
+                    f"Item '{item}' is placed in both "
+                    f"'{room_ids[item_rooms[item]]}' and '{room_id}'"
+                )
+            item_rooms[sys.intern(item)] = i
+            names.append(item)
+        room_items.append(tuple(names))
+
+        if room.variants:
+            room_variants[i] = tuple(
+                (
+                    condition(variant.when, f"Room '{room_id}' variant"),
+                    text(variant.description),
+                )
+                for variant in room.variants
+            )
+
+    return CompiledWorld(
+        digest=digest,
+        start=room_index[data.start],
+        room_ids=room_ids,
+        room_index=MappingProxyType(room_index),
+        descriptions=tuple(
+            text(data.rooms[room_id].description) for room_id in room_ids
+        ),
+        directions=tuple(directions),
+        direction_index=MappingProxyType(directions),
+        exit_offsets=_readonly(exit_offsets),
+        exit_directions=_readonly(exit_directions),
+        exit_targets=_readonly(exit_targets),
+        room_items=tuple(room_items),
+        item_rooms=MappingProxyType(item_rooms),
+        initial_flags=tuple(data.flags.items()),
+        exit_conditions=MappingProxyType(exit_conditions),
+        exit_messages=MappingProxyType(exit_messages),
+        item_conditions=MappingProxyType(item_conditions),
+        room_variants=MappingProxyType(room_variants),
+    )
+
+
+def _read_cache(path: Path) -> Optional[CompiledWorld]:
+    try:
+        with open(path, "rb") as f:
+            world = pickle.load(f)
+    except Exception:
+        # Any stale or corrupt entry just means recompiling.
+        return None
+    return world if isinstance(world, CompiledWorld) else None
+
+
+def _write_cache(path: Path, world: CompiledWorld):
+    # Write to a temporary file first so a concurrent reader never sees a
+    # partially written cache entry.
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(world, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def load_world(
+    path: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+    use_cache: bool = True,
+) -> CompiledWorld:
+    """Load and compile a world file, reusing a cached compiled form if any.
+
+    The cache is keyed by a hash of the file contents, so editing the world
+    file invalidates it automatically.
+    """
+    world_path = Path(path) if path else default_world_path()
+    raw = world_path.read_bytes()
+    digest = hashlib.sha256(raw + f"\0{COMPILER_VERSION}".encode("ascii")).hexdigest()
+
+    if digest in _loaded:
+        return _loaded[digest]
+
+    cache_path = None
+    if use_cache:
+        cache_path = Path(cache_dir or get_cache_dir()) / f"world-{digest}.pickle"
+        world = _read_cache(cache_path)
+        if world is not None:
+            _loaded[digest] = world
+            return world
+
+    parsed = parse_world(raw, world_path.suffix.lower())
+    try:
+        data = WorldData.model_validate(parsed)
+    except ValueError as e:
+        raise WorldError(f"Invalid world file {world_path}: {e}") from e
+    world = compile_world(data, digest)
+
+    if cache_path is not None:
+        _write_cache(cache_path, world)
+    _loaded[digest] = world
+    return world
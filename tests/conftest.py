@@ -3,18 +3,32 @@ import tempfile
 
 import pytest
 
+from adventuregpt import world
 from adventuregpt.engine import GameEngine
 
 
+@pytest.fixture(autouse=True)
+def world_cache_dir(tmp_path, monkeypatch):
+    # Keep compiled-world pickles out of the real app directory.
+    cache_dir = tmp_path / "world-cache"
+    cache_dir.mkdir()
+    monkeypatch.setattr(world, "get_cache_dir", lambda: str(cache_dir))
+    return str(cache_dir)
+
+
 @pytest.fixture
 def temp_db():
     with tempfile.NamedTemporaryFile(delete=False) as tmp:
         db_path = tmp.name
     yield db_path
-    if os.path.exists(db_path):
-        os.remove(db_path)
+    # WAL mode leaves -wal/-shm side files next to the database.
+    for path in (db_path, db_path + "-wal", db_path + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
 
 
 @pytest.fixture
 def engine(temp_db):
-    return GameEngine(db_path=temp_db)
+    engine = GameEngine(db_path=temp_db)
+    yield engine
+    engine.close()
@@ -0,0 +1,68 @@
+from adventuregpt.cache import ResponseCache, flag_hash, flags_digest
+from adventuregpt.engine import GameEngine
+
+
+def test_lru_bound_and_counters():
+    cache = ResponseCache(capacity=2)
+    cache.put("a", "look ", "A")
+    cache.put("b", "look ", "B")
+    assert cache.get("a", "look ") == "A"
+    cache.put("c", "look ", "C")
+    assert cache.get("b", "look ") is None
+    assert cache.stats() == {
+        "size": 2,
+        "capacity": 2,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+
+def test_persists_across_runs(tmp_path):
+    path = str(tmp_path / "responses.json")
+    cache = ResponseCache(path=path)
+    cache.put("a", "look ", "A")
+    cache.save()
+    assert ResponseCache(path=path).get("a", "look ") == "A"
+
+    (tmp_path / "responses.json").write_text("{not json")
+    assert len(ResponseCache(path=path)) == 0
+
+
+def test_flags_digest_updates_incrementally():
+    flags = {"grate_open": True, "lamp": "on"}
+    digest = flags_digest(flags)
+    digest ^= flag_hash("lamp", "on") ^ flag_hash("lamp", "off")
+    assert digest == flags_digest({"grate_open": True, "lamp": "off"})
+    assert flags_digest({"unset": None}) == flags_digest({})
+
+
+def test_engine_caches_pure_commands(temp_db):
+    engine = GameEngine(db_path=temp_db, response_cache=ResponseCache())
+    engine.start_new_game()
+    cache = engine.response_cache
+    first = engine.process_command("look")
+    assert engine.process_command("l") == first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    engine.process_command("go west")
+    assert engine.process_command("go west") == "You can't go that way."
+    assert cache.hits == 2
+
+    # A successful move is never served from the cache.
+    engine.process_command("go in")
+    engine.process_command("go out")
+    assert engine.process_command("go in") != "You can't go that way."
+    assert engine.state.current_room == "building"
+
+    # Inventory and flag changes change the fingerprint.
+    key = engine.state_key()
+    engine.state.inventory.add("lamp")
+    assert engine.state_key() != key
+    assert "lamp" in engine.process_command("inventory")
+    key = engine.state_key()
+    engine.set_world_flag("grate_open", True)
+    assert engine.state_key() != key
+    engine.set_world_flag("grate_open", None)
+    assert engine.state_key() == key
+    engine.close()
@@ -0,0 +1,164 @@
+import json
+
+import pytest
+
+from adventuregpt import world as world_module
+from adventuregpt.cache import ResponseCache
+from adventuregpt.conditions import ConditionError, ConditionSet, compile_condition
+from adventuregpt.engine import GameEngine
+from adventuregpt.world import WorldError, load_world
+
+GRATE = {
+    "start": "depression",
+    "rooms": {
+        "depression": {
+            "description": "You are in a depression. A grate is set in the dirt.",
+            "variants": [
+                {
+                    "when": "grate_open",
+                    "description": "You are in a depression. The grate is open.",
+                }
+            ],
+            "exits": {
+                "down": {
+                    "to": "below",
+                    "when": "grate_open",
+                    "locked": "The grate is locked.",
+                },
+                "north": {"to": "below", "when": "water_level >= 3"},
+            },
+            "items": ["leaves", {"name": "keys", "when": "not keys_taken"}],
+        },
+        "below": {"description": "Below the grate.", "exits": {"up": "depression"}},
+    },
+    "flags": {"water_level": 1},
+}
+
+
+@pytest.fixture(autouse=True)
+def fresh_memo():
+    world_module._loaded.clear()
+    yield
+    world_module._loaded.clear()
+
+
+@pytest.fixture
+def grate_world(tmp_path):
+    path = tmp_path / "grate.json"
+    path.write_text(json.dumps(GRATE))
+    return load_world(str(path), cache_dir=str(tmp_path))
+
+
+@pytest.mark.parametrize(
+    "source, flags, expected",
+    [
+        ("grate_open", {"grate_open": True}, True),
+        ("grate_open", {}, False),
+        ("not grate_open", {}, True),
+        ("lamp == 'on' and not troll", {"lamp": "on"}, True),
+        ("lamp == 'on' and not troll", {"lamp": "on", "troll": 1}, False),
+        ("a or b and c", {"a": True}, True),
+        ("(a or b) and c", {"a": True}, False),
+        ("water >= 3", {"water": 3}, True),
+        ("water >= 3", {}, False),
+        ("door != null", {"door": "open"}, True),
+        ("x == 1.5 or y == false", {"y": False}, True),
+    ],
+)
+def test_conditions(source, flags, expected):
+    assert compile_condition(source)(flags) is expected
+
+
+def test_condition_flags_and_errors():
+    assert compile_condition("a and (b or c > 2)").flags == {"a", "b", "c"}
+    for source in ("", "a and", "(a", "a b", "a = 1", "not"):
+        with pytest.raises(ConditionError):
+            compile_condition(source)
+
+
+def test_setting_a_flag_reevaluates_only_dependents():
+    conditions = ConditionSet(["a", "a and b", "c", "d or c"])
+    flags = conditions.bind({})
+    assert flags.evaluations == 4
+    flags.set("a", True)
+    assert flags.evaluations == 6
+    assert flags.holds("a") and not flags.holds("a and b")
+    flags.set("unrelated", 1)
+    assert flags.evaluations == 6
+    assert flags.holds("unrelated == 1")
+
+
+def test_world_compiles_conditions(grate_world, tmp_path):
+    room = grate_world.index_of("depression")
+    slot = grate_world.exit_slot(room, "down")
+    assert grate_world.exit_conditions[slot] == "grate_open"
+    assert grate_world.exit_messages[slot] == "The grate is locked."
+    assert grate_world.item_conditions == {"keys": "not keys_taken"}
+    assert grate_world.room_items[room] == ("leaves", "keys")
+    assert grate_world.conditions() == {
+        "grate_open",
+        "water_level >= 3",
+        "not keys_taken",
+    }
+
+    # The pickled cache keeps them.
+    world_module._loaded.clear()
+    path = tmp_path / "grate.json"
+    assert load_world(str(path), cache_dir=str(tmp_path)) == grate_world
+
+
+def test_bad_condition_fails_at_load(tmp_path):
+    broken = json.loads(json.dumps(GRATE))
+    broken["rooms"]["below"]["exits"]["up"] = {"to": "depression", "when": "a =="}
+    path = tmp_path / "broken.json"
+    path.write_text(json.dumps(broken))
+    with pytest.raises(WorldError, match="Room 'below' exit 'up'"):
+        load_world(str(path), use_cache=False)
+
+
+def test_engine_checks_conditions(grate_world, temp_db):
+    engine = GameEngine(
+        db_path=temp_db, world=grate_world, response_cache=ResponseCache()
+    )
+    try:
+        assert engine.start_new_game().endswith("A grate is set in the dirt.")
+        assert engine.visible_items() == ["leaves", "keys"]
+        assert engine.process_command("down") == "The grate is locked."
+        assert engine.process_command("north") == "You can't go that way."
+
+        engine.set_world_flag("grate_open", True)
+        engine.set_world_flag("keys_taken", True)
+        assert engine.process_command("look").endswith("The grate is open.")
+        assert engine.visible_items() == ["leaves"]
+        assert engine.process_command("down") == "Below the grate."
+
+        # The world's default flag counts until one is saved over it.
+        assert engine.flags().get("water_level") == 1
+        engine.set_world_flag("water_level", 3)
+        assert engine.process_command("up").startswith("You are in a depression.")
+        assert engine.process_command("north") == "Below the grate."
+    finally:
+        engine.close()
+
+
+def test_flags_are_read_once_per_session(grate_world, temp_db, monkeypatch):
+    engine = GameEngine(db_path=temp_db, world=grate_world)
+    engine.start_new_game()
+    engine.set_world_flag("grate_open", True)
+    engine.save_slot("before")
+    reads = []
+    storage = engine.storage
+    monkeypatch.setattr(
+        storage, "world_flags", lambda: reads.append(1) or {"grate_open": True}
+    )
+    monkeypatch.setattr(storage, "get_world_flag", pytest.fail)
+    try:
+        for _ in range(10):
+            engine.process_command("down")
+            engine.process_command("up")
+        assert reads == []
+        engine.load_slot("before")
+        engine.process_command("look")
+        assert len(reads) == 1
+    finally:
+        engine.close()
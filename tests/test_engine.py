@@ -41,3 +41,111 @@ def test_inventory_empty(engine):
     engine.start_new_game()
     resp = engine.process_command("inventory")
     assert "not carrying anything" in resp
+
+
+def test_quicksave_and_quickload(engine):
+    engine.start_new_game()
+    assert engine.process_command("quickload") == "There is no quick save."
+    engine.process_command("go in")
+    assert engine.process_command("quicksave") == "Game saved."
+    engine.process_command("go out")
+    assert engine.state.current_room == "start"
+
+    response = engine.process_command("quickload")
+    assert "well house" in response
+    assert engine.state.current_room == "building"
+
+
+def test_save_load_and_branch(engine):
+    engine.start_new_game()
+    engine.process_command("go in")
+    assert engine.process_command("save well house") == "Saved as 'well house'."
+    assert engine.process_command("branch well") == "Usage: branch <save> <new save>"
+    assert engine.process_command("branch main side") == (
+        "There is no save called 'main'."
+    )
+    engine.process_command("save main")
+    assert engine.process_command("branch main side") == "Branched 'main' as 'side'."
+    assert engine.process_command("saves") == (
+        "main: building\nside: building\nwell house: building"
+    )
+
+    engine.process_command("go out")
+    assert "well house" in engine.process_command("load side")
+    assert engine.state.current_room == "building"
+    assert engine.process_command("load nowhere") == (
+        "There is no save called 'nowhere'."
+    )
+
+
+def test_slot_cli(temp_db, monkeypatch):
+    from typer.testing import CliRunner
+
+    from adventuregpt import storage
+    from adventuregpt.main import app
+
+    monkeypatch.setattr(storage, "get_db_path", lambda: temp_db)
+    runner = CliRunner()
+    assert runner.invoke(app, ["save", "first"]).exit_code == 0
+    assert runner.invoke(app, ["branch", "first", "second"]).exit_code == 0
+    result = runner.invoke(app, ["branch", "first", "second"])
+    assert result.exit_code == 1
+    assert "already" in result.output
+    assert runner.invoke(app, ["load", "missing"]).exit_code == 1
+    assert runner.invoke(app, ["load", "second"]).exit_code == 0
+    result = runner.invoke(app, ["saves"])
+    assert result.output.splitlines() == ["first: start", "second: start"]
+
+
+def test_undo_redo_and_rewind(engine):
+    engine.start_new_game()
+    assert engine.process_command("undo") == "There is nothing to undo."
+    for direction in ("in", "out", "in"):
+        engine.process_command(f"go {direction}")
+    assert engine.turn == 3
+
+    assert "Undone" in engine.process_command("undo")
+    assert engine.state.current_room == "start"
+    assert "Redone" in engine.process_command("redo")
+    assert engine.state.current_room == "building"
+    assert engine.process_command("redo") == "There is nothing to redo."
+
+    assert "turn 1" in engine.process_command("rewind 1")
+    assert engine.state.current_room == "building"
+    # A new move replaces the turns that were undone.
+    engine.process_command("go south")
+    assert engine.turn == 2
+    assert engine.process_command("redo") == "There is nothing to redo."
+    assert engine.process_command("rewind 9") == "Turn 9 is not in the history."
+
+
+def test_undo_survives_restart_and_write_behind(temp_db):
+    from adventuregpt.engine import GameEngine
+
+    engine = GameEngine(db_path=temp_db, write_behind=True, checkpoint_every=2)
+    engine.start_new_game()
+    for direction in ("in", "out", "in", "out", "in"):
+        engine.process_command(f"go {direction}")
+    engine.close()
+
+    engine = GameEngine(db_path=temp_db, checkpoint_every=2)
+    engine.resume_game()
+    assert engine.turn == 5
+    engine.process_command("undo")
+    assert (engine.turn, engine.state.current_room) == (4, "start")
+    engine.close()
+
+
+def test_history_limit_compacts_the_log(temp_db):
+    from adventuregpt.engine import GameEngine
+
+    engine = GameEngine(db_path=temp_db, checkpoint_every=5, history_limit=5)
+    engine.start_new_game()
+    for turn in range(20):
+        engine.process_command("go in" if turn % 2 == 0 else "go out")
+    with engine.storage._get_conn() as conn:
+        events = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    assert events <= 11
+    assert engine.rewind(15)
+    assert not engine.rewind(4)
+    engine.close()
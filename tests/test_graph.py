@@ -0,0 +1,71 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from adventuregpt.graph import RoomGraph
+from adventuregpt.main import app
+from adventuregpt.models import WorldData
+from adventuregpt.world import compile_world
+
+
+@pytest.fixture
+def graph():
+    # a <-> b -> c, d is on its own, c has no exits.
+    data = WorldData.model_validate(
+        {
+            "start": "a",
+            "rooms": {
+                "a": {"description": "A", "exits": {"east": "b"}},
+                "b": {"description": "B", "exits": {"west": "a", "north": "c"}},
+                "c": {"description": "C"},
+                "d": {"description": "D", "exits": {"south": "a"}},
+            },
+        }
+    )
+    return RoomGraph(compile_world(data))
+
+
+def test_path(graph):
+    assert graph.path("a", "c") == ["east", "north"]
+    assert graph.path("a", "a") == []
+    assert graph.path("c", "a") is None
+    assert graph.distance("a", "c") == 2
+    assert graph.reachable("b") == {"a", "b", "c"}
+    with pytest.raises(KeyError):
+        graph.path("a", "nowhere")
+
+
+def test_set_exit_invalidates_affected_trees(graph):
+    graph.path("a", "c")
+    graph.path("d", "c")
+    graph.path("c", "c")
+    assert graph.builds == 3
+
+    # A shortcut from a to c shortens routes from a and d, not from c.
+    graph.set_exit("a", "north", "c")
+    assert graph.path("a", "c") == ["north"]
+    assert graph.path("d", "c") == ["south", "north"]
+    assert graph.path("c", "c") == []
+    assert graph.builds == 5
+
+    graph.set_exit("a", "north", None)
+    assert graph.path("a", "c") == ["east", "north"]
+    graph.set_exit("b", "west", None)
+    assert graph.path("b", "a") is None
+
+
+def test_lint(graph):
+    report = graph.lint()
+    assert report.unreachable == ["d"]
+    assert report.dead_ends == ["c"]
+
+
+def test_lint_cli(tmp_path):
+    assert CliRunner().invoke(app, ["lint"]).exit_code == 0
+
+    path = tmp_path / "world.json"
+    path.write_text(json.dumps({"rooms": {"start": {"description": "x"}}}))
+    result = CliRunner().invoke(app, ["lint", "--world", str(path)])
+    assert result.exit_code == 1
+    assert "dead end: start" in result.output
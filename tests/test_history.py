@@ -0,0 +1,72 @@
+from adventuregpt.history import Entry, History
+
+
+def test_append_read_and_reopen(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    history = History(path)
+    history.INDEX_EVERY = 4
+    for i in range(10):
+        history.append("text", f"[bold]line {i}[/bold]\nsecond row")
+    assert len(history) == 10
+    assert [e.text for e in history.read(5, 7)] == [
+        "[bold]line 5[/bold]\nsecond row",
+        "[bold]line 6[/bold]\nsecond row",
+    ]
+    assert history.read(8, 100)[-1].plain.startswith("line 9")
+    history.close()
+
+    # A torn final write is dropped when the transcript is reopened.
+    with open(path, "ab") as f:
+        f.write(b'["text", "half')
+    history = History(path)
+    assert len(history) == 10
+    history.append("command", "look")
+    assert history.read(10) == [Entry("command", "look")]
+    history.close()
+
+
+def test_search_streams_plain_text(tmp_path):
+    history = History(str(tmp_path / "history.jsonl"))
+    history.append("command", "go north")
+    history.append("text", "You are [bold]north[/bold] of the house.")
+    history.append("text", "bold claims")
+    assert [i for i, _ in history.search("NORTH")] == [0, 1]
+    assert [i for i, _ in history.search("bold")] == [2]
+
+    history.clear()
+    assert len(history) == 0
+    assert list(history.search("north")) == []
+    history.close()
+
+
+def test_new_game_removes_history(engine):
+    history = History(engine.storage.history_path)
+    history.append("text", "old game")
+    history.close()
+    engine.start_new_game()
+    history = History(engine.storage.history_path)
+    assert len(history) == 0
+    history.close()
+
+
+def test_long_output_is_stored_once(tmp_path, temp_db):
+    from adventuregpt.storage import Database, TextStore
+
+    database = Database(temp_db)
+    path = tmp_path / "history.jsonl"
+    history = History(str(path), TextStore(database))
+    room = "You are standing at the end of a road before a [bold]small[/bold] house."
+    for _ in range(3):
+        history.append("command", "look")
+        history.append("text", room)
+    history.append("text", "Short.")
+    history.close()
+    assert room.encode() not in path.read_bytes()
+
+    # Reopened with a fresh store, the text is read back from the database.
+    history = History(str(path), TextStore(database))
+    assert history.read(5) == [Entry("text", room), Entry("text", "Short.")]
+    assert [i for i, _ in history.search("small house")] == [1, 3, 5]
+    assert history.texts.stats()["size"] == 1
+    history.close()
+    database.close()
@@ -0,0 +1,90 @@
+import pytest
+
+from adventuregpt.engine import GameEngine
+from adventuregpt.knowledge import Fact, KnowledgeGraph
+from adventuregpt.storage import Database
+from adventuregpt.world import load_world
+
+
+@pytest.fixture
+def database(temp_db):
+    database = Database(temp_db)
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def graph(database):
+    graph = KnowledgeGraph(database)
+    graph.add_many(
+        [
+            ("lamp", "is_a", "item"),
+            ("lamp", "located_in", "building"),
+            ("keys", "located_in", "building"),
+            ("building", "south", "road"),
+            ("road", "north", "building"),
+            ("road", "west", "hill"),
+        ]
+    )
+    return graph
+
+
+def test_neighbors_and_patterns(graph):
+    assert graph.objects("road", "west") == ("hill",)
+    assert set(graph.subjects("located_in", "building")) == {"lamp", "keys"}
+    assert graph.neighbors("road") == {"building", "hill"}
+    assert graph.neighbors("building", direction="both") == {"lamp", "keys", "road"}
+    assert graph.match(relation="located_in", object="building") == [
+        Fact("keys", "located_in", "building"),
+        Fact("lamp", "located_in", "building"),
+    ]
+    assert graph.match("lamp", object="item") == [Fact("lamp", "is_a", "item")]
+    assert len(graph.match(relation="located_in")) == 2
+    assert len(graph.match()) == len(graph) == 6
+    with pytest.raises(ValueError):
+        graph.neighbors("road", direction="sideways")
+
+
+def test_k_hop(graph):
+    assert graph.k_hop("lamp", 1) == {"lamp": 0, "item": 1, "building": 1}
+    assert graph.k_hop("lamp", 2) == {"lamp": 0, "item": 1, "building": 1, "road": 2}
+    assert graph.k_hop("hill", 2, direction="in") == {
+        "hill": 0,
+        "road": 1,
+        "building": 2,
+    }
+    assert graph.k_hop("road", 3, relation="north") == {"road": 0, "building": 1}
+
+
+def test_writes_invalidate_cache_and_persist(graph, database):
+    assert graph.neighbors("hill", direction="in") == {"road"}
+    loads = graph.loads
+    graph.neighbors("hill", direction="in")
+    assert graph.loads == loads
+
+    graph.add("cave", "south", "hill")
+    assert graph.neighbors("hill", direction="in") == {"road", "cave"}
+    assert graph.remove("road", "west", "hill")
+    assert not graph.remove("road", "west", "hill")
+    assert graph.neighbors("road") == {"building"}
+
+    reopened = KnowledgeGraph(database)
+    assert reopened.neighbors("hill", direction="in") == {"cave"}
+    assert len(KnowledgeGraph(database, "other")) == 0
+
+
+def test_world_facts_reach_prompts(temp_db, database):
+    world = load_world()
+    knowledge = KnowledgeGraph.for_world(database, world)
+    assert Fact("start", "north", "building") in knowledge.match("start")
+    assert len(KnowledgeGraph.for_world(database, world)) == len(knowledge)
+
+    engine = GameEngine(db_path=temp_db, knowledge=knowledge)
+    try:
+        engine.start_new_game()
+        facts = engine.prompt("xyzzy").facts
+        assert Fact("building", "south", "start") in facts
+        # Paths stop at values: "room" does not fan out to every room.
+        assert Fact("start", "is_a", "room") in facts
+    finally:
+        engine.close()
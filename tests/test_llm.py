@@ -0,0 +1,121 @@
+import asyncio
+import threading
+
+import pytest
+
+from adventuregpt.engine import UNKNOWN_COMMAND, GameEngine
+from adventuregpt.llm import (
+    LLMClient,
+    LLMTimeout,
+    Prompt,
+    StubBackend,
+    make_backend,
+)
+from adventuregpt.loadgen import histogram
+from adventuregpt.server import EnginePool, GameServer
+from adventuregpt.storage import Database
+from adventuregpt.world import load_world
+
+
+def prompt(command: str) -> Prompt:
+    return Prompt("road", "You are on a road.", (), command)
+
+
+@pytest.fixture
+def client():
+    client = LLMClient(StubBackend(first_token_ms=1, token_ms=0), batch_window_ms=20)
+    yield client
+    client.close()
+
+
+def test_stub_is_deterministic(client):
+    text = "".join(client.stream_sync(prompt("dance")))
+    assert "dance" in text
+    assert text == StubBackend().reply(prompt("dance"))
+    assert "".join(client.stream_sync(prompt("dance"))) == text
+
+    with pytest.raises(ValueError):
+        make_backend("gpt-9")
+
+
+def test_concurrent_requests_share_a_batch(client):
+    replies = {}
+
+    def ask(command):
+        replies[command] = "".join(client.stream_sync(prompt(command)))
+
+    threads = [threading.Thread(target=ask, args=(f"sing {i}",)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(f"sing {i}" in replies[f"sing {i}"] for i in range(6))
+    assert max(client.backend.batches) > 1
+    assert client.stats()["requests"] == 6
+
+
+def test_slow_backend_times_out():
+    client = LLMClient(StubBackend(first_token_ms=5000), timeout=0.1)
+    try:
+        with pytest.raises(LLMTimeout):
+            list(client.stream_sync(prompt("wait")))
+        with pytest.raises(LLMTimeout):
+            asyncio.run(client.complete(prompt("wait")))
+        assert client.stats()["timeouts"] == 2
+    finally:
+        client.close()
+
+
+def test_engine_streams_unknown_commands(temp_db, client):
+    engine = GameEngine(db_path=temp_db, llm=client)
+    try:
+        engine.start_new_game()
+        tokens = []
+        response = engine.process_command("xyzzy", on_token=tokens.append)
+        assert len(tokens) > 1
+        assert response == "".join(tokens)
+        assert "xyzzy" in response
+        # Commands the parser knows never reach the LLM.
+        assert "well house" in engine.process_command("go in")
+        assert client.stats()["requests"] == 1
+    finally:
+        engine.close()
+
+
+def test_engine_falls_back_when_backend_is_slow(temp_db):
+    client = LLMClient(StubBackend(first_token_ms=5000), timeout=0.05)
+    engine = GameEngine(db_path=temp_db, llm=client)
+    try:
+        engine.start_new_game()
+        assert engine.process_command("xyzzy") == UNKNOWN_COMMAND
+    finally:
+        engine.close()
+        client.close()
+
+
+@pytest.mark.asyncio
+async def test_server_answers_with_llm(temp_db, client):
+    database = Database(temp_db)
+    pool = EnginePool(database, load_world(), llm=client)
+    server = GameServer(pool, port=0)
+    await server.start()
+    reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+    try:
+        writer.write(b"session alice\nxyzzy\n")
+        await reader.readline()
+        reply = await reader.readline()
+        assert "xyzzy" in reply.decode()
+    finally:
+        writer.close()
+        await server.stop()
+        pool.close()
+        database.close()
+
+
+def test_histogram_buckets():
+    assert histogram([0.0005, 0.0015, 0.0015, 9.0]) == {
+        "<=1ms": 1,
+        "<=2ms": 2,
+        ">5000ms": 1,
+    }
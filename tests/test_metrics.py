@@ -0,0 +1,65 @@
+import json
+import pstats
+
+import pytest
+
+from adventuregpt.engine import AsyncEngine, GameEngine
+from adventuregpt.metrics import Histogram, Metrics, Profiler
+
+
+def test_histogram_summary():
+    histogram = Histogram()
+    for seconds in (0.000_003, 0.000_040, 0.000_045, 2.0):
+        histogram.observe(seconds)
+    summary = histogram.summary()
+    assert summary["count"] == 4
+    assert summary["buckets"] == {"<=5us": 1, "<=50us": 2, ">1000ms": 1}
+    assert summary["p50_ms"] == 0.05
+    assert summary["max_ms"] == summary["p99_ms"] == 2000.0
+
+
+def test_engine_records_verbs_and_storage(temp_db, tmp_path):
+    metrics = Metrics()
+    engine = GameEngine(db_path=temp_db, metrics=metrics)
+    try:
+        engine.start_new_game()
+        engine.process_command("go in")
+        engine.process_command("look")
+        engine.process_command("xyzzy")
+    finally:
+        engine.close()
+
+    snapshot = metrics.snapshot()
+    histograms = snapshot["histograms"]
+    for name in ("parse.go", "dispatch.go", "dispatch.look", "dispatch.unknown"):
+        assert histograms[name]["count"] == 1
+    assert histograms["storage.op"]["count"] > 0
+    assert snapshot["counters"]["storage.commits"] > 0
+    assert snapshot["counters"]["storage.statements"] > 0
+    assert any(line.startswith("dispatch.go: n=1") for line in metrics.report())
+
+    path = tmp_path / "metrics.json"
+    metrics.dump(str(path))
+    assert json.loads(path.read_text()) == snapshot
+
+
+def test_disabled_by_default(engine):
+    engine.start_new_game()
+    engine.process_command("look")
+    assert engine.metrics is None
+    assert engine.storage.database.metrics is None
+
+
+@pytest.mark.asyncio
+async def test_profiler_sees_engine_thread(temp_db, tmp_path):
+    profiler = Profiler()
+    runner = AsyncEngine(GameEngine(db_path=temp_db), profiler)
+    await runner.start_new_game()
+    await runner.process_command("go in")
+    runner.close()
+    runner.engine.close()
+
+    path = str(tmp_path / "out.prof")
+    profiler.dump(path)
+    functions = {name for _, _, name in pstats.Stats(path).stats}
+    assert "_cmd_go" in functions
@@ -0,0 +1,32 @@
+import sys
+
+import pytest
+
+from adventuregpt.models import Inventory, PlayerState
+
+
+def test_inventory_is_an_ordered_set():
+    inventory = Inventory(["lamp", "keys", "lamp"])
+    inventory.add("rod")
+    inventory.add("keys")
+    assert inventory.items == ["lamp", "keys", "rod"]
+    assert "rod" in inventory
+    inventory.remove("lamp")
+    assert len(inventory) == 2
+    assert inventory == Inventory(["keys", "rod"])
+
+
+def test_player_state_is_slotted_and_interned():
+    state = PlayerState(current_room="".join(["buil", "ding"]))
+    assert state.current_room is sys.intern("building")
+    with pytest.raises(AttributeError):
+        state.score = 1
+
+
+def test_state_round_trips_through_storage(temp_db):
+    from adventuregpt.storage import GameStorage
+
+    storage = GameStorage(temp_db)
+    storage.save_player_state(PlayerState("building", Inventory(["lamp"])))
+    assert storage.load_player_state() == PlayerState("building", Inventory(["lamp"]))
+    storage.close()
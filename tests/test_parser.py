@@ -0,0 +1,84 @@
+import pytest
+
+from adventuregpt.parser import Command, CommandParser, Trie
+
+
+@pytest.fixture
+def parser():
+    return CommandParser(nouns=["brass lamp", "keys"])
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("n", Command("go", "north")),
+        ("inv", Command("inventory")),
+        ("i", Command("inventory")),
+        ("in", Command("go", "in")),
+        ("GO Sou", Command("go", "south", ("sou",))),
+        ("look around", Command("look")),
+        ("take inv", Command("inventory")),
+        ("exit", Command("quit")),
+        ("Q", Command("quit")),
+        ("qu", Command(None, rest=("qu",))),
+        ("exit building", Command(None, rest=("exit", "building"))),
+        ("xyzzy", Command(None, rest=("xyzzy",))),
+        # Misspellings and filler words.
+        ("nroth", Command("go", "north")),
+        ("inventroy", Command("inventory")),
+        ("lokk around", Command("look")),
+        ("please go to the wset", Command("go", "west", ("to", "the", "wset"))),
+        (
+            "look at the brass lmap",
+            Command("look", "brass lamp", ("at", "the", "brass", "lmap")),
+        ),
+        ("save the day", Command("save", "day", ("the", "day"))),
+        ("qiut", Command(None, rest=("qiut",))),
+        ("savs", Command(None, rest=("savs",))),
+    ],
+)
+def test_parse(parser, text, expected):
+    assert parser.parse(text) == expected
+
+
+def test_go_passes_unknown_direction_through(parser):
+    assert parser.parse("go sideways").noun == "sideways"
+
+
+def test_is_quit_needs_the_whole_word(parser):
+    assert parser.is_quit(" quit ")
+    assert not parser.is_quit("quitter")
+    assert not parser.is_quit("quit now")
+    assert parser.suggest("qu") == "quit"
+
+
+def test_parse_reuses_results(parser):
+    assert parser.parse("go north") is parser.parse("go north")
+
+
+def test_trie_ambiguous_prefix():
+    trie = Trie()
+    trie.insert("east", "east")
+    trie.insert("exit", "quit")
+    assert trie.resolve("ea") == "east"
+    assert trie.resolve("e") is None
+    assert trie.complete("e") == "east"
+
+
+def test_suggest(parser):
+    assert parser.suggest("go n") == "go north"
+    assert parser.suggest("e") == "east"
+    assert parser.suggest("Inv") == "Inventory"
+    assert parser.suggest("look b") == "look brass lamp"
+    assert parser.suggest("look") is None
+    assert parser.suggest("wlak nor") == "wlak north"
+    assert parser.suggest("lokk k") == "lokk keys"
+
+
+def test_engine_abbreviations(engine):
+    engine.start_new_game()
+    assert "well house" in engine.process_command("n")
+    assert "end of a road" in engine.process_command("s")
+    assert "not carrying" in engine.process_command("i")
+    assert "Where do you want to go" in engine.process_command("go")
+    assert "well house" in engine.process_command("nroth")
@@ -0,0 +1,53 @@
+import json
+
+from typer.testing import CliRunner
+
+from adventuregpt.main import app
+from adventuregpt.replay import replay, replay_many
+
+
+def test_replay_records(temp_db):
+    records = list(replay(["go in", "", "# comment", "look"], temp_db))
+    assert [r["command"] for r in records] == ["go in", "look"]
+    assert [r["index"] for r in records] == [0, 1]
+    assert "well house" in records[0]["response"]
+    assert all(r["latency_ms"] >= 0 for r in records)
+
+
+def test_replay_many_parallel(tmp_path):
+    paths = []
+    for i, script in enumerate(["in\nout\n", "north\ninventory\n"]):
+        path = tmp_path / f"t{i}.txt"
+        path.write_text(script)
+        paths.append(str(path))
+
+    out_dir = tmp_path / "out"
+    summaries = replay_many(paths, str(out_dir), db_dir=str(tmp_path / "db"), jobs=2)
+    assert [s["commands"] for s in summaries] == [2, 2]
+
+    lines = (out_dir / "0001-t1.jsonl").read_text().splitlines()
+    assert json.loads(lines[1])["response"] == "You are not carrying anything."
+    assert len(list((tmp_path / "db").glob("*.db"))) == 2
+
+
+def test_replay_cli_stdin():
+    result = CliRunner().invoke(app, ["replay"], input="n\ns\n")
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.stdout.splitlines()[:2]]
+    assert "well house" in records[0]["response"]
+    assert "end of a road" in records[1]["response"]
+
+
+def test_replay_many_reports_failures(tmp_path):
+    good = tmp_path / "good.txt"
+    good.write_text("look\n")
+    missing = tmp_path / "missing.txt"
+    summaries = replay_many([str(missing), str(good)], str(tmp_path / "out"), jobs=1)
+    assert "error" in summaries[0]
+    assert summaries[1]["commands"] == 1
+
+
+def test_replay_cli_missing_transcript(tmp_path):
+    result = CliRunner().invoke(app, ["replay", str(tmp_path / "nope.txt")])
+    assert result.exit_code == 2
+    assert "no such transcript" in result.output
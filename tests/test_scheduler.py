@@ -0,0 +1,147 @@
+import pytest
+
+from adventuregpt.engine import GameEngine
+from adventuregpt.llm import LLMClient, StubBackend
+from adventuregpt.metrics import Metrics
+from adventuregpt.models import WorldData
+from adventuregpt.scheduler import Scheduler
+from adventuregpt.world import compile_world
+
+
+def line_world(rooms: int):
+    # r0 <-> r1 <-> ... <-> r(n-1)
+    data = {}
+    for i in range(rooms):
+        exits = {}
+        if i:
+            exits["west"] = f"r{i - 1}"
+        if i < rooms - 1:
+            exits["east"] = f"r{i + 1}"
+        data[f"r{i}"] = {"description": f"Room {i}.", "exits": exits}
+    return compile_world(WorldData.model_validate({"start": "r0", "rooms": data}))
+
+
+def positions(scheduler):
+    return sorted(
+        (event.name, event.room)
+        for room in range(len(scheduler.world))
+        for event in scheduler.events(scheduler.world.room_ids[room])
+    )
+
+
+def test_deterministic_under_seed():
+    world = line_world(50)
+    runs = []
+    for _ in range(2):
+        scheduler = Scheduler(world, seed=7)
+        for i in range(20):
+            scheduler.add_npc(f"npc{i}", f"r{i * 2}")
+        for room in range(100):
+            scheduler.tick(room % 50)
+        runs.append(positions(scheduler))
+    assert runs[0] == runs[1]
+    other = Scheduler(world, seed=8)
+    for i in range(20):
+        other.add_npc(f"npc{i}", f"r{i * 2}")
+    for room in range(100):
+        other.tick(room % 50)
+    assert positions(other) != runs[0]
+
+
+def test_lazy_catch_up_matches_eager():
+    world = line_world(60)
+    lazy = Scheduler(world, seed=3, radius=0)
+    eager = Scheduler(world, seed=3, radius=0)
+    for scheduler in (lazy, eager):
+        for i in range(30):
+            scheduler.add_npc(f"npc{i}", f"r{i * 2}", every=1 + i % 3)
+    for room_id in world.room_ids:
+        eager.activate(room_id)
+    for turn in range(200):
+        lazy.tick(turn % 5)
+        eager.tick(turn % 5)
+    assert lazy.runs < eager.runs
+    lazy.catch_up()
+    assert positions(lazy) == positions(eager)
+
+
+def test_far_npcs_cost_nothing():
+    world = line_world(100)
+    scheduler = Scheduler(world, radius=1)
+    for i in range(1000):
+        scheduler.add_npc(f"npc{i}", "r99", behaviour=lambda s, e, rng: None)
+    for _ in range(50):
+        scheduler.tick(0)
+    assert scheduler.runs == 0
+    # Arriving catches the room up: 50 overdue runs per NPC, plus this tick.
+    scheduler.tick(98)
+    assert scheduler.runs == 1000 * 51
+
+
+def test_timed_events():
+    world = line_world(3)
+    scheduler = Scheduler(world)
+    scheduler.schedule(lambda s, e, rng: "Bong.", delay=2)
+    bell = scheduler.schedule(lambda s, e, rng: "Ding.", every=2, room="r2")
+    assert scheduler.tick(0) == []
+    assert scheduler.tick(0) == ["Bong."]
+    assert scheduler.tick(0) == []
+    # Ding was due on ticks 1 and 3, out of sight; it rings on 5.
+    assert scheduler.tick(1) == []
+    assert scheduler.tick(1) == ["Ding."]
+    scheduler.cancel(bell)
+    assert scheduler.tick(1) == [] and scheduler.tick(1) == []
+    with pytest.raises(ValueError):
+        scheduler.schedule(lambda s, e, rng: None, delay=0)
+    with pytest.raises(KeyError):
+        scheduler.add_npc("ghost", "nowhere")
+
+
+def test_wander_messages():
+    world = line_world(2)
+    scheduler = Scheduler(world)
+    scheduler.add_npc("dwarf", "r1")
+    assert scheduler.tick(0) == ["The dwarf arrives."]
+    assert scheduler.tick(0) == ["The dwarf leaves."]
+
+
+def test_engine_ticks_world_commands(temp_db):
+    world = line_world(3)
+    scheduler = Scheduler(world)
+    scheduler.schedule(lambda s, e, rng: "A bell rings.", every=1)
+    metrics = Metrics()
+    engine = GameEngine(
+        db_path=temp_db, world=world, scheduler=scheduler, metrics=metrics
+    )
+    try:
+        engine.start_new_game()
+        assert engine.process_command("look") == "Room 0.\n\nA bell rings."
+        assert engine.process_command("go east") == "Room 1.\n\nA bell rings."
+        assert engine.process_command("xyzzy") == "I don't understand that command."
+        engine.process_command("saves")
+        assert scheduler.now == 2
+    finally:
+        engine.close()
+    assert metrics.snapshot()["histograms"]["world.tick"]["count"] == 2
+
+
+def test_engine_streams_messages_after_llm_reply(temp_db):
+    world = line_world(2)
+    scheduler = Scheduler(world)
+    scheduler.schedule(lambda s, e, rng: "A bell rings.", every=1)
+    client = LLMClient(StubBackend(first_token_ms=0, token_ms=0))
+    engine = GameEngine(db_path=temp_db, world=world, scheduler=scheduler, llm=client)
+    try:
+        engine.start_new_game()
+        tokens = []
+        response = engine.process_command("xyzzy", on_token=tokens.append)
+    finally:
+        engine.close()
+        client.close()
+    assert response.endswith("\n\nA bell rings.")
+    assert "".join(tokens) == response
+
+
+def test_engine_rejects_other_world(temp_db):
+    with pytest.raises(ValueError):
+        GameEngine(db_path=temp_db, scheduler=Scheduler(line_world(2)))
@@ -0,0 +1,95 @@
+import pytest
+
+from adventuregpt.engine import GameEngine
+from adventuregpt.llm import LLMClient, StubBackend
+from adventuregpt.semantic import SemanticCache, embed, normalize
+from adventuregpt.storage import Database
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def database(temp_db):
+    database = Database(temp_db)
+    yield database
+    database.close()
+
+
+def test_normalize_folds_paraphrases():
+    assert normalize("Look at the buildings!") == "examine building"
+    assert normalize("inspect building") == "examine building"
+    assert normalize("please pick up the lamp") == "take lamp"
+    assert normalize("xyzzy") == "xyzzy"
+
+
+def test_embeddings_rank_paraphrases_higher():
+    def similarity(a, b):
+        return sum(x * y for x, y in zip(embed(a), embed(b)))
+
+    assert similarity("examine building", "examine building") == pytest.approx(1.0)
+    assert similarity("examine building", "examin building") > 0.75
+    assert similarity("examine building", "examine lamp") < 0.75
+    assert similarity("examine building", "dance") < 0.3
+
+
+def test_exact_and_similar_hits(database):
+    exact = SemanticCache(database)
+    exact.put("road", "examine the building", "It is made of brick.")
+    assert exact.get("road", "look at building") == "It is made of brick."
+    assert exact.get("house", "look at building") is None
+    assert exact.get("road", "examin building") is None
+
+    similar = SemanticCache(database, similarity=0.75)
+    similar.put("road", "examine the building", "It is made of brick.")
+    assert similar.get("road", "examin building") == "It is made of brick."
+    assert similar.get("road", "examine the old building") == "It is made of brick."
+    assert similar.get("road", "examine lamp") is None
+    assert similar.stats()["similar_hits"] == 2
+
+
+def test_ttl_and_size_eviction(database):
+    clock = Clock()
+    cache = SemanticCache(database, capacity=2, ttl=60, clock=clock)
+    cache.put("road", "sing", "La.")
+    clock.now += 61
+    assert cache.get("road", "sing") is None
+
+    cache.put("road", "dance", "You dance.")
+    clock.now += 1
+    cache.put("road", "jump", "You jump.")
+    clock.now += 1
+    assert cache.get("road", "dance") == "You dance."
+    clock.now += 1
+    cache.put("road", "swim", "No water.")
+    # "sing" expired; "jump" is the least recently used of the rest.
+    assert cache.evict() == 2
+    assert cache.get("road", "jump") is None
+    assert cache.get("road", "dance") == "You dance."
+    assert cache.stats()["size"] == 2
+
+
+def test_engines_share_generated_text(temp_db, database):
+    client = LLMClient(StubBackend(first_token_ms=1, token_ms=0))
+    cache = SemanticCache(database)
+    engine = GameEngine(db_path=temp_db, llm=client, semantic_cache=cache)
+    try:
+        engine.start_new_game()
+        first = engine.process_command("inspect the building")
+        tokens = []
+        assert engine.process_command("examine buildings", tokens.append) == first
+        assert tokens == [first]
+        assert client.stats()["requests"] == 1
+
+        # A changed flag is a different scene.
+        engine.set_world_flag("grate_open", True)
+        engine.process_command("inspect the building")
+        assert client.stats()["requests"] == 2
+    finally:
+        engine.close()
+        client.close()
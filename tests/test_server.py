@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import pytest
+
+from adventuregpt.loadgen import run_load
+from adventuregpt.server import EnginePool, GameServer
+from adventuregpt.storage import Database, GameStorage
+from adventuregpt.world import load_world
+
+
+@pytest.fixture
+def database(temp_db):
+    database = Database(temp_db)
+    yield database
+    database.close()
+
+
+def test_sessions_are_isolated(database):
+    alice = GameStorage(session="alice", database=database)
+    bob = GameStorage(session="bob", database=database)
+    alice.set_world_flag("grate_open", True)
+    assert bob.get_world_flag("grate_open") is None
+    assert database.sessions() == ["alice", "bob"]
+
+
+def test_legacy_schema_is_migrated(temp_db):
+    import sqlite3
+
+    conn = sqlite3.connect(temp_db)
+    conn.execute(
+        "CREATE TABLE player (id INTEGER PRIMARY KEY CHECK (id = 1), "
+        "current_room TEXT NOT NULL, inventory TEXT DEFAULT '[]')"
+    )
+    conn.execute("CREATE TABLE world_state (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("INSERT INTO player VALUES (1, 'building', '[]')")
+    conn.execute("INSERT INTO world_state VALUES ('grate_open', 'true')")
+    conn.commit()
+    conn.close()
+
+    storage = GameStorage(temp_db)
+    assert storage.load_player_state().current_room == "building"
+    assert storage.get_world_flag("grate_open") is True
+    storage.close()
+
+
+def test_engine_pool_evicts_to_storage(database):
+    pool = EnginePool(database, load_world(), capacity=1)
+    pool.get("alice").process_command("in")
+    pool.get("bob")
+    assert "alice" not in pool
+    assert pool.evictions == 1
+    # Alice's move was flushed on eviction and is reloaded on demand.
+    assert pool.get("alice").state.current_room == "building"
+    pool.close()
+
+
+@pytest.mark.asyncio
+async def test_server_round_trip(database):
+    server = GameServer(EnginePool(database, load_world()), port=0)
+    await server.start()
+    reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+    try:
+        writer.write(b"go in\nsession alice\neast\n")
+        replies = [json.loads(await reader.readline()) for _ in range(3)]
+        assert "error" in replies[0]
+        assert "brick building" in replies[1]["response"]
+        assert replies[2] == {"session": "alice", "response": "You can't go that way."}
+
+        result = await run_load("127.0.0.1", server.port, sessions=5, rounds=2)
+        assert result["commands"] == 5 * 2 * 6
+        assert result["p99_ms"] >= result["p50_ms"]
+    finally:
+        writer.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_with_idle_client(database):
+    server = GameServer(EnginePool(database, load_world()), port=0)
+    await server.start()
+    reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+    writer.write(b"session idle\n")
+    await reader.readline()
+    # An idle client must not keep shutdown waiting.
+    await asyncio.wait_for(server.stop(), timeout=5)
+    writer.close()
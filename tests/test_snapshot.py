@@ -0,0 +1,55 @@
+import pytest
+
+from adventuregpt import snapshot
+from adventuregpt.models import Inventory, PlayerState
+from adventuregpt.snapshot import SnapshotError
+
+
+def test_round_trip():
+    state = PlayerState("building", Inventory(["lamp", "keys"]))
+    flags = {
+        "grate_open": True,
+        "lamp": None,
+        "score": -350,
+        "big": 2**70,
+        "weight": 1.5,
+        "visited": ["start", "building"],
+        "npc": {"dwarf": {"angry": False, "name": "Grümpf"}},
+    }
+    loaded_state, loaded_flags = snapshot.loads(snapshot.dumps(state, flags))
+    assert loaded_state == state
+    assert loaded_flags == flags
+
+
+def test_smaller_than_json():
+    import json
+
+    state = PlayerState("building", Inventory(f"item{i}" for i in range(100)))
+    flags = {f"flag{i}": i for i in range(100)}
+    data = snapshot.dumps(state, flags)
+    as_json = json.dumps(
+        {"room": state.current_room, "inventory": state.inventory.items, "flags": flags}
+    )
+    assert len(data) < len(as_json)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"nope",
+        b"AGS\x02",
+        snapshot.dumps(PlayerState(), {})[:-3],
+        snapshot.dumps(PlayerState(), {}) + b"\x00",
+        b"AGS\x01\x09",
+        b"AGS\x01\x00",
+    ],
+)
+def test_rejects_corrupt_snapshots(data):
+    with pytest.raises(SnapshotError):
+        snapshot.loads(data)
+
+
+def test_rejects_unsupported_values():
+    with pytest.raises(SnapshotError):
+        snapshot.dumps(PlayerState(), {"when": object()})
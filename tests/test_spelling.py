@@ -0,0 +1,43 @@
+import pytest
+
+from adventuregpt.spelling import SpellIndex, deletes, edit_distance
+
+
+def test_edit_distance():
+    assert edit_distance("north", "nroth", 2) == 1
+    assert edit_distance("kitten", "sitting", 3) == 3
+    assert edit_distance("kitten", "sitting", 1) == 2
+    assert edit_distance("", "abc", 5) == 3
+
+
+def test_deletes():
+    assert deletes("abc", 1) == {"abc", "bc", "ac", "ab"}
+    assert len(deletes("abcd", 2)) == 1 + 4 + 6
+
+
+@pytest.mark.parametrize(
+    "word, expected",
+    [
+        ("north", "north"),
+        ("nroth", "north"),
+        ("nrth", "north"),
+        ("inventroy", "inventory"),
+        ("invntroy", "inventory"),
+        ("lantren", "lantern"),
+        # Too short to guess at.
+        ("nth", None),
+        # One edit from both "save" and "saves".
+        ("savs", None),
+        ("xyzzy", None),
+    ],
+)
+def test_correct(word, expected):
+    index = SpellIndex(["north", "inventory", "lantern", "save", "saves"])
+    assert index.correct(word) == expected
+
+
+def test_large_vocabulary():
+    index = SpellIndex(f"item{i:05d}" for i in range(10_000))
+    assert len(index) == 10_000
+    assert index.correct("item0042x") is None  # one edit from ten items
+    assert index.correct("itme04242") == "item04242"
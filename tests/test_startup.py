@@ -0,0 +1,31 @@
+import subprocess
+import sys
+
+# Cumulative import time budget for the CLI entry point, in microseconds.
+# Typer alone is ~60 ms on a laptop; pulling in Pydantic or Textual by
+# accident costs well over 100 ms more.
+MAIN_IMPORT_BUDGET_US = 200_000
+
+HEAVY_MODULES = ("textual", "pydantic", "sqlite3", "asyncio", "adventuregpt.engine")
+
+
+def import_times(module: str):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_imports_stay_light():
+    times = import_times("adventuregpt.main")
+    assert not [m for m in HEAVY_MODULES if m in times]
+    assert times["adventuregpt.main"] < MAIN_IMPORT_BUDGET_US
@@ -0,0 +1,340 @@
+import pytest
+
+from adventuregpt.engine import GameEngine
+from adventuregpt.models import Inventory, PlayerState
+from adventuregpt.storage import GameStorage, SaveJournal
+
+
+def test_connection_is_reused(temp_db):
+    storage = GameStorage(temp_db)
+    with storage._get_conn() as first:
+        pass
+    storage.save_player_state(PlayerState(current_room="building"))
+    with storage._get_conn() as second:
+        assert first is second
+    storage.close()
+
+
+def test_wal_and_synchronous(temp_db):
+    storage = GameStorage(temp_db, synchronous="off")
+    with storage._get_conn() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        # OFF == 0
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 0
+    storage.close()
+
+
+def test_invalid_synchronous(temp_db):
+    with pytest.raises(ValueError):
+        GameStorage(temp_db, synchronous="sometimes")
+
+
+def test_reopen_after_close(temp_db):
+    storage = GameStorage(temp_db)
+    storage.set_world_flag("grate_open", True)
+    storage.close()
+    assert storage.get_world_flag("grate_open") is True
+    assert storage.get_world_flag("missing") is None
+    storage.close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_journal_flushes_after_n_commands(temp_db):
+    storage = GameStorage(temp_db)
+    journal = SaveJournal(storage, flush_every=3, flush_interval_ms=60_000)
+    state = PlayerState()
+    for room in ("building", "start"):
+        state.current_room = room
+        journal.save_player_state(state)
+        journal.record_command()
+    assert journal.flushes == 0
+    assert storage.load_player_state() is None
+
+    journal.set_world_flag("grate_open", True)
+    journal.record_command()
+    assert journal.flushes == 1
+    assert storage.load_player_state().current_room == "start"
+    assert storage.get_world_flag("grate_open") is True
+    storage.close()
+
+
+def test_journal_flushes_after_interval(temp_db):
+    clock = FakeClock()
+    storage = GameStorage(temp_db)
+    journal = SaveJournal(storage, flush_every=100, flush_interval_ms=500, clock=clock)
+    journal.set_world_flag("lamp", "on")
+    assert journal.get_world_flag("lamp") == "on"
+    assert not journal.flush_if_due()
+
+    clock.now = 0.5
+    assert journal.flush_if_due()
+    assert storage.get_world_flag("lamp") == "on"
+    assert not journal.dirty
+    journal.close()
+
+
+def test_engine_write_behind_flushes_on_close(temp_db):
+    engine = GameEngine(db_path=temp_db, write_behind=True, flush_every=1000)
+    engine.start_new_game()
+    engine.process_command("go in")
+    assert GameStorage(temp_db).load_player_state().current_room == "start"
+
+    engine.close()
+    assert GameStorage(temp_db).load_player_state().current_room == "building"
+
+
+def test_failed_batch_is_rolled_back(temp_db):
+    storage = GameStorage(temp_db)
+    with pytest.raises(TypeError):
+        storage.save_batch(PlayerState(current_room="building"), {"bad": object()})
+    storage.set_world_flag("lamp", "on")
+    assert storage.load_player_state() is None
+    storage.close()
+
+
+def test_move_only_rewrites_the_room(temp_db):
+    storage = GameStorage(temp_db)
+    state = PlayerState(current_room="start")
+    storage.new_game(state)
+    statements = []
+    with storage._get_conn() as conn:
+        conn.set_trace_callback(statements.append)
+    state.current_room = "building"
+    storage.save_player_state(state)
+    assert not state.changes()
+    assert any(s.startswith("UPDATE player SET current_room") for s in statements)
+    assert not any("inventory" in s for s in statements)
+
+    # Nothing changed: no writes at all.
+    statements.clear()
+    storage.save_player_state(state)
+    assert not [s for s in statements if s not in ("BEGIN", "COMMIT")]
+    with storage._get_conn() as conn:
+        conn.set_trace_callback(None)
+    assert storage.load_player_state().current_room == "building"
+    storage.close()
+
+
+def test_quick_save_and_load(temp_db):
+    storage = GameStorage(temp_db)
+    assert storage.quick_load() is None
+    state = PlayerState(current_room="building")
+    storage.new_game(state)
+    storage.set_world_flag("grate_open", True)
+    assert storage.quick_save(state) > 0
+
+    state.current_room = "start"
+    storage.save_player_state(state)
+    storage.set_world_flag("grate_open", False)
+    storage.set_world_flag("lamp", "on")
+
+    loaded = storage.quick_load()
+    assert loaded.current_room == "building"
+    assert storage.load_player_state() == loaded
+    assert storage.world_flags() == {"grate_open": True}
+    storage.close()
+
+
+def test_migrates_version_2_database(temp_db):
+    import sqlite3
+
+    conn = sqlite3.connect(temp_db)
+    conn.executescript("""
+        CREATE TABLE sessions (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+        CREATE TABLE player (session_id INTEGER PRIMARY KEY,
+            current_room TEXT NOT NULL, inventory TEXT DEFAULT '[]');
+        CREATE TABLE world_state (session_id INTEGER NOT NULL, key TEXT NOT NULL,
+            value TEXT, PRIMARY KEY (session_id, key)) WITHOUT ROWID;
+        INSERT INTO sessions VALUES (1, 'default'), (2, 'alice');
+        INSERT INTO player VALUES (1, 'building', '[]'), (2, 'start', '[]');
+        INSERT INTO world_state VALUES (1, 'grate_open', 'true');
+        INSERT INTO world_state VALUES (2, 'grate_open', 'false');
+        PRAGMA user_version = 2;
+    """)
+    conn.close()
+
+    storage = GameStorage(temp_db)
+    assert storage.load_player_state().current_room == "building"
+    assert storage.get_world_flag("grate_open") is True
+    assert storage.quick_load() is None
+    assert storage.list_slots() == []
+    alice = GameStorage(session="alice", database=storage.database)
+    assert alice.get_world_flag("grate_open") is False
+    storage.close()
+
+
+def count_flag_rows(storage):
+    with storage._get_conn() as conn:
+        return conn.execute("SELECT COUNT(*) FROM world_state").fetchone()[0]
+
+
+def test_branching_is_copy_on_write(temp_db):
+    storage = GameStorage(temp_db)
+    state = PlayerState(current_room="building")
+    storage.new_game(state)
+    storage.save_batch(None, {f"flag{i}": i for i in range(5000)})
+    storage.save_slot("main", state)
+    storage.branch_slot("main", "side")
+    # Neither saving nor branching copied a single flag.
+    assert count_flag_rows(storage) == 5000
+
+    storage.set_world_flag("flag0", "live")
+    storage.load_slot("side")
+    assert storage.get_world_flag("flag0") == 0
+    storage.set_world_flag("flag1", "side")
+    storage.load_slot("main")
+    assert storage.get_world_flag("flag0") == 0
+    assert storage.get_world_flag("flag1") == 1
+    assert storage.get_world_flag("flag4999") == 4999
+    assert count_flag_rows(storage) <= 5002
+
+    with pytest.raises(KeyError):
+        storage.branch_slot("missing", "other")
+    with pytest.raises(ValueError):
+        storage.branch_slot("main", "side")
+    assert [slot.name for slot in storage.list_slots()] == ["main", "side"]
+    storage.close()
+
+
+def test_slots_survive_new_game(temp_db):
+    storage = GameStorage(temp_db)
+    storage.new_game(PlayerState(current_room="start"))
+    storage.set_world_flag("grate_open", True)
+    storage.save_slot("before", PlayerState(current_room="building"))
+    storage.new_game(PlayerState(current_room="start"))
+    assert storage.get_world_flag("grate_open") is None
+
+    assert storage.load_slot("before").current_room == "building"
+    assert storage.load_player_state().current_room == "building"
+    assert storage.get_world_flag("grate_open") is True
+    assert storage.load_slot("after") is None
+    storage.close()
+
+
+def test_slot_lookups_use_the_index(temp_db):
+    storage = GameStorage(temp_db)
+    with storage._get_conn() as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM slots WHERE session_id = 1 AND name = 'a'"
+        ).fetchall()
+    assert "USING INDEX" in " ".join(row[-1] for row in plan)
+    storage.close()
+
+
+def test_repeated_saves_keep_flag_chains_short(temp_db):
+    storage = GameStorage(temp_db)
+    state = PlayerState()
+    storage.new_game(state)
+    for turn in range(100):
+        storage.set_world_flag("turn", turn)
+        storage.save_slot(f"turn {turn}", state)
+    with storage._get_conn() as conn:
+        depth = conn.execute(
+            "WITH RECURSIVE chain (id) AS (SELECT layer_id FROM sessions "
+            "UNION ALL SELECT parent FROM layers JOIN chain ON layers.id = chain.id "
+            "WHERE parent IS NOT NULL) SELECT COUNT(*) FROM chain"
+        ).fetchone()[0]
+    assert depth == 1
+    storage.load_slot("turn 42")
+    assert storage.get_world_flag("turn") == 42
+    storage.close()
+
+
+def test_state_at_replays_from_the_last_checkpoint(temp_db):
+    from adventuregpt.storage import Event, checkpoint_event
+
+    storage = GameStorage(temp_db)
+    state = PlayerState(current_room="start")
+    storage.new_game(state)
+    storage.record_events(
+        [
+            Event(1, "go in", {"room": "building"}),
+            Event(2, "take lamp", {"inventory": ["lamp"]}),
+            checkpoint_event(3, "go out", PlayerState("start", Inventory(["lamp"]))),
+            Event(4, "go in", {"room": "building"}),
+        ]
+    )
+    assert storage.state_at(2) == PlayerState("building", Inventory(["lamp"]))
+    assert storage.state_at(4) == PlayerState("building", Inventory(["lamp"]))
+    assert storage.state_at(5) is None
+    assert storage.turn() == 4
+    storage.close()
+
+
+def test_text_store_keeps_one_compressed_copy(temp_db):
+    from adventuregpt.storage import Database, TextStore
+
+    database = Database(temp_db)
+    texts = TextStore(database, cache_size=2)
+    long = "You are in a maze of twisty little passages, all alike. " * 4
+    assert texts.put(long) == texts.put(long)
+    key = texts.put("Short.")
+    stats = texts.stats()
+    assert stats["size"] == 2
+    # The repeated sentence compresses well below its 224 bytes.
+    assert stats["bytes"] < len(long) // 2 + len("Short.")
+
+    # Served from the LRU, then from the database once evicted.
+    assert texts.get(key) == "Short."
+    assert (texts.hits, texts.misses) == (1, 0)
+    texts.put("other")
+    texts.put("another")
+    assert TextStore(database).get(texts.put(long)) == long
+    assert texts.get(key) == "Short."
+    assert texts.misses == 1
+    assert texts.get(b"\0" * 16) is None
+
+    with pytest.raises(ValueError):
+        TextStore(database, codec="lzma")
+    database.close()
+
+
+def test_sweep_keeps_pinned_and_referenced_texts(temp_db):
+    from adventuregpt.semantic import SemanticCache
+    from adventuregpt.storage import Database, TextStore
+
+    database = Database(temp_db)
+    texts = TextStore(database)
+    cache = SemanticCache(database, texts=texts)
+    cache.put("road", "sing", "La.")
+    cache.put("field", "sing", "La.")
+    texts.put("transcript line", pin=True)
+    texts.put("orphan")
+    assert texts.stats()["size"] == 3
+    assert texts.sweep() == 1
+    cache.clear()
+    assert texts.stats()["size"] == 1
+    database.close()
+
+
+def test_migrates_generated_text_into_the_store(temp_db):
+    import sqlite3
+
+    from adventuregpt.semantic import SemanticCache
+    from adventuregpt.storage import Database
+
+    conn = sqlite3.connect(temp_db)
+    conn.executescript("""
+        CREATE TABLE generations (id INTEGER PRIMARY KEY, context TEXT NOT NULL,
+            intent TEXT NOT NULL, vector BLOB, text TEXT NOT NULL,
+            created_at REAL NOT NULL, used_at REAL NOT NULL,
+            UNIQUE (context, intent));
+        CREATE INDEX generations_used ON generations (used_at);
+        INSERT INTO generations VALUES (1, 'road', 'sing', NULL, 'La.', 1e12, 1e12);
+        INSERT INTO generations VALUES (2, 'field', 'sing', NULL, 'La.', 1e12, 1e12);
+        PRAGMA user_version = 7;
+    """)
+    conn.close()
+
+    database = Database(temp_db)
+    cache = SemanticCache(database)
+    assert cache.get("field", "sing") == "La."
+    assert cache.texts.stats()["size"] == 1
+    database.close()
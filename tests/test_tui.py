@@ -1,7 +1,12 @@
+import asyncio
+import threading
+import time
+
 import pytest
 
 from adventuregpt.engine import GameEngine
-from adventuregpt.tui import AdventureApp
+from adventuregpt.metrics import Metrics
+from adventuregpt.tui import AdventureApp, HistoryLog, Typewriter, TypewriterLog
 
 
 @pytest.mark.asyncio
@@ -35,3 +40,150 @@ async def test_tui_persistence(temp_db):
         # Should show current room description immediately
         await pilot.pause()  # wait for mount maybe? run_test usually waits for mount.
         assert "well house" in str(log.lines)
+
+
+@pytest.mark.asyncio
+async def test_tui_stays_responsive_during_slow_saves(temp_db):
+    engine = GameEngine(db_path=temp_db)
+    save = engine.saves.save_player_state
+    saving = threading.Event()
+
+    def slow_save(state):
+        saving.set()
+        time.sleep(1.0)
+        save(state)
+
+    engine.saves.save_player_state = slow_save
+    app = AdventureApp(engine, start_new=True)
+    async with app.run_test() as pilot:
+        command_input = app.query_one("#command_input")
+        for command in ("go in", "inventory"):
+            command_input.value = command
+            await command_input.action_submit()
+        await asyncio.to_thread(saving.wait, 1)
+
+        # While the move is saving, the event loop keeps ticking at 60fps.
+        worst = 0.0
+        for _ in range(20):
+            start = time.perf_counter()
+            await asyncio.sleep(1 / 60)
+            worst = max(worst, time.perf_counter() - start)
+        assert worst < 0.1
+        assert "well house" not in getattr(app, "current_type_message", "")
+
+        await pilot.press("l")
+        assert command_input.value == "l"
+
+        for _ in range(40):
+            if "not carrying" in getattr(app, "current_type_message", ""):
+                break
+            await pilot.pause(0.05)
+
+        log = "\n".join(line.text for line in app.query_one("#game_log").lines)
+        # The response to "go in" is logged before the next command runs.
+        assert log.index("> go in") < log.index("well house") < log.index("> inventory")
+        assert "not carrying" in app.current_type_message
+
+
+def test_typewriter_reveals_markup_incrementally():
+    typewriter = Typewriter("[bold]/help[/bold] me")
+    shown = typewriter.advance(3)
+    assert shown.plain == "/he"
+    assert shown.spans[0].style == "bold"
+    assert typewriter.advance(100).plain == "/help me"
+    assert typewriter.done
+
+    assert Typewriter("x [/bold] y").advance(100).plain == "x [/bold] y"
+
+
+@pytest.mark.asyncio
+async def test_tui_animates_markup(temp_db):
+    app = AdventureApp(GameEngine(db_path=temp_db), start_new=True)
+    async with app.run_test() as pilot:
+        active = app.query_one(TypewriterLog)
+        command_input = app.query_one("#command_input")
+        command_input.value = "/help"
+        await command_input.action_submit()
+        for _ in range(40):
+            if "Available Commands" in app.current_type_message:
+                break
+            await pilot.pause(0.02)
+
+        # Part-way through, the styled text is shown partially revealed.
+        assert active.typing
+        assert 0 < active.typewriter.position < len(active.typewriter)
+        timer = active._timer
+
+        command_input.value = "look"
+        await command_input.action_submit()
+        for _ in range(40):
+            if "brick building" in app.current_type_message:
+                break
+            await pilot.pause(0.05)
+
+        # The next command moves the help text to the log in full, and the
+        # same timer animates the new message.
+        log = "\n".join(line.text for line in app.query_one("#game_log").lines)
+        assert "Pro-tip: Use TAB" in log
+        assert active._timer is timer
+
+
+@pytest.mark.asyncio
+async def test_tui_history_window_and_search(temp_db, monkeypatch):
+    monkeypatch.setattr(HistoryLog, "WINDOW", 10)
+    monkeypatch.setattr(HistoryLog, "PAGE", 5)
+    app = AdventureApp(GameEngine(db_path=temp_db), start_new=True)
+    async with app.run_test() as pilot:
+        await pilot.pause(0.1)
+        log = app.query_one(HistoryLog)
+        for i in range(30):
+            log.add("text", f"line {i}")
+        # Only a bounded window is rendered; the rest stays on disk.
+        assert len(log.history) == 30
+        assert log.last - log.first <= HistoryLog.WINDOW + HistoryLog.PAGE
+        assert "line 0" not in "\n".join(line.text for line in log.lines)
+
+        while log.load_older():
+            pass
+        assert log.first == 0
+        assert "line 0" in "\n".join(line.text for line in log.lines)
+
+        command_input = app.query_one("#command_input")
+        command_input.value = "/search LINE 2"
+        await command_input.action_submit()
+        for _ in range(40):
+            if "Matches for" in app.current_type_message:
+                break
+            await pilot.pause(0.05)
+        assert "#2: line 2" in app.current_type_message
+        assert "#21: line 21" in app.current_type_message
+
+
+def test_typewriter_streams_open_message():
+    typewriter = Typewriter("", closed=False)
+    typewriter.extend("You try [to] ")
+    assert typewriter.advance(100).plain == "You try [to] "
+    assert not typewriter.done
+    typewriter.extend("dance.")
+    typewriter.close()
+    assert typewriter.advance(100).plain == "You try [to] dance."
+    assert typewriter.done
+
+
+@pytest.mark.asyncio
+async def test_tui_stats_shows_timings(temp_db):
+    metrics = Metrics()
+    app = AdventureApp(GameEngine(db_path=temp_db, metrics=metrics), start_new=True)
+    async with app.run_test() as pilot:
+        command_input = app.query_one("#command_input")
+        for command in ("look", "/stats"):
+            command_input.value = command
+            await command_input.action_submit()
+            await pilot.pause(0.1)
+        for _ in range(40):
+            if "dispatch.look" in app.current_type_message:
+                break
+            await pilot.pause(0.05)
+        assert "dispatch.look: n=1" in app.current_type_message
+        assert "Response cache" not in app.current_type_message
+        assert metrics.histograms["ui.render"].count >= 1
@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+from adventuregpt import world as world_module
+from adventuregpt.engine import GameEngine
+from adventuregpt.world import WorldError, load_world
+
+CAVE = {
+    "start": "road",
+    "rooms": {
+        "road": {"description": "End of road.", "exits": {"in": "house"}},
+        "house": {
+            "description": "Well house.",
+            "exits": {"out": "road"},
+            "items": ["lamp", "keys"],
+        },
+    },
+    "flags": {"grate_open": False},
+}
+
+
+@pytest.fixture(autouse=True)
+def fresh_memo():
+    world_module._loaded.clear()
+    yield
+    world_module._loaded.clear()
+
+
+def test_compiled_index(tmp_path):
+    path = tmp_path / "cave.json"
+    path.write_text(json.dumps(CAVE))
+    world = load_world(str(path), cache_dir=str(tmp_path))
+
+    road, house = world.index_of("road"), world.index_of("house")
+    assert world.start == road
+    assert world.exit(road, "in") == house
+    assert world.exit(road, "north") is None
+    assert world.exits(house) == {"out": "road"}
+    assert world.item_rooms == {"lamp": house, "keys": house}
+    assert world.flags() == {"grate_open": False}
+
+
+def test_cache_skips_parsing(tmp_path, monkeypatch):
+    path = tmp_path / "cave.json"
+    path.write_text(json.dumps(CAVE))
+    first = load_world(str(path), cache_dir=str(tmp_path))
+    assert list(tmp_path.glob("world-*.pickle"))
+
+    world_module._loaded.clear()
+    monkeypatch.setattr(world_module, "parse_world", pytest.fail)
+    cached = load_world(str(path), cache_dir=str(tmp_path))
+    assert cached == first
+
+
+def test_toml_world(tmp_path):
+    path = tmp_path / "cave.toml"
+    path.write_text(
+        'start = "a"\n'
+        '[rooms.a]\ndescription = "Room A."\nexits = { east = "b" }\n'
+        '[rooms.b]\ndescription = "Room B."\n'
+    )
+    world = load_world(str(path), use_cache=False)
+    assert world.room_ids == ("a", "b")
+
+
+def test_unknown_exit_target(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text(
+        json.dumps(
+            {"rooms": {"start": {"description": "x", "exits": {"n": "nowhere"}}}}
+        )
+    )
+    with pytest.raises(WorldError, match="unknown room 'nowhere'"):
+        load_world(str(path), use_cache=False)
+
+
+def test_engine_uses_world_file(tmp_path, temp_db):
+    path = tmp_path / "cave.json"
+    path.write_text(json.dumps(CAVE))
+    engine = GameEngine(db_path=temp_db, world_path=str(path))
+    assert engine.start_new_game() == "End of road."
+    assert engine.process_command("in") == "Well house."
+    engine.close()
+
+
+def test_corrupt_cache_recompiles(tmp_path):
+    path = tmp_path / "cave.json"
+    path.write_text(json.dumps(CAVE))
+    load_world(str(path), cache_dir=str(tmp_path))
+    (cache,) = tmp_path.glob("world-*.pickle")
+    cache.write_bytes(b"\x80\x05garbage")
+
+    world_module._loaded.clear()
+    assert load_world(str(path), cache_dir=str(tmp_path)).start_room == "road"
+
+
+def test_compiled_world_is_read_only(tmp_path):
+    path = tmp_path / "cave.json"
+    path.write_text(json.dumps(CAVE))
+    world = load_world(str(path), cache_dir=str(tmp_path))
+    with pytest.raises(TypeError):
+        world.room_index["cellar"] = 99
+    with pytest.raises(TypeError):
+        world.exit_targets[0] = 1
+
+
+def test_equal_descriptions_share_one_string(tmp_path):
+    maze = "You are in a maze of twisty little passages, all alike."
+    rooms = {f"maze{i}": {"description": maze} for i in range(3)}
+    path = tmp_path / "maze.json"
+    path.write_text(json.dumps({"start": "maze0", "rooms": rooms}))
+    world = load_world(str(path), cache_dir=str(tmp_path))
+    assert len({id(text) for text in world.descriptions}) == 1
+
+    # The pickled cache keeps them shared.
+    world_module._loaded.clear()
+    cached = load_world(str(path), cache_dir=str(tmp_path))
+    assert len({id(text) for text in cached.descriptions}) == 1